@@ -0,0 +1,224 @@
+# backend/app/admission.py
+"""
+准入控制：流量高峰时限制同时处理的请求数，多出来的请求排队，队列满了直接返回 503
+
+没有准入控制时，高峰期的请求全部堆在连接池上等 SessionLocal()，
+直到 DB_POOL_TIMEOUT 超时，排队期间所有请求的延迟一起变高。
+AdmissionMiddleware 在路由之前按方法和路径给请求分类：
+- 读（GET / HEAD）：ADMISSION_READ_LIMIT，默认 DB_POOL_SIZE + DB_MAX_OVERFLOW
+- 写（其它方法）：ADMISSION_WRITE_LIMIT，默认 DB_POOL_SIZE
+- 特定路由（ADMISSION_ROUTE_LIMITS="/api/search=4,/api/posts/export=1"，精确匹配路径）：
+  先占用该路由自己的名额，再占用读 / 写名额，昂贵的接口不会占满整个读名额
+每类名额用满后请求进入 FIFO 队列（最多 ADMISSION_QUEUE_SIZE 个），
+排队超过 ADMISSION_QUEUE_TIMEOUT 秒或者队列已满时立即返回 503 + Retry-After。
+/metrics、/api/health、/api/internal/* 不受限制。限制为 0 表示不限制
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.db import MAX_OVERFLOW, POOL_SIZE
+from app.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", str(POOL_SIZE + MAX_OVERFLOW)))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", str(POOL_SIZE)))
+ADMISSION_ROUTE_LIMITS = os.getenv("ADMISSION_ROUTE_LIMITS", f"/api/search={max(1, POOL_SIZE // 2)}")
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+EXEMPT_PATHS = ("/metrics", "/api/health")
+EXEMPT_PREFIXES = ("/api/internal/",)
+READ_METHODS = ("GET", "HEAD")
+
+# 排队时间的桶（秒）
+QUEUE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def parse_route_limits(value: str) -> Dict[str, int]:
+    """"/api/search=4,/api/posts/export=1" -> {"/api/search": 4, "/api/posts/export": 1}"""
+    limits = {}
+    for item in value.split(","):
+        path, sep, limit = item.strip().rpartition("=")
+        if not sep or not path:
+            continue
+        try:
+            limits[path] = int(limit)
+        except ValueError:
+            logger.warning("Ignoring invalid ADMISSION_ROUTE_LIMITS entry %r", item)
+    return limits
+
+
+class Limiter:
+    """
+    并发上限 + 有界 FIFO 队列（只在事件循环里使用，不需要加锁）
+    名额释放时直接交给队首的请求，不会被新来的请求插队
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        # 拒绝原因：队列已满 / 排队超时
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.queue_seconds = Histogram(QUEUE_BUCKETS)
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    async def acquire(self) -> bool:
+        """拿到名额返回 True；队列已满或排队超时返回 False"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            return False
+        except asyncio.CancelledError:
+            # 客户端断开：名额已经交过来时还回去
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            self.queue_seconds.observe(time.perf_counter() - start)
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # in_flight 不变：名额直接转给排队的请求
+                waiter.set_result(None)
+                self.admitted += 1
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": {"queue_full": self.rejected_full, "queue_timeout": self.rejected_timeout},
+            "queue_seconds": self.queue_seconds.snapshot(),
+        }
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        read_limit: int = ADMISSION_READ_LIMIT,
+        write_limit: int = ADMISSION_WRITE_LIMIT,
+        route_limits: Optional[Dict[str, int]] = None,
+        max_queue: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+    ):
+        self.retry_after = retry_after
+        self.read = Limiter("read", read_limit, max_queue, queue_timeout)
+        self.write = Limiter("write", write_limit, max_queue, queue_timeout)
+        if route_limits is None:
+            route_limits = parse_route_limits(ADMISSION_ROUTE_LIMITS)
+        self.routes = {
+            path: Limiter(f"route:{path}", limit, max_queue, queue_timeout) for path, limit in route_limits.items()
+        }
+
+    def limiters_for(self, method: str, path: str) -> List[Limiter]:
+        """按占用顺序返回这个请求要经过的限制器（路由自己的在前）"""
+        if path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES):
+            return []
+        limiters = []
+        route = self.routes.get(path)
+        if route is not None and route.enabled:
+            limiters.append(route)
+        general = self.read if method in READ_METHODS else self.write
+        if general.enabled:
+            limiters.append(general)
+        return limiters
+
+    async def admit(self, method: str, path: str) -> Tuple[bool, List[Limiter]]:
+        """依次占用名额；某一级被拒绝时释放已经占用的，返回 (是否放行, 已占用的限制器)"""
+        held = []
+        for limiter in self.limiters_for(method, path):
+            if not await limiter.acquire():
+                for acquired in reversed(held):
+                    acquired.release()
+                return False, []
+            held.append(limiter)
+        return True, held
+
+    def limiters(self) -> List[Limiter]:
+        return [self.read, self.write, *self.routes.values()]
+
+    def stats(self) -> dict:
+        return {"enabled": ADMISSION_CONTROL, "limiters": {l.name: l.stats() for l in self.limiters()}}
+
+
+controller = AdmissionController()
+
+
+def get_controller() -> AdmissionController:
+    """每次读取模块级实例，测试里可以替换"""
+    return controller
+
+
+class AdmissionMiddleware:
+    """纯 ASGI 中间件：名额不够时排队，被拒绝的请求返回 503 + Retry-After，不进入路由"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller or get_controller()
+        admitted, held = await controller.admit(scope["method"], scope["path"])
+        if not admitted:
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(controller.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for limiter in reversed(held):
+                limiter.release()
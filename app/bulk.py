@@ -0,0 +1,422 @@
+# backend/app/bulk.py
+"""
+批量导入：POST /api/posts/bulk
+
+- 请求体可以是 NDJSON（每行一个 JSON 对象）或 JSON 数组，边读边解析，
+  内存里最多只有一个批次的数据
+- 每行用 PostCreate 校验，校验失败的行记录到错误列表
+- 标签索引（app/tags.py）和文章在同一个事务里更新
+- 按批次（batch_size）写入：PostgreSQL / SQLite 使用一条多行 INSERT ... ON CONFLICT，
+  其它数据库逐行插入；每个批次单独提交
+- 标题/slug 唯一约束冲突的处理方式（on_conflict）：
+  - skip：跳过冲突的行（默认）
+  - upsert：按标题更新已存在的文章
+  - fail：遇到第一个错误就停止，之前的行保留，返回 409
+"""
+import codecs
+import json
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.model import Article
+from app.posts import PostCreate, make_summary, on_post_written, post_cache
+from app.tags import apply_tag_changes
+from app.webhooks import record_post_events
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+BULK_MAX_BATCH_SIZE = 5000
+# 单行（单个数组元素）的最大字节数，防止一行数据把内存撑爆
+MAX_ROW_BYTES = 1024 * 1024
+# 响应里最多返回多少条错误明细
+MAX_REPORTED_ERRORS = 100
+
+
+def exceeds_row_limit(text: str) -> bool:
+    """按 UTF-8 字节数判断是否超过 MAX_ROW_BYTES（中文一个字 3 字节）；字符数足以判断时不编码"""
+    if len(text) > MAX_ROW_BYTES:
+        return True
+    if len(text) * 4 <= MAX_ROW_BYTES:
+        return False
+    return len(text.encode("utf-8")) > MAX_ROW_BYTES
+
+
+class BulkSummary:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.batches = 0
+        self.stopped = False
+        # 请求体本身不是合法的 NDJSON / JSON 数组，无法继续解析
+        self.malformed = False
+        self.errors: List[Dict[str, Any]] = []
+
+    def error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def to_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "stopped": self.stopped,
+            "errors": self.errors,
+        }
+
+
+class StreamingRowParser:
+    """
+    增量解析 NDJSON / JSON 数组
+    - feed() 每次喂一段 bytes，返回这段数据里完整解析出的 (行号, 对象, 错误)
+    - 格式由第一个非空白字符决定：'[' 为 JSON 数组，否则按 NDJSON
+    - 行号：NDJSON 为物理行号，JSON 数组为元素序号（都从 1 开始）
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._mode: Optional[str] = None
+        self._row = 0
+        # JSON 数组状态：expect_value / expect_separator / done
+        self._array_state = "expect_value"
+        self.fatal: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[Tuple[int, Any, Optional[str]]]:
+        if self.fatal:
+            return []
+        self._buffer += self._decoder.decode(chunk)
+        return list(self._drain(final=False))
+
+    def close(self) -> List[Tuple[int, Any, Optional[str]]]:
+        if self.fatal:
+            return []
+        self._buffer += self._decoder.decode(b"", final=True)
+        rows = list(self._drain(final=True))
+        if self._mode == "array" and self._array_state != "done" and not self.fatal:
+            self.fatal = "Unexpected end of JSON array"
+        return rows
+
+    def _drain(self, final: bool) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        if self._mode is None:
+            stripped = self._buffer.lstrip()
+            if not stripped:
+                return
+            self._mode = "array" if stripped[0] == "[" else "ndjson"
+            if self._mode == "array":
+                self._buffer = stripped[1:]
+        if self._mode == "ndjson":
+            yield from self._drain_ndjson(final)
+        else:
+            yield from self._drain_array(final)
+
+    def _drain_ndjson(self, final: bool):
+        while True:
+            newline = self._buffer.find("\n")
+            if newline == -1:
+                if exceeds_row_limit(self._buffer):
+                    self.fatal = f"Row {self._row + 1} exceeds {MAX_ROW_BYTES} bytes"
+                    return
+                if not final or not self._buffer.strip():
+                    return
+                line, self._buffer = self._buffer, ""
+            else:
+                line, self._buffer = self._buffer[:newline], self._buffer[newline + 1:]
+            self._row += 1
+            if not line.strip():
+                continue
+            try:
+                yield self._row, json.loads(line), None
+            except ValueError as e:
+                yield self._row, None, f"Invalid JSON: {e}"
+
+    def _drain_array(self, final: bool):
+        while self._array_state != "done":
+            stripped = self._buffer.lstrip()
+            self._buffer = stripped
+            if not stripped:
+                return
+            if self._array_state == "expect_separator":
+                if stripped[0] == ",":
+                    self._buffer = stripped[1:]
+                    self._array_state = "expect_value"
+                    continue
+                if stripped[0] == "]":
+                    self._buffer = stripped[1:]
+                    self._array_state = "done"
+                    return
+                self.fatal = f"Expected ',' or ']' after row {self._row}"
+                return
+            # expect_value
+            if stripped[0] == "]" and self._row == 0:
+                self._buffer = stripped[1:]
+                self._array_state = "done"
+                return
+            try:
+                value, end = self._json.raw_decode(stripped)
+            except ValueError as e:
+                # 数据还没收完整时等待下一段；已经收完或超长则报错
+                if final or exceeds_row_limit(stripped):
+                    self.fatal = f"Invalid JSON in row {self._row + 1}: {e}"
+                return
+            # 数字等标量可能在块边界被截断（如 "12" + "3"），后面必须跟着分隔符才算完整
+            if end == len(stripped) and not final and not isinstance(value, (dict, list)):
+                return
+            self._row += 1
+            self._buffer = stripped[end:]
+            self._array_state = "expect_separator"
+            yield self._row, value, None
+
+
+def validate_row(obj: Any) -> Tuple[Optional[PostCreate], Optional[str]]:
+    if not isinstance(obj, dict):
+        return None, "Row must be a JSON object"
+    try:
+        return PostCreate.model_validate(obj), None
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+def _row_values(post: PostCreate) -> dict:
+    return {
+        "title": post.title,
+        "content": post.content,
+        "tags": ",".join(post.tags) if post.tags else None,
+        "slug": post.slug,
+        "summary": make_summary(post.content),
+    }
+
+
+def _dialect_insert(db: Session):
+    """支持 ON CONFLICT 的方言返回对应的 insert()，否则返回 None"""
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def _written(values: dict, returned) -> Article:
+    """用写入的值构造一个（不属于 session 的）Article，交给写入后的钩子"""
+    return Article(id=returned.id, created_at=returned.created_at, **values)
+
+
+class BulkWriter:
+    def __init__(self, db: Session, mode: str, summary: BulkSummary):
+        self.db = db
+        self.mode = mode
+        self.summary = summary
+        self.dialect_insert = _dialect_insert(db)
+
+    def write_batch(self, batch: List[Tuple[int, PostCreate]]) -> None:
+        """写入一个批次并提交；fail 模式下遇到冲突会设置 summary.stopped"""
+        if not batch:
+            return
+        self.summary.batches += 1
+        rows = self._dedupe(batch)
+        if not rows:
+            return
+
+        if self.dialect_insert is None:
+            self._write_rows_individually(rows)
+            return
+
+        values = [v for _, v in rows]
+        # upsert：先查出已存在的标题（唯一索引），用来区分新增/更新，并让旧 slug 的缓存失效
+        existing: Dict[str, Optional[str]] = {}
+        if self.mode == "upsert":
+            titles = [v["title"] for v in values]
+            existing = dict(self.db.query(Article.title, Article.slug).filter(Article.title.in_(titles)))
+
+        stmt = self.dialect_insert(Article)
+        if self.mode == "skip":
+            stmt = stmt.on_conflict_do_nothing()
+        elif self.mode == "upsert":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Article.title],
+                set_={
+                    "content": stmt.excluded.content,
+                    "tags": stmt.excluded.tags,
+                    "slug": stmt.excluded.slug,
+                    "summary": stmt.excluded.summary,
+                    "updated_at": func.now(),
+                },
+            )
+        stmt = stmt.returning(Article.id, Article.title, Article.created_at)
+
+        try:
+            # executemany + RETURNING：SQLAlchemy 会合并成多行 INSERT（insertmanyvalues）
+            returned = self.db.execute(stmt, values).all()
+            by_title = {v["title"]: v for v in values}
+            # 新插入的行旧标签为空；被 upsert 更新的行从 article_tags 读取旧标签
+            apply_tag_changes(
+                self.db.connection(),
+                [(row.id, None if row.title in existing else (), by_title[row.title]["tags"]) for row in returned],
+            )
+            record_post_events(self.db.connection(), [_written(by_title[row.title], row) for row in returned])
+            self.db.commit()
+        except IntegrityError:
+            # 批次里有违反唯一约束、又不能被 ON CONFLICT 处理的行（如 upsert 时 slug 冲突），逐行重试定位
+            self.db.rollback()
+            self._write_rows_individually(rows)
+            return
+
+        for row in returned:
+            if row.title in existing:
+                self.summary.updated += 1
+                post_cache.invalidate(("slug", existing[row.title]))
+            else:
+                self.summary.inserted += 1
+            on_post_written(_written(by_title[row.title], row))
+        self.summary.skipped += len(values) - len(returned)
+
+    def _dedupe(self, batch: List[Tuple[int, PostCreate]]) -> List[Tuple[int, dict]]:
+        """同一批次里标题或 slug 重复的行（ON CONFLICT 不能处理同一语句内的重复更新）"""
+        kept: Dict[str, Tuple[int, dict]] = {}
+        slugs = set()
+        for row_no, post in batch:
+            values = _row_values(post)
+            title, slug = values["title"], values["slug"]
+            duplicate = title in kept or (slug is not None and slug in slugs)
+            if duplicate:
+                if self.mode == "fail":
+                    self.summary.error(row_no, "Duplicate title or slug within the upload")
+                    self.summary.stopped = True
+                    break
+                if self.mode == "upsert" and title in kept and (slug is None or slug == kept[title][1]["slug"]):
+                    # 同一标题后出现的行覆盖前面的
+                    self.summary.skipped += 1
+                    kept[title] = (row_no, values)
+                    continue
+                self.summary.skipped += 1
+                continue
+            kept[title] = (row_no, values)
+            if slug is not None:
+                slugs.add(slug)
+        return list(kept.values())
+
+    def _write_rows_individually(self, rows: List[Tuple[int, dict]]) -> None:
+        for row_no, values in rows:
+            try:
+                returned = self.db.execute(
+                    insert(Article).returning(Article.id, Article.title, Article.created_at), values
+                ).one()
+                apply_tag_changes(self.db.connection(), [(returned.id, (), values["tags"])])
+                record_post_events(self.db.connection(), [_written(values, returned)])
+                self.db.commit()
+                self.summary.inserted += 1
+                on_post_written(_written(values, returned))
+                continue
+            except IntegrityError as e:
+                self.db.rollback()
+                conflict = str(e.orig).splitlines()[0]
+
+            if self.mode == "upsert":
+                article = self.db.query(Article).filter(Article.title == values["title"]).first()
+                if article is not None:
+                    old_slug = article.slug
+                    try:
+                        article.content = values["content"]
+                        article.tags = values["tags"]
+                        article.slug = values["slug"]
+                        article.summary = values["summary"]
+                        self.db.commit()
+                        self.summary.updated += 1
+                        post_cache.invalidate(("slug", old_slug))
+                        on_post_written(article)
+                        continue
+                    except IntegrityError as e:
+                        self.db.rollback()
+                        conflict = str(e.orig).splitlines()[0]
+
+            if self.mode == "skip":
+                self.summary.skipped += 1
+                continue
+
+            self.summary.error(row_no, f"Conflict: {conflict}")
+            if self.mode == "fail":
+                self.summary.stopped = True
+                return
+
+
+def write_batch(db: Session, batch: List[Tuple[int, PostCreate]], mode: str, summary: BulkSummary) -> None:
+    """在同步 Session 上写入一个批次（同步路由放到线程池，异步路由用 run_sync 调用）"""
+    BulkWriter(db, mode, summary).write_batch(batch)
+
+
+async def ingest_stream(
+    chunks: AsyncIterator[bytes],
+    mode: str,
+    batch_size: int,
+    write: Callable[[List[Tuple[int, PostCreate]], BulkSummary], Awaitable[None]],
+) -> BulkSummary:
+    """
+    读取请求体并按批次写入
+    - write(batch, summary) 负责在数据库 session 上执行上面的 write_batch：
+      同步模式放到线程池里跑，异步模式用 AsyncSession.run_sync
+    """
+    summary = BulkSummary()
+    parser = StreamingRowParser()
+    batch: List[Tuple[int, PostCreate]] = []
+
+    async def handle(rows) -> bool:
+        nonlocal batch
+        for row_no, obj, error in rows:
+            summary.received += 1
+            post = None
+            if error is None:
+                post, error = validate_row(obj)
+            if error is not None:
+                summary.error(row_no, error)
+                if mode == "fail":
+                    summary.stopped = True
+            else:
+                batch.append((row_no, post))
+            # fail 模式：出错行之前的行照常写入
+            if len(batch) >= batch_size or (summary.stopped and batch):
+                await write(batch, summary)
+                batch = []
+            if summary.stopped:
+                return False
+        return True
+
+    async for chunk in chunks:
+        if not await handle(parser.feed(chunk)):
+            return summary
+        if parser.fatal:
+            break
+    if not parser.fatal and not await handle(parser.close()):
+        return summary
+    if batch:
+        await write(batch, summary)
+    if parser.fatal:
+        summary.error(summary.received + 1, parser.fatal)
+        summary.stopped = summary.malformed = True
+    return summary
+
+
+def bulk_response(summary: BulkSummary) -> JSONResponse:
+    """全部处理完返回 200；fail 模式中途停止返回 409；请求体格式错误返回 400"""
+    if summary.malformed:
+        status_code = 400
+    elif summary.stopped:
+        status_code = 409
+    else:
+        status_code = 200
+    return JSONResponse(summary.to_dict(), status_code=status_code)
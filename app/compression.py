@@ -0,0 +1,251 @@
+# backend/app/compression.py
+"""
+响应压缩（纯 ASGI 中间件）
+
+- 按 Accept-Encoding（含 q 值）协商：zstd > br > gzip，只用当前环境装了的
+  （gzip 用标准库 zlib；br 需要 brotli，zstd 需要 zstandard）
+- 只压缩 JSON / NDJSON / 文本，小于 COMPRESSION_MIN_SIZE 字节的响应不压缩
+- 流式响应（如 /api/posts/export）逐块压缩并 flush，客户端可以边收边解
+- 协商出编码的请求：响应加 Vary: Accept-Encoding。压缩后的响应 ETag 加上编码后缀
+  （"<hash>-gzip"，见 app/http_cache.py），每种表示各自有强 ETag；没有压缩的响应 ETag 不变。
+  304 不知道对应的 200 是否压缩，ETag 原样使用 If-None-Match 里匹配上的那一项
+
+配置：
+- COMPRESSION_MIN_SIZE（默认 1024）   小于这个大小的响应不压缩；负数关闭压缩
+- COMPRESSION_ENCODINGS（默认 zstd,br,gzip）  服务端支持的编码及优先级
+"""
+import os
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.http_cache import encoded_etag, matching_etag
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ENCODINGS = [
+    e.strip().lower() for e in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if e.strip()
+]
+
+# 压缩级别：偏向速度，响应是实时生成的
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "application/xml")
+
+
+class _GzipCompressor:
+    def __init__(self):
+        # wbits=31：gzip 格式（带头和校验）
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        import brotli
+
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self):
+        import zstandard
+
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def _available(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+COMPRESSORS: Dict[str, Callable] = {"gzip": _GzipCompressor}
+if _available("brotli"):
+    COMPRESSORS["br"] = _BrotliCompressor
+if _available("zstandard"):
+    COMPRESSORS["zstd"] = _ZstdCompressor
+
+
+def negotiate(accept_encoding: Optional[str], supported: List[str]) -> Optional[str]:
+    """
+    从 Accept-Encoding 里选出编码
+    - q 值高的优先，q 相同时按 supported 的顺序（服务端偏好）
+    - q=0 表示不接受；没有列出的编码按 "*" 的 q 值处理
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _encode_etag(headers: MutableHeaders, encoding: str) -> None:
+    etag = headers.get("etag")
+    if etag:
+        headers["ETag"] = encoded_etag(etag, encoding)
+
+
+def _echo_etag(headers: MutableHeaders, if_none_match: Optional[str]) -> None:
+    """304：换成客户端缓存的那个表示的 ETag"""
+    etag = headers.get("etag")
+    matched = etag and if_none_match and matching_etag(if_none_match, etag)
+    if matched:
+        headers["ETag"] = matched
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        encodings: Optional[List[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [e for e in (encodings or COMPRESSION_ENCODINGS) if e in COMPRESSORS]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size < 0:
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingSend(send, encoding, self.minimum_size, request_headers.get("if-none-match"))
+        await self.app(scope, receive, responder)
+
+
+class _CompressingSend:
+    """包装 send：拿到第一段响应体后决定是否压缩，再把响应头和（压缩后的）响应体发出去"""
+
+    def __init__(self, send, encoding: str, minimum_size: int, if_none_match: Optional[str] = None):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.if_none_match = if_none_match
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            # 先扣下响应头，等看到第一段响应体再决定
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.passthrough:
+            await self.send(message)
+            return
+        if self.compressor is not None:
+            await self._send_compressed(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        status = self.start_message["status"]
+        if (
+            status in (204, 304)
+            or "content-encoding" in headers
+            or not _compressible(headers)
+            or (not more_body and len(body) < self.minimum_size)
+        ):
+            # 304 没有 Content-Type，按它对应的 200 响应处理
+            if status == 304 or (status != 204 and _compressible(headers)):
+                _add_vary(headers)
+            if status == 304:
+                _echo_etag(headers, self.if_none_match)
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        self.compressor = COMPRESSORS[self.encoding]()
+        headers["Content-Encoding"] = self.encoding
+        _add_vary(headers)
+        _encode_etag(headers, self.encoding)
+        if more_body:
+            # 流式响应：长度未知
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self.send(self.start_message)
+            await self._send_compressed(message)
+            return
+        compressed = self.compressor.compress(body) + self.compressor.finish()
+        headers["Content-Length"] = str(len(compressed))
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    async def _send_compressed(self, message):
+        more_body = message.get("more_body", False)
+        data = self.compressor.compress(message.get("body", b""))
+        data += self.compressor.flush() if more_body else self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
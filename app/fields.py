@@ -0,0 +1,88 @@
+# backend/app/fields.py
+"""
+字段选择：字段名 -> 需要查询的列 + 取值方式
+
+只查询被请求字段用到的列，例如不要 content 时就不读正文。
+- 导出接口：EXPORT_FIELDS
+- 文章 / 搜索接口的 ?fields=：POST_FIELDS / SEARCH_FIELDS（见 app/posts.py）
+"""
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+from app.model import Article
+
+# 摘要长度（超出部分用 "..." 代替）
+SUMMARY_LENGTH = 200
+# 生成摘要需要的正文前缀长度：多取 1 个字符，用来判断是否截断
+SUMMARY_HEAD_LENGTH = SUMMARY_LENGTH + 1
+
+
+def split_tags(tags: Optional[str]) -> List[str]:
+    """数据库里的 "a,b" -> ["a", "b"]"""
+    if not tags:
+        return []
+    return [t.strip() for t in tags.split(",") if t.strip()]
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class Field:
+    __slots__ = ("columns", "extract")
+
+    def __init__(self, columns: Tuple[InstrumentedAttribute, ...], extract: Callable):
+        self.columns = columns
+        self.extract = extract
+
+
+# 导出接口（/api/posts/export）的字段：原始数据，tags 拆成列表，时间为 ISO 8601
+EXPORT_FIELDS: Dict[str, Field] = {
+    "id": Field((Article.id,), lambda r: r.id),
+    "title": Field((Article.title,), lambda r: r.title),
+    "slug": Field((Article.slug,), lambda r: r.slug),
+    "content": Field((Article.content,), lambda r: r.content),
+    "tags": Field((Article.tags,), lambda r: split_tags(r.tags)),
+    "created_at": Field((Article.created_at,), lambda r: _isoformat(r.created_at)),
+    "updated_at": Field((Article.updated_at,), lambda r: _isoformat(r.updated_at)),
+}
+
+
+def parse_fields(fields: Optional[str], available: Dict[str, Field]) -> List[str]:
+    """
+    解析 "id,title,slug" 形式的参数
+    - 为空时返回全部字段
+    - 有未知字段时抛 ValueError
+    """
+    if not fields:
+        return list(available)
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or fields!r}; available: {', '.join(available)}")
+    return names
+
+
+def columns_for(names: Iterable[str], available: Dict[str, Field], always=(Article.id,)) -> list:
+    """字段用到的列（去重），always 里的列总会包含（例如排序用的 id）"""
+    columns = {column.key: column for column in always}
+    for name in names:
+        for column in available[name].columns:
+            columns.setdefault(column.key, column)
+    return list(columns.values())
+
+
+def extract(row, names: Iterable[str], available: Dict[str, Field]) -> dict:
+    return {name: available[name].extract(row) for name in names}
+
+
+def make_formatter(names: Iterable[str], available: Dict[str, Field]) -> Callable[[object], dict]:
+    """只计算 names 里的字段的格式化函数：字段只解析一次，之后逐行调用"""
+    extractors = [(name, available[name].extract) for name in names]
+
+    def format_row(row) -> dict:
+        return {name: extract_value(row) for name, extract_value in extractors}
+
+    return format_row
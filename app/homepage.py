@@ -0,0 +1,417 @@
+# backend/app/homepage.py
+"""
+首页快照：列表前 N 篇文章（不带 tag 筛选的 /api/posts）物化在内存里
+
+- 每篇文章按完整 / 精简（include_content=false）两种格式各序列化一次，保存为 bytes；
+  一页响应就是把若干篇的 bytes 拼起来，同一页的结果（含 ETag）会缓存，
+  命中时不查询数据库，也不再序列化
+- 第一次请求首页时从主库加载，只读取列表精简模式的列（不读 content），只有精简格式；
+  完整格式在这一页第一次由 SQL 返回时补上（fill），之后同样由快照返回。
+  SQL 可能查的是只读副本（有复制延迟）：只有 updated_at 和精简格式都和快照一致的文章才补上
+- 之后每次写入（app.posts.on_post_written）增量更新：
+  新文章按 (created_at, id) 插入到对应位置，超出容量的旧文章从末尾去掉
+- 带 cursor 的翻页请求：游标指向快照里的文章、并且这一页完整落在快照内时同样由快照返回
+- HOMEPAGE_SNAPSHOT_TTL 秒后重新从主库加载（0 表示不过期），看到其它 worker 或脚本直接写库的更新。
+  重新加载只读精简模式的列；没有变化的文章沿用已经补上的完整格式。
+  默认值取决于是否共享：
+  - 不共享（默认）：5 秒。多 worker 部署（--workers N）时，一个 worker 上的新文章
+    最多 5 秒后出现在其它 worker 的首页上，代价是每个 worker 每 5 秒查询一次
+  - 共享：600 秒，只是兜底。worker 之间靠 homepage_snapshot 表的版本号同步，
+    每 HOMEPAGE_SNAPSHOT_POLL_INTERVAL 秒查询一次版本号，新文章很快出现在所有 worker 上
+  只有一个 worker 时可以把 TTL 调大（或设为 0）
+- HOMEPAGE_SNAPSHOT_SHARED=1：多个 worker 通过 homepage_snapshot 表共享快照。
+  本地有写入时，后台任务按版本号比较并交换（version = 本地基于的版本时才更新）发布快照；
+  其它 worker 轮询到新版本后直接加载表里的快照，不用重新查询文章表。
+  版本冲突（两个 worker 同时写入）时从文章表重建后再发布
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import func, select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.http_cache import body_etag
+from app.model import HomepageSnapshot
+
+logger = logging.getLogger(__name__)
+
+# 快照保存的文章数（默认 5 页 × 20 篇），0 关闭
+HOMEPAGE_SNAPSHOT_SIZE = int(os.getenv("HOMEPAGE_SNAPSHOT_SIZE", "100"))
+HOMEPAGE_SNAPSHOT_SHARED = os.getenv("HOMEPAGE_SNAPSHOT_SHARED", "0").lower() in ("1", "true", "yes")
+HOMEPAGE_SNAPSHOT_TTL = float(os.getenv("HOMEPAGE_SNAPSHOT_TTL", "600" if HOMEPAGE_SNAPSHOT_SHARED else "5"))
+HOMEPAGE_SNAPSHOT_POLL_INTERVAL = float(os.getenv("HOMEPAGE_SNAPSHOT_POLL_INTERVAL", "1"))
+
+# 每个快照最多缓存多少个不同的 (格式, 起始位置, 每页条数) 组合
+MAX_CACHED_PAGES = 256
+
+
+class SnapshotEntry(NamedTuple):
+    cursor: str  # 指向这篇文章的翻页游标（即以它结尾的那一页的 X-Next-Cursor）
+    id: int
+    created_at: datetime
+    full: Optional[bytes]  # 还没有补上完整格式时为 None
+    slim: bytes
+    updated_at: Optional[datetime] = None
+
+
+def _same_version(a: SnapshotEntry, b: SnapshotEntry) -> bool:
+    return a.updated_at == b.updated_at and a.slim == b.slim
+
+
+class _State(NamedTuple):
+    entries: List[SnapshotEntry]
+    # 快照是否包含了表里所有文章（文章数不超过容量）
+    complete: bool
+    index: Dict[str, int]
+    pages: Dict[Tuple[bool, int, int], Tuple[bytes, str, Optional[str]]]
+    loaded_at: float
+
+
+# (db, n) -> (按 (created_at, id) 倒序的前 n 篇, 是否已经是全部文章)；返回 None 表示无法建立快照
+Loader = Callable[[object, int], Optional[Tuple[List[SnapshotEntry], bool]]]
+
+
+class MaterializedHomepage:
+    def __init__(
+        self,
+        capacity: int,
+        loader: Loader,
+        ttl: float = HOMEPAGE_SNAPSHOT_TTL,
+        shared: bool = False,
+        poll_interval: float = HOMEPAGE_SNAPSHOT_POLL_INTERVAL,
+        session_factory=None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.shared = shared
+        self.poll_interval = poll_interval
+        self._loader = loader
+        self._session_factory = session_factory
+        self._clock = clock
+        self._state: Optional[_State] = None
+        self._lock = threading.Lock()
+        # 每次写入加一：加载期间有写入时丢弃加载结果（可能没有包含这次写入）
+        self._generation = 0
+        # 本地快照的版本；共享模式下为它所基于的表里的版本
+        self.version = 0
+        # 共享模式：本地有还没发布的写入
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.applied = 0
+        self.published = 0
+        self.conflicts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _fresh(self, state: Optional[_State]) -> bool:
+        return state is not None and (self.ttl <= 0 or self._clock() - state.loaded_at < self.ttl)
+
+    def needs_load(self) -> bool:
+        return self.enabled and not self._fresh(self._state)
+
+    @property
+    def generation(self) -> int:
+        """写入计数；查询前读取，传给 fill，查询期间有写入时不用查询结果"""
+        return self._generation
+
+    def _install(self, entries: List[SnapshotEntry], complete: bool, loaded_at: Optional[float] = None) -> None:
+        index = {entry.cursor: i for i, entry in enumerate(entries)}
+        self._state = _State(entries, complete, index, {}, self._clock() if loaded_at is None else loaded_at)
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def page(self, limit: int, cursor: Optional[str], include_content: bool):
+        """
+        返回 (响应体, ETag, 下一页游标)；快照不能完整回答这一页时返回 None（由调用方查库）
+        """
+        state = self._state
+        if not self._fresh(state):
+            self.misses += 1
+            return None
+        if cursor is None:
+            start = 0
+        else:
+            position = state.index.get(cursor)
+            if position is None:
+                self.misses += 1
+                return None
+            start = position + 1
+        end = start + limit
+        # 快照不是全部文章时，需要多一篇才知道后面还有没有
+        if end >= len(state.entries) and not state.complete:
+            self.misses += 1
+            return None
+
+        key = (include_content, start, limit)
+        cached = state.pages.get(key)
+        if cached is None:
+            chunk = state.entries[start:end]
+            if include_content and any(e.full is None for e in chunk):
+                self.misses += 1
+                return None
+            body = b"[" + b",".join(e.full if include_content else e.slim for e in chunk) + b"]"
+            next_cursor = chunk[-1].cursor if chunk and end < len(state.entries) else None
+            cached = (body, body_etag(body), next_cursor)
+            if len(state.pages) < MAX_CACHED_PAGES:
+                state.pages[key] = cached
+        self.hits += 1
+        return cached
+
+    # ------------------------------------------------------------------
+    # 加载与增量更新
+    # ------------------------------------------------------------------
+
+    def load(self, db) -> bool:
+        """从数据库加载前 capacity 篇；加载期间有写入时放弃，返回是否已加载"""
+        generation = self._generation
+        loaded = self._loader(db, self.capacity)
+        if loaded is None:
+            return False
+        entries, complete = loaded
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._install(self._keep_full(entries), complete)
+            self.loads += 1
+            if not self.shared:
+                self.version += 1
+        return True
+
+    def apply(self, entry: Optional[SnapshotEntry], post_id: int) -> None:
+        """文章写入后调用：替换 / 插入这篇文章；entry 为 None（缺少 created_at）时丢弃快照"""
+        with self._lock:
+            self._generation += 1
+            state = self._state
+            if state is None:
+                return
+            entries = [e for e in state.entries if e.id != post_id]
+            replaced = len(entries) != len(state.entries)
+            if entry is None:
+                self._state = None
+                return
+            key = (entry.created_at, entry.id)
+            try:
+                position = next(
+                    (i for i, e in enumerate(entries) if (e.created_at, e.id) < key), len(entries)
+                )
+            except TypeError:
+                # created_at 有的带时区有的不带，无法比较
+                self._state = None
+                return
+            complete = state.complete
+            if position == len(entries) and not complete:
+                # 比快照里最旧的一篇还旧，不在前 capacity 篇里
+                if replaced:
+                    self._state = None
+                return
+            entries.insert(position, entry)
+            if len(entries) > self.capacity:
+                del entries[self.capacity:]
+                complete = False
+            self._install(entries, complete, state.loaded_at)
+            self.applied += 1
+            if self.shared:
+                self._dirty = True
+            else:
+                self.version += 1
+
+    def _keep_full(self, entries: List[SnapshotEntry]) -> List[SnapshotEntry]:
+        """重新加载时：没有变化的文章沿用当前快照里已经补上的完整格式"""
+        state = self._state
+        if state is None:
+            return entries
+        current = {e.id: e for e in state.entries if e.full is not None}
+        kept = []
+        for entry in entries:
+            old = current.get(entry.id)
+            if entry.full is None and old is not None and _same_version(entry, old):
+                entry = entry._replace(full=old.full)
+            kept.append(entry)
+        return kept
+
+    def unfilled(self, ids: Iterable[int]) -> Set[int]:
+        """ids 里在快照中、还没有完整格式的文章"""
+        state = self._state
+        if state is None:
+            return set()
+        wanted = set(ids)
+        return {e.id for e in state.entries if e.full is None and e.id in wanted}
+
+    def fill(self, generation: int, rows: Dict[int, SnapshotEntry]) -> None:
+        """
+        用查询结果补上完整格式（post_id -> 由查询到的文章生成的 SnapshotEntry）
+        - generation 之后有过写入时放弃
+        - 查询结果可能来自有延迟的副本：updated_at 或精简格式和快照不一致的文章不补
+        """
+        with self._lock:
+            state = self._state
+            if state is None or generation != self._generation:
+                return
+            for i, entry in enumerate(state.entries):
+                row = rows.get(entry.id)
+                if entry.full is None and row is not None and row.full is not None and _same_version(entry, row):
+                    state.entries[i] = entry._replace(full=row.full)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._state = None
+            self._dirty = False
+
+    # ------------------------------------------------------------------
+    # 共享模式：通过 homepage_snapshot 表在多个 worker 之间同步
+    # ------------------------------------------------------------------
+
+    def _dump(self, state: _State) -> str:
+        return json.dumps({
+            "complete": state.complete,
+            "entries": [
+                [
+                    e.cursor,
+                    e.id,
+                    e.created_at.isoformat(),
+                    e.full and e.full.decode("utf-8"),
+                    e.slim.decode("utf-8"),
+                    e.updated_at and e.updated_at.isoformat(),
+                ]
+                for e in state.entries
+            ],
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def _parse(payload: str) -> Tuple[List[SnapshotEntry], bool]:
+        data = json.loads(payload)
+        entries = [
+            SnapshotEntry(
+                cursor,
+                post_id,
+                datetime.fromisoformat(created_at),
+                full and full.encode("utf-8"),
+                slim.encode("utf-8"),
+                # 旧版本发布的快照没有 updated_at
+                updated_at[0] and datetime.fromisoformat(updated_at[0]) if updated_at else None,
+            )
+            for cursor, post_id, created_at, full, slim, *updated_at in data["entries"]
+        ]
+        return entries, data["complete"]
+
+    def _read_remote(self, db) -> Tuple[int, Optional[str]]:
+        row = db.execute(
+            select(HomepageSnapshot.version, HomepageSnapshot.payload).where(HomepageSnapshot.id == 1)
+        ).first()
+        if row is None:
+            db.add(HomepageSnapshot(id=1, version=0))
+            db.commit()
+            return 0, None
+        return row.version, row.payload
+
+    def _publish(self, db, state: _State, base: int) -> bool:
+        """version 仍然等于 base 时写入本地快照并加一（比较并交换）"""
+        published = db.execute(
+            update(HomepageSnapshot)
+            .where(HomepageSnapshot.id == 1, HomepageSnapshot.version == base)
+            .values(version=base + 1, payload=self._dump(state), updated_at=func.now())
+        ).rowcount
+        db.commit()
+        if not published:
+            return False
+        with self._lock:
+            self.version = base + 1
+            self.published += 1
+            # 发布期间本地又有写入时保持 dirty，下一轮再发布
+            if self._state is state:
+                self._dirty = False
+        return True
+
+    def sync(self) -> None:
+        """和表里的快照同步一次（后台任务在线程池里调用）"""
+        if self._session_factory is None:
+            from app.db import SessionLocal
+
+            self._session_factory = SessionLocal
+        db = self._session_factory()
+        try:
+            remote, payload = self._read_remote(db)
+            with self._lock:
+                state, dirty, base, generation = self._state, self._dirty, self.version, self._generation
+            if dirty and state is not None and remote == base:
+                if self._publish(db, state, base):
+                    return
+                remote, payload = self._read_remote(db)
+            if remote == base:
+                return
+
+            # 表里的版本更新了：本地没有未发布的写入时直接用表里的快照；
+            # 否则是两个 worker 同时写入，从文章表重建（包含双方的写入），下一轮再发布
+            if dirty:
+                self.conflicts += 1
+            loaded = self._parse(payload) if payload and not dirty else self._loader(db, self.capacity)
+            with self._lock:
+                if loaded is not None and generation == self._generation:
+                    entries, complete = loaded
+                    self._install(self._keep_full(entries), complete)
+                    self.version = remote
+                    self.loads += 1
+        finally:
+            db.close()
+
+    async def start(self) -> None:
+        if not (self.enabled and self.shared) or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception:
+                logger.exception("Homepage snapshot sync failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._dirty:
+            # 退出前发布本地还没发布的写入
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception:
+                logger.exception("Homepage snapshot sync failed")
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            "enabled": self.enabled,
+            "shared": self.shared,
+            "version": self.version,
+            "size": len(state.entries) if state else 0,
+            "complete": state.complete if state else False,
+            "cached_pages": len(state.pages) if state else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "applied": self.applied,
+            "published": self.published,
+            "conflicts": self.conflicts,
+        }
@@ -0,0 +1,157 @@
+# backend/app/http_cache.py
+"""
+HTTP 条件请求（ETag / Last-Modified / Cache-Control）
+
+- 单篇文章：强 ETag 由 id + 最后修改时间（updated_at，没有则用 created_at）生成，
+  校验时只需要这两列，不需要加载 content，也不需要格式化响应
+- 列表 / 搜索：响应体只序列化一次，ETag 是序列化结果的哈希，同一份 bytes 直接作为响应体
+- If-None-Match 优先于 If-Modified-Since（RFC 9110 13.2.2）
+- 压缩后的响应 ETag 带编码后缀（"<hash>-gzip"，见 app/compression.py），每种编码各自是强 ETag；
+  比较 If-None-Match 时去掉后缀
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from app.serialization import dumps
+
+# 默认每次都向服务端验证（配合 ETag 拿到 304），部署时可按需放宽
+CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+# 响应格式变化时修改这个前缀，让旧的单篇 ETag 全部失效
+ETAG_VERSION = "v1"
+
+# ETag 编码后缀可能的取值（app.compression 支持的编码）
+ETAG_ENCODINGS = ("gzip", "br", "zstd")
+
+
+class ValidatedResponse(NamedTuple):
+    """序列化好的响应体（bytes）+ 对应的校验器（用于缓存，命中时不用再格式化和序列化）"""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def _utc(dt: datetime) -> datetime:
+    # 没有时区信息的时间按 UTC 处理（SQLite 等数据库会丢掉时区）
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def last_modified_of(created_at: Optional[datetime], updated_at: Optional[datetime]) -> Optional[datetime]:
+    value = updated_at or created_at
+    return _utc(value) if isinstance(value, datetime) else None
+
+
+def post_etag(post_id: int, last_modified: Optional[datetime]) -> str:
+    stamp = int(last_modified.timestamp() * 1_000_000) if last_modified else 0
+    return f'"{ETAG_VERSION}-{post_id}-{stamp}"'
+
+
+def render_json(payload: Any) -> bytes:
+    # 和 FastAPI JSONResponse 的输出保持一致，见 app/serialization.py
+    return dumps(payload)
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """'"abc"' + gzip -> '"abc-gzip"'"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_etag_encoding(etag: str) -> str:
+    for encoding in ETAG_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def matching_etag(if_none_match: str, etag: str) -> Optional[str]:
+    """If-None-Match 里和 etag 匹配的那一项（原样返回，可能带编码后缀）；弱比较：忽略 W/ 前缀"""
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        opaque = candidate[2:] if candidate.startswith("W/") else candidate
+        if strip_etag_encoding(opaque) == wanted:
+            return candidate
+    return None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return matching_etag(if_none_match, etag) is not None
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """根据请求头判断客户端缓存是否仍然有效"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP 日期只精确到秒
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def has_conditional_headers(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def send_validated(request: Request, cached: ValidatedResponse) -> Response:
+    """缓存的单篇响应：客户端缓存仍有效时返回 304，否则直接发送已序列化的 bytes"""
+    if is_not_modified(request, cached.etag, cached.last_modified):
+        return not_modified(cached.etag, cached.last_modified)
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers=validator_headers(cached.etag, cached.last_modified),
+    )
+
+
+def conditional_json(request: Request, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    序列化 payload 并按内容哈希生成 ETag
+    - 命中 If-None-Match 返回 304（不发送响应体）
+    - 否则直接用已序列化的 bytes 作为响应体，避免 FastAPI 再序列化一次
+    """
+    body = render_json(payload)
+    return conditional_body(request, body, body_etag(body), headers)
+
+
+def conditional_body(request: Request, body: bytes, etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """已经序列化好的 JSON 响应体（etag 为 body_etag(body)），处理同 conditional_json"""
+    extra = dict(headers or {})
+    if is_not_modified(request, etag):
+        response = not_modified(etag)
+        response.headers.update(extra)
+        return response
+    return Response(content=body, media_type="application/json", headers={**validator_headers(etag), **extra})
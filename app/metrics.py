@@ -0,0 +1,354 @@
+# backend/app/metrics.py
+"""
+轻量的指标工具（不依赖 prometheus_client）
+
+Histogram 使用固定的桶上界，只记录每个桶的计数、总和与总数，
+记录一次是一次二分查找 + 加法，开销可以忽略，可以在生产环境常开。
+
+MetricsMiddleware 按路由模板统计请求数、状态码、延迟，以及每个请求执行的
+SQL 语句数和累计 SQL 耗时（SQLAlchemy before/after_cursor_execute 事件），
+由 /metrics 以 Prometheus 文本格式输出。
+其它模块通过 add_query_observer 复用同一份语句计时（慢查询日志，见 app/profiling.py）。
+"""
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 默认的延迟桶（秒），覆盖 1ms ~ 10s
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # 最后一个桶是 +Inf
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative(self) -> Dict[str, int]:
+        """Prometheus 风格的累计计数：{"0.005": n, ..., "+Inf": total}"""
+        with self._lock:
+            counts = list(self._counts)
+        result = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            result[f"{bound:g}"] = running
+        result["+Inf"] = running + counts[-1]
+        return result
+
+    def snapshot(self) -> dict:
+        return {"count": self._count, "sum": round(self._sum, 6), "buckets": self.cumulative()}
+
+
+# ---------------------------------------------------------------------------
+# HTTP 请求与 SQL 指标（/metrics，Prometheus 文本格式）
+# ---------------------------------------------------------------------------
+
+# 每个请求执行的 SQL 语句数的桶
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# 没有匹配到路由的请求统一归到这个标签下，避免 404 扫描把标签数撑爆
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestDbStats:
+    """一个请求内的 SQL 统计，由 SQLAlchemy 游标事件累加"""
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# 当前请求的 SQL 统计；同步路由在线程池里执行时 contextvars 会被复制过去，
+# 复制的是同一个对象的引用，所以累加结果在中间件里可见
+_current_db_stats: contextvars.ContextVar = contextvars.ContextVar("request_db_stats", default=None)
+
+# 每条语句执行完后调用：(conn, statement, parameters, context, executemany, elapsed)
+_query_observers: List[Callable] = []
+
+
+def add_query_observer(observer: Callable) -> None:
+    if observer not in _query_observers:
+        _query_observers.append(observer)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 同一个连接上语句依次执行，只需要保存一个开始时间
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = _current_db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+    for observer in _query_observers:
+        observer(conn, statement, parameters, context, executemany, elapsed)
+
+
+def _handle_error(exception_context):
+    # 语句出错时不会触发 after_cursor_execute，清掉开始时间，不留在连接池里的连接上
+    conn = exception_context.connection
+    if conn is not None and not conn.closed and not conn.invalidated:
+        conn.info.pop("query_start", None)
+
+
+_sql_timing_installed = False
+
+
+def install_sql_timing() -> None:
+    """在 Engine 类上注册游标事件，对所有引擎（主库、异步、副本）生效"""
+    global _sql_timing_installed
+    if _sql_timing_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _sql_timing_installed = True
+
+
+class RouteMetrics:
+    __slots__ = ("statuses", "latency", "db_statements", "db_seconds")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram()
+        self.db_statements = Histogram(STATEMENT_COUNT_BUCKETS)
+        self.db_seconds = Histogram()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def route(self, method: str, path: str) -> RouteMetrics:
+        key = (method, path)
+        metrics = self._routes.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self._routes.setdefault(key, RouteMetrics())
+        return metrics
+
+    def observe(self, method: str, path: str, status: int, seconds: float, db: RequestDbStats) -> None:
+        metrics = self.route(method, path)
+        with self._lock:
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.latency.observe(seconds)
+        metrics.db_statements.observe(db.statements)
+        metrics.db_seconds.observe(db.seconds)
+
+    def items(self):
+        with self._lock:
+            return sorted(self._routes.items())
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件：记录每个请求的路由模板、状态码、耗时，以及期间执行的 SQL 数量和耗时
+    路由模板（如 /api/posts/{post_id}）在路由匹配后由 FastAPI 写入 scope["route"]
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        db_stats = RequestDbStats()
+        token = _current_db_stats.set(db_stats)
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        self.registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.registry.in_flight -= 1
+            _current_db_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.registry.observe(scope["method"], path, status_holder[0], elapsed, db_stats)
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels) -> List[str]:
+    lines = []
+    for bound, count in histogram.cumulative().items():
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def render_prometheus(
+    registry: MetricsRegistry = registry,
+    pools: Optional[dict] = None,
+    webhooks: Optional[dict] = None,
+    replicas: Optional[dict] = None,
+    admission: Optional[dict] = None,
+    singleflight: Optional[dict] = None,
+) -> str:
+    """生成 Prometheus 文本格式（text/plain; version=0.0.4）"""
+    routes = registry.items()
+    lines = [
+        "# HELP http_requests_in_flight Requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {registry.in_flight}",
+        "# HELP http_requests_total Requests by route template and status code.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, path), metrics in routes:
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=path, status=status)} {count}")
+
+    sections = (
+        ("http_request_duration_seconds", "latency", "Request latency in seconds."),
+        ("db_statements_per_request", "db_statements", "SQL statements executed per request."),
+        ("db_time_per_request_seconds", "db_seconds", "Cumulative SQL execution time per request."),
+    )
+    for name, attr, help_text in sections:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (method, path), metrics in routes:
+            lines.extend(_histogram_lines(name, getattr(metrics, attr), method=method, route=path))
+
+    if pools:
+        gauges = (
+            ("db_pool_checked_out", "checked_out", "Connections currently checked out."),
+            ("db_pool_idle", "idle", "Idle connections in the pool."),
+            ("db_pool_overflow", "overflow", "Overflow connections currently open."),
+        )
+        for name, key, help_text in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for pool_name, stats in pools.items():
+                if key in stats:
+                    lines.append(f"{name}{_labels(pool=pool_name)} {stats[key]}")
+        lines.append("# HELP db_pool_checkout_timeouts_total Checkouts that timed out waiting for a connection.")
+        lines.append("# TYPE db_pool_checkout_timeouts_total counter")
+        for pool_name, stats in pools.items():
+            lines.append(f"db_pool_checkout_timeouts_total{_labels(pool=pool_name)} {stats['checkout_timeouts']}")
+
+    if webhooks and webhooks.get("enabled"):
+        lines += [
+            "# HELP webhook_queue_depth Post events waiting to be delivered.",
+            "# TYPE webhook_queue_depth gauge",
+            f"webhook_queue_depth {webhooks['queue_depth']}",
+            "# HELP webhook_lag_seconds Age of the oldest undelivered post event.",
+            "# TYPE webhook_lag_seconds gauge",
+            f"webhook_lag_seconds {webhooks['lag_seconds']}",
+            "# HELP webhook_events_total Post events by outcome.",
+            "# TYPE webhook_events_total counter",
+        ]
+        for outcome in ("published", "delivered", "failed", "dropped"):
+            lines.append(f"webhook_events_total{_labels(outcome=outcome)} {webhooks[outcome]}")
+        lines += [
+            "# HELP webhook_retries_total Webhook delivery retries.",
+            "# TYPE webhook_retries_total counter",
+            f"webhook_retries_total {webhooks['retries']}",
+        ]
+
+    if replicas and replicas["replicas"]:
+        lines += [
+            "# HELP db_replica_healthy Whether the read replica passed its last health check.",
+            "# TYPE db_replica_healthy gauge",
+        ]
+        for replica in replicas["replicas"]:
+            lines.append(f"db_replica_healthy{_labels(replica=replica['name'])} {int(replica['healthy'])}")
+        lines += [
+            "# HELP db_reads_total Read sessions by target database.",
+            "# TYPE db_reads_total counter",
+        ]
+        for replica in replicas["replicas"]:
+            lines.append(f"db_reads_total{_labels(target=replica['name'], reason='replica')} {replica['reads']}")
+        for reason, count in replicas["primary_reads"].items():
+            lines.append(f"db_reads_total{_labels(target='primary', reason=reason)} {count}")
+
+    if admission and admission.get("enabled"):
+        limiters = admission["limiters"]
+        gauges = (
+            ("admission_in_flight", "in_flight", "Requests currently admitted."),
+            ("admission_queue_depth", "queue_depth", "Requests waiting for admission."),
+        )
+        for name, key, help_text in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for limiter, stats in limiters.items():
+                lines.append(f"{name}{_labels(limiter=limiter)} {stats[key]}")
+        lines += [
+            "# HELP admission_rejected_total Requests rejected with 503 by reason.",
+            "# TYPE admission_rejected_total counter",
+        ]
+        for limiter, stats in limiters.items():
+            for reason, count in stats["rejected"].items():
+                lines.append(f"admission_rejected_total{_labels(limiter=limiter, reason=reason)} {count}")
+        lines += [
+            "# HELP admission_queue_seconds Time spent waiting for admission.",
+            "# TYPE admission_queue_seconds histogram",
+        ]
+        for limiter, stats in limiters.items():
+            queue = stats["queue_seconds"]
+            for bound, count in queue["buckets"].items():
+                lines.append(f"admission_queue_seconds_bucket{_labels(limiter=limiter, le=bound)} {count}")
+            lines.append(f"admission_queue_seconds_sum{_labels(limiter=limiter)} {queue['sum']:.6f}")
+            lines.append(f"admission_queue_seconds_count{_labels(limiter=limiter)} {queue['count']}")
+
+    if singleflight:
+        lines += [
+            "# HELP singleflight_requests_total Reads that ran a query (executed) or shared a concurrent one (shared).",
+            "# TYPE singleflight_requests_total counter",
+        ]
+        for group, stats in singleflight.items():
+            for outcome in ("executed", "shared"):
+                lines.append(f"singleflight_requests_total{_labels(group=group, outcome=outcome)} {stats[outcome]}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,109 @@
+# backend/app/migrate.py
+"""
+数据库迁移（Alembic，脚本在 migrations/versions）
+
+- 取代原来导入 app.main 时执行的 create_all + 手写的补列/补索引
+- 应用启动时默认升级到最新版本（DB_MIGRATE_ON_STARTUP=false 关闭，改由发布流程执行
+  `alembic upgrade head` 或 `python -m app.migrate`，多实例扩容时启动更快）
+- 早期版本用 create_all 建表、没有 alembic_version：各迁移会先检查表/列/索引是否已存在，
+  可以直接升级，不需要手动 stamp
+"""
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def revision_module(revision: str):
+    """迁移脚本模块（读取里面的 SQL / 函数，测试和脚本用）"""
+    return ScriptDirectory.from_config(alembic_config()).get_revision(revision).module
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def upgrade_database(engine: Engine, revision: str = "head") -> None:
+    """
+    执行到指定版本。每个迁移文件一个事务：失败时回滚当前这一个，之前的已经提交；
+    大表回填按批提交、索引用 CONCURRENTLY 创建（见 migrations/versions/0002、0003）
+    """
+    config = alembic_config()
+    with engine.connect() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, revision)
+
+
+def wait_for_database(engine: Engine, timeout: float) -> None:
+    """数据库还没有就绪（容器同时启动）时重试连接，最多等待 timeout 秒"""
+    deadline = time.monotonic() + timeout
+    delay = 0.5
+    while True:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                raise
+            logger.warning("Database not ready (%s), retrying in %.1fs", type(e).__name__, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+def migrate(engine: Engine, timeout: float = 0) -> None:
+    """启动时调用：已经是最新版本时只查询一次 alembic_version，不执行迁移"""
+    if timeout:
+        wait_for_database(engine, timeout)
+    if current_revision(engine) == head_revision():
+        return
+    began = time.perf_counter()
+    upgrade_database(engine)
+    logger.info("Database migrated to %s in %.2fs", head_revision(), time.perf_counter() - began)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.db import DATABASE_URL
+
+    parser = argparse.ArgumentParser(description="Upgrade the database schema to the latest revision.")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--revision", default="head")
+    parser.add_argument("--wait", type=float, default=30, help="seconds to wait for the database to accept connections")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(args.database_url)
+    try:
+        if args.wait:
+            wait_for_database(engine, args.wait)
+        upgrade_database(engine, args.revision)
+        logger.info("Database is at revision %s", current_revision(engine))
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
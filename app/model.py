@@ -1,5 +1,5 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from sqlalchemy import Column, ForeignKey, Integer, String, Text, DateTime, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -11,6 +11,60 @@ class Article(Base):
     title = Column(String(255), nullable=False, unique=True)
     content = Column(Text, nullable=False)
     tags = Column(String(255), nullable=True)
+    # 写入时生成的摘要（见 app.posts.make_summary），列表/搜索不用再读取正文
+    summary = Column(Text, nullable=True)
     slug = Column(String(255), nullable=True, unique=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # 列表 keyset 分页按 (created_at, id) 排序
+        Index("ix_articles_created_at_id", "created_at", "id"),
+    )
+
+
+class Tag(Base):
+    """标签表：article_count 随文章写入增量维护（见 app/tags.py），/api/tags 不用扫全表"""
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False, unique=True)
+    article_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class ArticleTag(Base):
+    """文章-标签关联表；主键 (tag_id, article_id) 用于按标签筛选"""
+    __tablename__ = "article_tags"
+
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class WebhookOutbox(Base):
+    """
+    待发送的文章事件（WEBHOOK_OUTBOX=1 时启用，见 app/webhooks.py）
+    和文章在同一个事务里写入，发送成功后删除；进程重启后未发送的事件会继续发送
+    """
+    __tablename__ = "webhook_outbox"
+
+    id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 下次可以发送的时间；NULL 表示立即可以发送。被认领后推迟到租约到期，发送失败后按退避推迟
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    # 被 webhook 拒绝（4xx）的时间：不再发送，留在表里供排查
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class HomepageSnapshot(Base):
+    """
+    首页快照（HOMEPAGE_SNAPSHOT_SHARED=1 时使用，见 app/homepage.py）
+    只有一行（id=1）：version 每次发布加一，payload 为序列化好的前 N 篇文章
+    """
+    __tablename__ = "homepage_snapshot"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    payload = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,31 @@
+# backend/app/pagination.py
+"""
+文章列表的 keyset（游标）分页工具
+
+游标对客户端是不透明的字符串，内部是 (created_at, id) 的 base64url 编码，
+查询时用 (created_at, id) < (cursor.created_at, cursor.id) 定位下一页，
+不需要 OFFSET，页码再深查询成本也不变。
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, post_id: int) -> str:
+    """把一页最后一条记录的排序键编码成游标"""
+    raw = f"{created_at.isoformat()}|{post_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析游标，返回 (created_at, id)
+    - 游标格式不合法时抛出 ValueError，由调用方转换成 400
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_part), int(id_part)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
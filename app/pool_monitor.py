@@ -0,0 +1,117 @@
+# backend/app/pool_monitor.py
+"""
+连接池监控
+
+- 等待时间：连接池类重写 connect()，记录从申请到拿到连接的耗时（含 pre-ping），
+  超时（QueuePool limit ... reached）单独计数
+- 其它计数来自 SQLAlchemy 连接池事件：connect / checkout / checkin / invalidate
+- 当前状态（已借出 / 空闲 / 溢出连接数）直接读取 engine.pool
+
+每个引擎用连接池的 monitor_name 区分（primary / async / 副本等，pool_options 传入），
+engine.dispose() 重建连接池时名字会保留，监控数据不会丢。
+"""
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.metrics import Histogram
+
+# 等待连接的耗时桶（秒）
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMonitor:
+    def __init__(self, name: str):
+        self.name = name
+        self.wait_seconds = Histogram(POOL_WAIT_BUCKETS)
+        self.timeouts = 0
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _incr(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def attach(self, engine) -> None:
+        """注册连接池事件；异步引擎传 engine.sync_engine"""
+        event.listen(engine, "connect", lambda *_: self._incr("connects"))
+        event.listen(engine, "checkout", lambda *_: self._incr("checkouts"))
+        event.listen(engine, "checkin", lambda *_: self._incr("checkins"))
+        event.listen(engine, "invalidate", lambda *_: self._incr("invalidations"))
+
+    def snapshot(self, pool) -> dict:
+        stats = {
+            "pool_class": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "checkout_timeouts": self.timeouts,
+            "wait_seconds": self.wait_seconds.snapshot(),
+        }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                # overflow() 在连接数未超过 pool_size 时是负数
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        return stats
+
+
+_monitors: Dict[str, PoolMonitor] = {}
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(name: str) -> PoolMonitor:
+    with _monitors_lock:
+        monitor = _monitors.get(name)
+        if monitor is None:
+            monitor = _monitors[name] = PoolMonitor(name)
+        return monitor
+
+
+class _InstrumentedPoolMixin:
+    """
+    记录每次 connect() 的等待时间与超时次数
+    监控名通过构造参数 monitor_name 传入（create_engine(..., monitor_name=...) 会转给连接池），
+    engine.dispose() 重建连接池时沿用
+    """
+
+    def __init__(self, creator, monitor_name: str = "default", **kw):
+        self.monitor_name = monitor_name
+        super().__init__(creator, **kw)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.monitor_name = self.monitor_name
+        return pool
+
+    def connect(self):
+        monitor = get_monitor(self.monitor_name)
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            monitor.wait_seconds.observe(time.perf_counter() - start)
+            monitor._incr("timeouts")
+            raise
+        monitor.wait_seconds.observe(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
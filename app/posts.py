@@ -0,0 +1,633 @@
+# backend/app/posts.py
+"""
+文章相关的业务逻辑
+
+这里的函数只接收一个同步 Session，不关心它从哪里来：
+- 同步路由（app/main.py）直接传入 get_db 提供的 Session
+- 异步路由（app/routes_async.py）通过 AsyncSession.run_sync 调用，
+  在事件循环里执行同一份代码，不占用线程池
+"""
+import logging
+import os
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import case, func, or_, tuple_
+from sqlalchemy.orm import Session, load_only
+
+from app.cache import TTLCache
+from app.homepage import (
+    HOMEPAGE_SNAPSHOT_SHARED,
+    HOMEPAGE_SNAPSHOT_SIZE,
+    MaterializedHomepage,
+    SnapshotEntry,
+)
+from app.http_cache import (
+    ValidatedResponse,
+    conditional_body,
+    conditional_json,
+    has_conditional_headers,
+    is_not_modified,
+    last_modified_of,
+    not_modified,
+    post_etag,
+    render_json,
+    send_validated,
+)
+from app.model import Article
+from app.pagination import decode_cursor, encode_cursor
+from app.replicas import primary_session
+from app.fields import SUMMARY_LENGTH, Field, columns_for, make_formatter, parse_fields, split_tags
+from app.search import index_article, search_articles, summary_head
+from app.singleflight import SingleFlight
+from app.suggest import index_title, suggest_titles
+from app.tags import tag_counts, tag_filter
+from app.webhooks import publish_post_event
+
+logger = logging.getLogger(__name__)
+
+# 文章URL前缀（与前端配置保持一致）
+POST_URL_PREFIX = "article"
+
+# 列表分页：默认每页条数 / 最大每页条数
+# 不带 limit 的 GET /api/posts 以前返回全部文章，现在只返回第一页，后续页见 X-Next-Cursor
+POSTS_DEFAULT_LIMIT = 20
+POSTS_MAX_LIMIT = 100
+POSTS_LIMIT_DESCRIPTION = (
+    f"每页条数，默认 {POSTS_DEFAULT_LIMIT}（不带 limit 时不再返回全部文章）；"
+    "还有下一页时响应头 X-Next-Cursor 为下一页的 cursor"
+)
+
+# 标签列表：默认条数 / 最大条数
+TAGS_DEFAULT_LIMIT = 100
+TAGS_MAX_LIMIT = 1000
+
+# 搜索分页：默认条数 / 最大条数
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# 标题自动补全：默认条数 / 最大条数 / 前缀最大长度
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MAX_PREFIX = 100
+
+# 单篇文章缓存：缓存格式化好的响应，键为 ("id", id) / ("slug", slug)
+# POST_CACHE_SIZE=0 关闭缓存
+post_cache = TTLCache(
+    maxsize=int(os.getenv("POST_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("POST_CACHE_TTL", "60")),
+)
+
+# 404 缓存：最近查过、不存在的 id / slug（爬虫反复访问不存在的地址时不再查库）
+# 键和 post_cache 相同；文章写入时失效，TTL 短，POST_MISS_CACHE_SIZE=0 关闭
+missing_posts = TTLCache(
+    maxsize=int(os.getenv("POST_MISS_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("POST_MISS_CACHE_TTL", "10")),
+)
+# 每次文章写入加一；查询前后不一致说明期间有写入，这次的 404 不记录
+_write_generation = 0
+
+# 并发的相同读请求合并为一次查询（见 app/singleflight.py）
+# 键里带上 _write_generation：写入之后到达的请求不会共享写入之前开始的查询
+post_flights = SingleFlight("posts")
+search_flights = SingleFlight("search")
+
+# 列表精简模式只加载这些列，不读取 content
+LIST_COLUMNS = (Article.id, Article.title, Article.slug, Article.tags, Article.summary, Article.created_at)
+# 首页快照另外需要 updated_at，用来判断副本上的文章和快照是否一致
+HOMEPAGE_COLUMNS = LIST_COLUMNS + (Article.updated_at,)
+
+# 单篇文章的校验器只需要这几列（不加载 content）
+VALIDATOR_COLUMNS = (Article.id, Article.created_at, Article.updated_at)
+
+
+class PostCreate(BaseModel):
+    title: str
+    content: str
+    tags: Optional[List[str]] = None
+    slug: Optional[str] = None
+
+
+# 生成摘要：超过 SUMMARY_LENGTH 时截断并加 "..."
+def make_summary(text: Optional[str]) -> str:
+    if text and len(text) > SUMMARY_LENGTH:
+        return text[:SUMMARY_LENGTH] + "..."
+    return text or ""
+
+
+def summary_of(post, summary_source: Optional[str]) -> str:
+    """优先使用持久化的 summary；还没有回填的旧数据由 summary_source（content 或其前缀）生成"""
+    summary = getattr(post, "summary", None)
+    if summary is not None:
+        return summary
+    return make_summary(summary_source)
+
+
+# 格式化文章响应数据（统一格式）
+def format_post_response(post: Article, include_content: bool = True, summary_source: Optional[str] = None) -> dict:
+    """
+    将数据库文章对象格式化为前端需要的格式
+    返回的 href 格式为: /article/{slug}
+    - summary 优先使用 post.summary 列
+    - include_content=False 时不访问 post.content（避免触发延迟加载），
+      没有 summary 的旧数据由 summary_source（content 的前缀）生成
+    """
+    # 获取 slug，如果没有则使用 id
+    slug = post.slug or str(post.id)
+
+    # 处理 tags
+    tags = []
+    if post.tags:
+        if isinstance(post.tags, str):
+            tags = split_tags(post.tags)
+        elif isinstance(post.tags, list):
+            tags = post.tags
+
+    # 处理日期
+    created_at = None
+    if post.created_at:
+        if isinstance(post.created_at, datetime):
+            created_at = post.created_at.isoformat()
+        else:
+            created_at = str(post.created_at)
+
+    # 构建响应 - href 使用 /article/{slug} 格式
+    response = {
+        "id": post.id,
+        "title": post.title,
+        "slug": slug,
+        "href": f"/{POST_URL_PREFIX}/{slug}",  # 格式: /article/{slug}
+    }
+    if include_content:
+        response["content"] = post.content or ""
+        response["summary"] = summary_of(post, post.content)
+    else:
+        response["summary"] = summary_of(post, summary_source)
+    response["tags"] = tags
+    response["type"] = "Post"
+    response["status"] = "Published"
+
+    # 添加可选字段
+    if created_at:
+        response["created_at"] = created_at
+        response["createdTime"] = created_at
+        response["date"] = {
+            "start_date": created_at.split("T")[0] if "T" in created_at else created_at
+        }
+
+    return response
+
+
+# ---------------------------------------------------------------------------
+# ?fields=：只查询、只格式化被请求的字段
+# ---------------------------------------------------------------------------
+
+
+class PostFields(NamedTuple):
+    """字段取值的输入：文章（只加载了部分列）+ 摘要来源 + 搜索高亮片段"""
+    post: Article
+    summary_source: Optional[str] = None
+    snippet: str = ""
+
+
+def _slug_of(row: PostFields) -> str:
+    return row.post.slug or str(row.post.id)
+
+
+def _created_at_of(row: PostFields) -> Optional[str]:
+    return row.post.created_at.isoformat() if row.post.created_at else None
+
+
+# 和 format_post_response 的输出字段一一对应（created_at 为空时值为 null）
+POST_FIELDS = {
+    "id": Field((Article.id,), lambda r: r.post.id),
+    "title": Field((Article.title,), lambda r: r.post.title),
+    "slug": Field((Article.slug,), _slug_of),
+    "href": Field((Article.slug,), lambda r: f"/{POST_URL_PREFIX}/{_slug_of(r)}"),
+    "content": Field((Article.content,), lambda r: r.post.content or ""),
+    "summary": Field((Article.summary,), lambda r: summary_of(r.post, r.summary_source)),
+    "tags": Field((Article.tags,), lambda r: split_tags(r.post.tags)),
+    "type": Field((), lambda r: "Post"),
+    "status": Field((), lambda r: "Published"),
+    "created_at": Field((Article.created_at,), _created_at_of),
+    "createdTime": Field((Article.created_at,), _created_at_of),
+    "date": Field(
+        (Article.created_at,),
+        lambda r: {"start_date": r.post.created_at.date().isoformat()} if r.post.created_at else None,
+    ),
+}
+
+# 和 search_posts_response 的输出字段一一对应
+SEARCH_FIELDS = {
+    **{name: POST_FIELDS[name] for name in ("id", "title", "summary", "tags", "slug", "href")},
+    "snippet": Field((), lambda r: r.snippet),
+}
+
+
+def _requested_fields(fields: Optional[str], available) -> Optional[List[str]]:
+    """没有 fields 参数时返回 None（走原来的完整格式）；有未知字段时返回 400"""
+    if fields is None:
+        return None
+    try:
+        return parse_fields(fields, available)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _fields_query(db: Session, names: List[str], always=(Article.id,)):
+    """
+    只加载 names 用到的列；返回 (query, 是否带 content 前缀列)
+    要 summary 不要 content 时，和精简列表一样由 SQL 截取 content 前缀（summary 未回填时用）
+    """
+    options = load_only(*columns_for(names, POST_FIELDS, always))
+    if "summary" in names and "content" not in names:
+        return db.query(Article, summary_head()).options(options), True
+    return db.query(Article).options(options), False
+
+
+def _field_row(row, with_head: bool, names: List[str]) -> PostFields:
+    if with_head:
+        post, head = row
+        return PostFields(post, head)
+    # 没有请求 content 时不访问它（未加载的列会触发延迟加载）
+    return PostFields(row, row.content if "content" in names else None)
+
+
+def list_posts(
+    db: Session,
+    request: Request,
+    limit: int,
+    cursor: Optional[str],
+    include_content: bool,
+    tag: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Response:
+    """
+    获取文章列表（keyset 分页）
+    - 按 (created_at, id) 倒序，每页 limit 条
+    - tag：只返回带这个标签的文章（通过 article_tags 索引筛选，见 app/tags.py）
+    - 还有下一页时，游标放在响应头 X-Next-Cursor，下次请求带上 ?cursor=
+    - include_content=false 时不从数据库读取 content，只读 summary 列
+      （summary 尚未回填的行由 SQL 截取 content 前缀）
+    - ETag 为响应体哈希，If-None-Match 命中时返回 304
+    - 不带 tag 时先查首页快照（见 app/homepage.py），命中时不查询数据库；
+      快照从主库加载（db 是副本时也一样），SQL 返回的完整格式补进快照（副本的结果同样可以，见 fill）
+    - fields="id,title,slug"：只查询、只返回这些字段（此时忽略 include_content，不走快照）
+    """
+    names = _requested_fields(fields, POST_FIELDS)
+    if names is None and not tag and homepage.enabled:
+        page = homepage.page(limit, cursor, include_content)
+        if page is None and cursor is None and homepage.needs_load() and homepage.load(primary_session(db)):
+            page = homepage.page(limit, cursor, include_content)
+        if page is not None:
+            body, etag, next_cursor = page
+            return conditional_body(request, body, etag, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+    # 查询前的写入计数：查询期间有写入时，查询结果不补进快照
+    generation = homepage.generation
+    with_head = False
+    if names is not None:
+        # 游标需要 created_at 和 id
+        query, with_head = _fields_query(db, names, always=(Article.id, Article.created_at))
+    elif include_content:
+        query = db.query(Article)
+    else:
+        # summary_head 多取 1 个字符，用于判断是否需要 "..."
+        query = db.query(Article, summary_head()).options(load_only(*LIST_COLUMNS))
+
+    if tag:
+        query = tag_filter(query, tag)
+
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(Article.created_at, Article.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    # 多取一条用来判断是否还有下一页
+    rows = query.order_by(Article.created_at.desc(), Article.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if names is not None:
+        format_row = make_formatter(names, POST_FIELDS)
+        posts = [format_row(_field_row(row, with_head, names)) for row in rows]
+        last = (rows[-1][0] if with_head else rows[-1]) if rows else None
+    elif include_content:
+        posts = [format_post_response(p) for p in rows]
+        last = rows[-1] if rows else None
+        if not tag and homepage.enabled:
+            unfilled = homepage.unfilled(p.id for p in rows)
+            if unfilled:
+                entries = (snapshot_entry(p) for p in rows if p.id in unfilled)
+                homepage.fill(generation, {entry.id: entry for entry in entries if entry is not None})
+    else:
+        posts = [format_post_response(p, include_content=False, summary_source=head) for p, head in rows]
+        last = rows[-1][0] if rows else None
+
+    headers = {}
+    if has_more and last is not None and last.created_at is not None:
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    return conditional_json(request, posts, headers)
+
+
+def snapshot_entry(post: Article, head: Optional[str] = None, full: bool = True) -> Optional[SnapshotEntry]:
+    """
+    首页快照里的一篇：完整 / 精简两种格式各序列化一次
+    full=False 时 post 只加载了 HOMEPAGE_COLUMNS（head 为正文前缀），只生成精简格式
+    """
+    if post.created_at is None:
+        return None
+    return SnapshotEntry(
+        encode_cursor(post.created_at, post.id),
+        post.id,
+        post.created_at,
+        render_json(format_post_response(post)) if full else None,
+        render_json(format_post_response(post, include_content=False, summary_source=post.content if full else head)),
+        post.updated_at,
+    )
+
+
+def _load_homepage(db: Session, n: int):
+    """和列表精简模式读取同样的列（不读 content）；完整格式由 list_posts 补上"""
+    rows = (
+        db.query(Article, summary_head())
+        .options(load_only(*HOMEPAGE_COLUMNS))
+        .order_by(Article.created_at.desc(), Article.id.desc())
+        .limit(n + 1)
+        .all()
+    )
+    entries = [snapshot_entry(p, head, full=False) for p, head in rows[:n]]
+    if any(entry is None for entry in entries):
+        return None
+    return entries, len(rows) <= n
+
+
+# 首页快照（不带 tag 的列表前 HOMEPAGE_SNAPSHOT_SIZE 篇），见 app/homepage.py
+homepage = MaterializedHomepage(HOMEPAGE_SNAPSHOT_SIZE, _load_homepage, shared=HOMEPAGE_SNAPSHOT_SHARED)
+
+
+def create_article(db: Session, post: PostCreate) -> dict:
+    """
+    创建新文章
+    - 将文章保存到数据库
+    - n8n webhook 由 on_post_written 交给后台任务异步发送（见 app/webhooks.py），不阻塞响应
+    """
+    # 将 tags 列表转为字符串存储
+    tags_str = ",".join(post.tags) if post.tags else None
+    article = Article(
+        title=post.title,
+        content=post.content,
+        tags=tags_str,
+        slug=post.slug,
+        summary=make_summary(post.content),
+    )
+    db.add(article)
+    db.commit()
+    db.refresh(article)
+
+    # 格式化响应
+    response = format_post_response(article)
+
+    on_post_written(article)
+
+    logger.info(f"Post created successfully: id={article.id}, title={article.title}, slug={article.slug}")
+    return response
+
+
+# 文章写入（提交）之后需要同步更新的进程内状态都放在这里
+def on_post_written(article: Article) -> None:
+    global _write_generation
+    # BM25 内存索引增量追加
+    index_article(article)
+    # 标题补全内存索引
+    index_title(article)
+    # 文章事件（n8n webhook）：只入队，由后台任务批量发送
+    publish_post_event(article)
+    # 首页快照：插入新文章、去掉末尾超出容量的文章
+    homepage.apply(snapshot_entry(article), article.id)
+    # 单篇缓存和 404 缓存失效：新文章的 id、slug，以及可能被当作 slug 查询的 id 字符串
+    _write_generation += 1
+    keys = (("id", article.id), ("slug", article.slug), ("slug", str(article.id)))
+    post_cache.invalidate(*keys)
+    missing_posts.invalidate(*keys)
+
+
+def _validated_post(post: Article) -> ValidatedResponse:
+    last_modified = last_modified_of(post.created_at, getattr(post, "updated_at", None))
+    body = render_json(format_post_response(post))
+    return ValidatedResponse(body, post_etag(post.id, last_modified), last_modified)
+
+
+def _not_modified_from_validators(request: Request, row) -> Optional[Response]:
+    """用 (id, created_at, updated_at) 判断是否可以直接返回 304"""
+    last_modified = last_modified_of(row.created_at, row.updated_at)
+    etag = post_etag(row.id, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    return None
+
+
+def _filter_by_slug(query, slug: str):
+    """
+    按 slug 查找，slug 是数字时也把它当作 id 查找（兼容性处理）
+    - 一条查询同时匹配 slug 和 id，slug 命中的行优先
+    """
+    try:
+        post_id = int(slug)
+    except ValueError:
+        return query.filter(Article.slug == slug)
+    return query.filter(or_(Article.slug == slug, Article.id == post_id)).order_by(
+        case((Article.slug == slug, 0), else_=1)
+    )
+
+
+def _find_by_slug(db: Session, slug: str, *entities):
+    return _filter_by_slug(db.query(*(entities or (Article,))), slug).first()
+
+
+def _post_not_found(db: Session, key, generation: int) -> HTTPException:
+    """
+    记录 404（查询期间没有新的写入时才记录，避免把刚创建的文章记成不存在）
+    从只读副本查询时不记录：可能只是还没有复制过来（见 app/replicas.py）
+    """
+    if generation == _write_generation and "replica" not in db.info:
+        missing_posts.set(key, True)
+    return HTTPException(status_code=404, detail="Post not found")
+
+
+def _fetch_post(db: Session, key, find) -> ValidatedResponse:
+    """
+    缓存未命中时加载并缓存一篇文章；同一篇文章的并发加载合并为一次（见 app/singleflight.py）
+    从副本和主库读取的请求分开合并：读己之写的请求不会拿到副本上的旧结果
+    """
+    flight = (key, db.info.get("replica"), _write_generation)
+
+    def load() -> ValidatedResponse:
+        generation = _write_generation
+        post = find()
+        if not post:
+            raise _post_not_found(db, key, generation)
+        cached = _validated_post(post)
+        post_cache.set(key, cached)
+        return cached
+
+    return post_flights.do(flight, load)
+
+
+def _read_post_fields(db: Session, request: Request, key, names: List[str], lookup) -> Response:
+    """?fields= 的单篇文章：只加载请求的列，不使用单篇缓存（缓存的是完整响应）"""
+    if missing_posts.get(key):
+        raise HTTPException(status_code=404, detail="Post not found")
+    query, with_head = _fields_query(db, names)
+
+    def load() -> dict:
+        generation = _write_generation
+        row = lookup(query).first()
+        if row is None:
+            raise _post_not_found(db, key, generation)
+        return make_formatter(names, POST_FIELDS)(_field_row(row, with_head, names))
+
+    flight = (key, tuple(names), db.info.get("replica"), _write_generation)
+    return conditional_json(request, post_flights.do(flight, load))
+
+
+def read_post_by_id(db: Session, request: Request, post_id: int, fields: Optional[str] = None):
+    """
+    通过 ID 获取单篇文章
+    - 命中缓存时直接用缓存的校验器判断 304，不访问数据库
+    - 最近查过不存在的 id 直接返回 404
+    - 带条件请求头时先只查校验列，命中 304 就不再加载 content
+    - fields：只查询、只返回这些字段
+    """
+    key = ("id", post_id)
+    names = _requested_fields(fields, POST_FIELDS)
+    if names is not None:
+        return _read_post_fields(db, request, key, names, lambda query: query.filter(Article.id == post_id))
+    cached = post_cache.get(key)
+    if cached is not None:
+        return send_validated(request, cached)
+    if missing_posts.get(key):
+        raise HTTPException(status_code=404, detail="Post not found")
+    generation = _write_generation
+
+    if has_conditional_headers(request):
+        row = db.query(*VALIDATOR_COLUMNS).filter(Article.id == post_id).first()
+        if not row:
+            raise _post_not_found(db, key, generation)
+        unchanged = _not_modified_from_validators(request, row)
+        if unchanged is not None:
+            return unchanged
+
+    cached = _fetch_post(db, key, lambda: db.query(Article).filter(Article.id == post_id).first())
+    return send_validated(request, cached)
+
+
+def read_post_by_slug(db: Session, request: Request, slug: str, fields: Optional[str] = None):
+    """通过 slug 获取单篇文章，缓存、404 缓存、条件请求与 fields 的处理同 read_post_by_id"""
+    key = ("slug", slug)
+    names = _requested_fields(fields, POST_FIELDS)
+    if names is not None:
+        return _read_post_fields(db, request, key, names, lambda query: _filter_by_slug(query, slug))
+    cached = post_cache.get(key)
+    if cached is not None:
+        return send_validated(request, cached)
+    if missing_posts.get(key):
+        raise HTTPException(status_code=404, detail="Post not found")
+    generation = _write_generation
+
+    if has_conditional_headers(request):
+        row = _find_by_slug(db, slug, *VALIDATOR_COLUMNS)
+        if not row:
+            raise _post_not_found(db, key, generation)
+        unchanged = _not_modified_from_validators(request, row)
+        if unchanged is not None:
+            return unchanged
+
+    cached = _fetch_post(db, key, lambda: _find_by_slug(db, slug))
+    return send_validated(request, cached)
+
+
+def warm_post_cache(db: Session, limit: int) -> int:
+    """启动预热：把最新的 limit 篇文章放进单篇缓存（按 id 和 slug 各一份），返回篇数"""
+    posts = db.query(Article).order_by(Article.created_at.desc(), Article.id.desc()).limit(limit).all()
+    for post in posts:
+        cached = _validated_post(post)
+        post_cache.set(("id", post.id), cached)
+        if post.slug:
+            post_cache.set(("slug", post.slug), cached)
+    return len(posts)
+
+
+def search_posts_response(
+    db: Session, request: Request, q: str, limit: int, offset: int, fields: Optional[str] = None
+) -> Response:
+    """
+    搜索文章
+    - 引擎由 SEARCH_ENGINE 决定，见 app/search.py
+    - snippet 为命中位置的高亮片段（<mark>...</mark>）
+    - ETag 为响应体哈希，If-None-Match 命中时返回 304
+    - 相同参数的并发搜索合并为一次查询，共享结果（见 app/singleflight.py）
+    - fields：只查询、只返回这些字段；不要 summary / snippet 时不读取正文
+    """
+    names = _requested_fields(fields, SEARCH_FIELDS)
+
+    def run_fields() -> List[dict]:
+        hits = search_articles(
+            db, q, limit=limit, offset=offset,
+            columns=columns_for(names, SEARCH_FIELDS),
+            summary="summary" in names,
+            snippet="snippet" in names,
+        )
+        format_row = make_formatter(names, SEARCH_FIELDS)
+        return [format_row(PostFields(hit.article, hit.summary_source, hit.snippet)) for hit in hits]
+
+    def run() -> List[dict]:
+        hits = search_articles(db, q, limit=limit, offset=offset)
+        return [
+            {
+                "id": hit.article.id,
+                "title": hit.article.title,
+                "summary": summary_of(hit.article, hit.summary_source),
+                "tags": split_tags(hit.article.tags),
+                "slug": hit.article.slug or str(hit.article.id),
+                "href": f"/{POST_URL_PREFIX}/{hit.article.slug or hit.article.id}",  # 使用 article 前缀
+                "snippet": hit.snippet,
+            }
+            for hit in hits
+        ]
+
+    flight = (q, limit, offset, tuple(names or ()), db.info.get("replica"), _write_generation)
+    results = search_flights.do(flight, run if names is None else run_fields)
+    return conditional_json(request, results)
+
+
+def suggest_posts_response(db: Session, request: Request, prefix: str, limit: int) -> Response:
+    """
+    标题自动补全：标题包含 prefix 的文章（标题开头匹配优先），只返回标题和链接
+    - 引擎由 SUGGEST_ENGINE 决定，见 app/suggest.py；不读取正文
+    """
+    results = [
+        {
+            "id": post_id,
+            "title": title,
+            "slug": slug or str(post_id),
+            "href": f"/{POST_URL_PREFIX}/{slug or post_id}",
+        }
+        for post_id, title, slug in suggest_titles(db, prefix.strip(), limit)
+    ]
+    return conditional_json(request, results)
+
+
+def list_tags_response(db: Session, request: Request, limit: int) -> Response:
+    """
+    标签及其文章数，按文章数倒序
+    - 计数来自 tags.article_count（写入时增量维护），不扫描 articles
+    """
+    tags = [{"name": name, "count": count} for name, count in tag_counts(db, limit)]
+    return conditional_json(request, tags)
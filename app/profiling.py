@@ -0,0 +1,532 @@
+# backend/app/profiling.py
+"""
+按需性能分析 + 慢查询日志，结果写入磁盘上的环形缓冲（每类最多保留 PROFILE_RING_SIZE 个文件）
+
+请求性能分析（默认关闭）：
+- 触发方式：带签名的请求头 X-Profile（PROFILE_SECRET 配置后可用，令牌见 sign_token /
+  `python -m app.profiling token`），或按 PROFILE_SAMPLE_RATE 的比例随机采样
+- 请求期间后台线程每 PROFILE_INTERVAL 秒采样一次调用栈（sys._current_frames），只取这个请求的线程：
+  - 事件循环线程：只在栈里有这个请求的协程时记录（其它请求的协程、事件循环本身不算）
+  - 线程池线程：路由用 ProfiledRoute（app/main.py 的 router）时，同步路由函数执行期间
+    所在的线程登记到这个请求（contextvars 会复制到线程池）
+  按 folded 格式（"线程;模块:函数;... 次数"，可直接生成火焰图）汇总。
+  局限：同步依赖（如 get_db）、路由里自己 run_in_threadpool 的代码、其它后台线程采不到；
+  GIL、连接池等和其它请求共享的资源上的等待只体现为本请求栈上的等待
+- 同时分析的请求最多 PROFILE_MAX_CONCURRENT 个（每个占一个采样线程），超出的请求不做分析
+- 通过签名请求头触发时，响应头 X-Profile-Id 为记录的 id，
+  从 /api/internal/profiles/{id} 读取
+
+慢查询日志：
+- 执行时间超过 SLOW_QUERY_MS 的 SQL 记录语句、参数（截断）、耗时和所属请求；0 关闭
+- 耗时取自 app/metrics.py 的语句计时（add_query_observer），不另外注册游标事件
+- SLOW_QUERY_EXPLAIN_MS（默认 0，不做）：超过它的 SELECT 在后台线程里重新执行一次
+  EXPLAIN (ANALYZE, BUFFERS)（PostgreSQL，事务内执行后回滚，受 statement_timeout 限制；
+  SQLite 为 EXPLAIN QUERY PLAN），同一条语句每 SLOW_QUERY_EXPLAIN_INTERVAL 秒最多一次。
+  ANALYZE 会在数据库上把慢查询再执行一遍，只在排查时打开；其它语句和异步驱动的语句（占位符不同）不做 EXPLAIN
+- 写文件和 EXPLAIN 都在单独的后台线程执行，不占用请求的时间；积压过多时丢弃
+"""
+import contextvars
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from inspect import iscoroutinefunction
+from typing import Dict, List, Optional, Set
+
+from fastapi.routing import APIRoute
+from sqlalchemy.engine import Engine
+
+from app.metrics import add_query_observer, install_sql_timing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "blog-backend-profiles"))
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "200"))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_EXPLAIN_MS = float(os.getenv("SLOW_QUERY_EXPLAIN_MS", "0"))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "60"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# 单条记录的上限：参数长度、保留的栈数
+MAX_PARAMETER_LENGTH = 200
+MAX_STACKS = 300
+# 后台线程最多积压的任务数
+MAX_PENDING = 100
+
+EXEMPT_PREFIXES = ("/api/internal/", "/metrics")
+
+# 栈顶停在这些模块里的线程视为空闲（线程池等任务、事件循环等 IO）
+IDLE_MODULES = ("threading", "queue", "selectors")
+
+_RECORD_ID = re.compile(r"^[0-9a-f]+-\d+$")
+
+# 当前请求（"GET /api/posts"），慢查询记录里标明来源；同步路由在线程池里执行时会被复制过去
+_current_request: contextvars.ContextVar = contextvars.ContextVar("profiling_request", default=None)
+
+
+# ---------------------------------------------------------------------------
+# 磁盘环形缓冲
+# ---------------------------------------------------------------------------
+
+
+class DiskRing:
+    """目录下每条记录一个 JSON 文件，按文件名（纳秒时间戳 + 进程号）排序，超出 size 时删除最旧的"""
+
+    def __init__(self, directory: str, size: int = PROFILE_RING_SIZE):
+        self.directory = directory
+        self.size = size
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and _RECORD_ID.match(name[:-5]))
+
+    @staticmethod
+    def new_id() -> str:
+        return f"{time.time_ns():x}-{os.getpid()}"
+
+    def append(self, record: dict, record_id: Optional[str] = None) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        record_id = record_id or self.new_id()
+        path = os.path.join(self.directory, f"{record_id}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"id": record_id, **record}, f, ensure_ascii=False, default=str)
+        # 先写临时文件再改名：读取时不会读到写了一半的文件
+        os.replace(tmp, path)
+        for old in self._ids()[:-self.size] if self.size > 0 else []:
+            try:
+                os.remove(os.path.join(self.directory, f"{old}.json"))
+            except FileNotFoundError:
+                pass
+        return record_id
+
+    def get(self, record_id: str) -> Optional[dict]:
+        if not _RECORD_ID.match(record_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{record_id}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def recent(self, limit: int) -> List[dict]:
+        """最新的 limit 条，新的在前"""
+        records = []
+        for record_id in reversed(self._ids()):
+            if len(records) >= limit:
+                break
+            record = self.get(record_id)
+            if record is not None:
+                records.append(record)
+        return records
+
+
+profile_ring = DiskRing(os.path.join(PROFILE_DIR, "profiles"))
+slow_query_ring = DiskRing(os.path.join(PROFILE_DIR, "slow_queries"))
+
+
+# ---------------------------------------------------------------------------
+# 后台线程：写文件、EXPLAIN
+# ---------------------------------------------------------------------------
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiling")
+_pending = 0
+_pending_lock = threading.Lock()
+counters = {"profiles": 0, "busy": 0, "slow_queries": 0, "explains": 0, "dropped": 0, "errors": 0}
+
+
+def _submit(fn, *args) -> bool:
+    global _pending
+    with _pending_lock:
+        if _pending >= MAX_PENDING:
+            counters["dropped"] += 1
+            return False
+        _pending += 1
+
+    def run():
+        global _pending
+        try:
+            fn(*args)
+        except Exception:
+            counters["errors"] += 1
+            logger.exception("Profiling task failed")
+        finally:
+            with _pending_lock:
+                _pending -= 1
+
+    _executor.submit(run)
+    return True
+
+
+def flush(timeout: float = 10) -> None:
+    """等待已经提交的后台任务完成（测试和退出时用）"""
+    _executor.submit(lambda: None).result(timeout)
+
+
+# ---------------------------------------------------------------------------
+# 请求性能分析
+# ---------------------------------------------------------------------------
+
+
+def sign_token(expires: int, secret: str = PROFILE_SECRET) -> str:
+    """X-Profile 请求头的值：过期时间（unix 秒）+ HMAC-SHA256 签名"""
+    signature = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_token(token: str, secret: str = PROFILE_SECRET, now: Optional[float] = None) -> bool:
+    if not secret:
+        return False
+    expires, _, _ = token.partition(".")
+    try:
+        if int(expires) < (time.time() if now is None else now):
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(token, sign_token(int(expires), secret))
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def _folded_stack(frame) -> Optional[str]:
+    """
+    调用栈（根在前）；空闲线程（停在锁 / 队列 / select 上、且栈里没有 app 代码）返回 None
+    等待连接池的请求线程同样停在锁上，但栈里有 app 代码，会保留
+    """
+    idle = frame.f_globals.get("__name__", "") in IDLE_MODULES
+    labels = []
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if idle and module.startswith("app.") and module != __name__:
+            idle = False
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    if idle:
+        return None
+    return ";".join(reversed(labels))
+
+
+class RequestThreads:
+    """一个被分析的请求用到的线程：事件循环线程（以 anchor 协程帧为准）+ 正在执行它的同步路由的线程"""
+
+    def __init__(self, loop_thread: int, anchor):
+        self.loop_thread = loop_thread
+        self.anchor = anchor
+        self.workers: Set[int] = set()
+
+    def owns(self, ident: int, frame) -> bool:
+        if ident in self.workers:
+            return True
+        if ident != self.loop_thread:
+            return False
+        while frame is not None:
+            if frame is self.anchor:
+                return True
+            frame = frame.f_back
+        return False
+
+
+# 正在被分析的请求（没有分析时为 None）
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("profiling_threads", default=None)
+
+
+def _registering_thread(call):
+    """同步路由函数：执行期间把所在线程登记到当前被分析的请求"""
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        threads = _current_profile.get()
+        if threads is None:
+            return call(*args, **kwargs)
+        ident = threading.get_ident()
+        threads.workers.add(ident)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            threads.workers.discard(ident)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRouter(route_class=ProfiledRoute)：同步路由在线程池里执行时也能采到本请求的栈"""
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if call is not None and not iscoroutinefunction(call):
+            self.dependant.call = _registering_thread(call)
+        return super().get_route_handler()
+
+
+class StackSampler:
+    """后台线程定时采样一个请求的线程的调用栈"""
+
+    def __init__(self, threads: RequestThreads, interval: float = PROFILE_INTERVAL):
+        self.threads = threads
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if not self.threads.owns(ident, frame):
+                    continue
+                stack = _folded_stack(frame)
+                if stack is not None:
+                    self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+            self.samples += 1
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+
+# 限制同时分析的请求数（每个请求一个采样线程）
+_sampler_slots = threading.BoundedSemaphore(max(PROFILE_MAX_CONCURRENT, 1))
+
+
+def _save_profile(record_id: str, record: dict) -> None:
+    profile_ring.append(record, record_id)
+    counters["profiles"] += 1
+
+
+class ProfilingMiddleware:
+    """纯 ASGI 中间件：记录当前请求（慢查询日志用），按签名请求头或采样率做性能分析"""
+
+    def __init__(
+        self,
+        app,
+        secret: str = PROFILE_SECRET,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval: float = PROFILE_INTERVAL,
+    ):
+        self.app = app
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.interval = interval
+
+    def _trigger(self, scope) -> Optional[str]:
+        if scope["path"].startswith(EXEMPT_PREFIXES):
+            return None
+        if self.secret:
+            for name, value in scope.get("headers", ()):
+                if name == PROFILE_HEADER.encode() and verify_token(value.decode("latin-1"), self.secret):
+                    return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_request.set(f"{scope['method']} {scope['path']}")
+        try:
+            trigger = self._trigger(scope)
+            if trigger is not None and not _sampler_slots.acquire(blocking=False):
+                counters["busy"] += 1
+                trigger = None
+            if trigger is None:
+                await self.app(scope, receive, send)
+            else:
+                try:
+                    await self._profile(scope, receive, send, trigger)
+                finally:
+                    _sampler_slots.release()
+        finally:
+            _current_request.reset(token)
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        # 记录 id 先生成好写进响应头，文件在后台写入
+        record_id = DiskRing.new_id()
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                if trigger == "header":
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (PROFILE_ID_HEADER.lower().encode(), record_id.encode())
+                    ]
+            await send(message)
+
+        # 本协程的帧：事件循环线程上栈里有它的样本才属于这个请求
+        threads = RequestThreads(threading.get_ident(), sys._getframe())
+        profile_token = _current_profile.set(threads)
+        sampler = StackSampler(threads, self.interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            stacks = sampler.stop()
+            _current_profile.reset(profile_token)
+            record = {
+                "kind": "profile",
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status_holder[0],
+                "duration_ms": round(elapsed * 1000, 3),
+                "interval_ms": self.interval * 1000,
+                "samples": sampler.samples,
+                "created_at": time.time(),
+                "stacks": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common(MAX_STACKS)),
+            }
+            _submit(_save_profile, record_id, record)
+
+
+# ---------------------------------------------------------------------------
+# 慢查询日志
+# ---------------------------------------------------------------------------
+
+# 语句 -> 上次 EXPLAIN 的时间
+_explained: Dict[str, float] = {}
+_explained_lock = threading.Lock()
+
+
+def _truncate_parameters(parameters):
+    def short(value):
+        text = repr(value)
+        return text if len(text) <= MAX_PARAMETER_LENGTH else text[:MAX_PARAMETER_LENGTH] + "..."
+
+    if isinstance(parameters, dict):
+        return {key: short(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [short(value) for value in parameters]
+    return short(parameters)
+
+
+def _should_explain(engine: Engine, statement: str, duration_ms: float, executemany: bool) -> bool:
+    if SLOW_QUERY_EXPLAIN_MS <= 0 or duration_ms < SLOW_QUERY_EXPLAIN_MS or executemany:
+        return False
+    # EXPLAIN ANALYZE 会真正执行语句：只对 SELECT 做
+    if engine.dialect.is_async or not statement.lstrip().upper().startswith("SELECT"):
+        return False
+    now = time.monotonic()
+    with _explained_lock:
+        last = _explained.get(statement)
+        if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        if len(_explained) >= 1000:
+            _explained.clear()
+        _explained[statement] = now
+    return True
+
+
+def explain(engine: Engine, statement: str, parameters) -> str:
+    """重新执行一次语句取执行计划（事务内执行，结束时回滚）"""
+    with engine.connect().execution_options(slow_query_log=False) as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+            rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters).all()
+            plan = "\n".join(row[0] for row in rows)
+        else:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plan = "\n".join(" | ".join(str(col) for col in row) for row in rows)
+        conn.rollback()
+    return plan
+
+
+def _save_slow_query(engine: Engine, record: dict, parameters, run_explain: bool) -> None:
+    if run_explain:
+        try:
+            record["plan"] = explain(engine, record["statement"], parameters)
+            counters["explains"] += 1
+        except Exception as e:
+            record["plan_error"] = f"{type(e).__name__}: {e}"
+    slow_query_ring.append(record)
+    counters["slow_queries"] += 1
+
+
+def _observe_query(conn, statement, parameters, context, executemany, elapsed):
+    duration_ms = elapsed * 1000
+    if SLOW_QUERY_MS <= 0 or duration_ms < SLOW_QUERY_MS:
+        return
+    if context is not None and not context.execution_options.get("slow_query_log", True):
+        return
+    engine = conn.engine
+    record = {
+        "kind": "slow_query",
+        "statement": statement,
+        "parameters": _truncate_parameters(parameters),
+        "executemany": executemany,
+        "duration_ms": round(duration_ms, 3),
+        "database": engine.url.render_as_string(hide_password=True),
+        "request": _current_request.get(),
+        "created_at": time.time(),
+    }
+    _submit(_save_slow_query, engine, record, parameters, _should_explain(engine, statement, duration_ms, executemany))
+
+
+_slow_query_log_installed = False
+
+
+def install_slow_query_log() -> None:
+    """接到 app/metrics.py 的语句计时上，对所有引擎（主库、异步、副本）生效"""
+    global _slow_query_log_installed
+    if _slow_query_log_installed:
+        return
+    install_sql_timing()
+    add_query_observer(_observe_query)
+    _slow_query_log_installed = True
+
+
+def stats() -> dict:
+    return {
+        "profiling": {
+            "header": bool(PROFILE_SECRET),
+            "sample_rate": PROFILE_SAMPLE_RATE,
+            "max_concurrent": PROFILE_MAX_CONCURRENT,
+        },
+        "slow_query_ms": SLOW_QUERY_MS,
+        "explain_ms": SLOW_QUERY_EXPLAIN_MS,
+        "directory": PROFILE_DIR,
+        "pending": _pending,
+        **counters,
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.profiling token [有效秒数]：生成 X-Profile 请求头的值
+    if len(sys.argv) >= 2 and sys.argv[1] == "token" and PROFILE_SECRET:
+        ttl = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+        print(sign_token(int(time.time()) + ttl))
+    else:
+        print("usage: PROFILE_SECRET=... python -m app.profiling token [seconds]", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,307 @@
+# backend/app/replicas.py
+"""
+只读副本（DATABASE_READ_URLS）
+
+- DATABASE_READ_URLS：逗号分隔的副本连接串，不配置时所有请求都走主库
+- GET 路由通过 get_read_db / get_async_read_db 获取 session：在健康的副本之间轮询，
+  没有健康副本时退回主库；写接口和启动任务始终用主库
+- 健康检查：后台任务每 REPLICA_HEALTH_INTERVAL 秒对每个副本执行一次 SELECT 1，
+  REPLICA_MAX_LAG > 0 时（PostgreSQL）复制延迟超过这么多秒也视为不健康；
+  请求里连接副本失败时立即标记为不健康，本次请求改用主库
+- 读己之写：写接口的响应带上时间戳（响应头 X-Read-Primary-Until，同时设置同名 cookie），
+  READ_YOUR_WRITES_SECONDS（默认 5）秒内该客户端的读请求走主库，刚创建的文章不会因为复制延迟读不到。
+  跨域部署的前端（fetch 默认不带 cookie）需要把响应头原样放进后续读请求的 X-Read-Primary-Until 请求头；
+  同域的客户端靠 cookie 即可。超出窗口的时间戳（伪造的）不生效
+- 从副本查不到的文章不记入 404 缓存（可能只是还没有复制过来，见 app/posts.py）
+"""
+import asyncio
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.db import get_async_db, get_db, pool_options, to_async_url
+from app.pool_monitor import get_monitor
+
+logger = logging.getLogger(__name__)
+
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "0"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# 值为时间戳（秒），在这之前该客户端的读请求走主库
+PRIMARY_COOKIE = "read_primary_until"
+PRIMARY_HEADER = "X-Read-Primary-Until"
+
+# 备库上最后一次回放的事务距今多少秒；主库上该函数返回 NULL
+LAG_SQL = text("SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)")
+
+
+class Replica:
+    """一个副本：同步 / 异步引擎都在第一次使用时创建"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.healthy = True
+        self.failures = 0
+        self.reads = 0
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._engine = None
+        self._sessionmaker = None
+        self._async_engine = None
+        self._async_sessionmaker = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = create_engine(self.url, **pool_options(self.url, self.name))
+                    get_monitor(self.name).attach(engine)
+                    self._engine = engine
+        return self._engine
+
+    def session(self) -> Session:
+        if self._sessionmaker is None:
+            self._sessionmaker = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+        session = self._sessionmaker()
+        session.info["replica"] = self.name
+        return session
+
+    def async_session(self) -> AsyncSession:
+        if self._async_engine is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            url = to_async_url(self.url)
+            name = f"{self.name}-async"
+            self._async_engine = create_async_engine(url, **pool_options(url, name, use_async=True))
+            get_monitor(name).attach(self._async_engine.sync_engine)
+            self._async_sessionmaker = async_sessionmaker(self._async_engine, autoflush=False, expire_on_commit=False)
+        session = self._async_sessionmaker()
+        session.info["replica"] = self.name
+        return session
+
+    def check(self) -> None:
+        """健康检查：连不上或者延迟超过 REPLICA_MAX_LAG 时抛异常"""
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            if REPLICA_MAX_LAG > 0 and conn.dialect.name == "postgresql":
+                self.lag_seconds = float(conn.execute(LAG_SQL).scalar())
+                if self.lag_seconds > REPLICA_MAX_LAG:
+                    raise RuntimeError(f"replication lag {self.lag_seconds:.1f}s > {REPLICA_MAX_LAG:g}s")
+
+    def pool_stats(self) -> Dict[str, dict]:
+        stats = {}
+        if self._engine is not None:
+            stats[self.name] = get_monitor(self.name).snapshot(self._engine.pool)
+        if self._async_engine is not None:
+            name = f"{self.name}-async"
+            stats[name] = get_monitor(name).snapshot(self._async_engine.sync_engine.pool)
+        return stats
+
+    async def dispose(self) -> None:
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        if self._engine is not None:
+            self._engine.dispose()
+        self._engine = self._async_engine = None
+        self._sessionmaker = self._async_sessionmaker = None
+
+
+class ReplicaSet:
+    def __init__(self, urls: List[str], health_interval: float = REPLICA_HEALTH_INTERVAL):
+        self.replicas = [Replica(f"replica-{i}", url) for i, url in enumerate(urls)]
+        self.health_interval = health_interval
+        # 按原因统计走主库的读请求
+        self.read_your_writes = 0
+        self.fallbacks = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        """从下一个位置开始轮询，返回第一个健康的副本；都不健康时返回 None（退回主库）"""
+        start = next(self._counter)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if replica.healthy:
+                return replica
+        self.count(self, "fallbacks")
+        return None
+
+    def count(self, target, attr: str) -> None:
+        with self._lock:
+            setattr(target, attr, getattr(target, attr) + 1)
+
+    def mark_down(self, replica: Replica, error: Exception) -> None:
+        with self._lock:
+            replica.failures += 1
+            replica.last_error = f"{type(error).__name__}: {error}"
+            was_healthy, replica.healthy = replica.healthy, False
+        if was_healthy:
+            logger.warning("Read replica %s marked unhealthy: %s", replica.name, replica.last_error)
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            try:
+                replica.check()
+            except Exception as e:
+                self.mark_down(replica, e)
+                continue
+            if not replica.healthy:
+                logger.info("Read replica %s is healthy again", replica.name)
+            replica.healthy = True
+
+    # ------------------------------------------------------------------
+    # 生命周期（应用 lifespan 里调用）
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        await run_in_threadpool(self.check_all)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await run_in_threadpool(self.check_all)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.dispose()
+
+    def pool_stats(self) -> Dict[str, dict]:
+        stats = {}
+        for replica in self.replicas:
+            stats.update(replica.pool_stats())
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [
+                {
+                    "name": r.name,
+                    "healthy": r.healthy,
+                    "reads": r.reads,
+                    "failures": r.failures,
+                    "lag_seconds": r.lag_seconds,
+                    "last_error": r.last_error,
+                }
+                for r in self.replicas
+            ],
+            "primary_reads": {"read_your_writes": self.read_your_writes, "fallback": self.fallbacks},
+        }
+
+
+read_replicas = ReplicaSet(DATABASE_READ_URLS)
+
+
+def reads_from_primary(request: Request) -> bool:
+    """读己之写窗口内（请求头或 cookie 里的时间还没到，且不超过一个窗口）"""
+    now = time.time()
+    for value in (request.headers.get(PRIMARY_HEADER), request.cookies.get(PRIMARY_COOKIE)):
+        try:
+            if now < float(value or "") <= now + READ_YOUR_WRITES_SECONDS:
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def mark_written(response: Response) -> Response:
+    """写接口调用：设置读己之写响应头和 cookie"""
+    if read_replicas.enabled and READ_YOUR_WRITES_SECONDS > 0:
+        until = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+        response.headers[PRIMARY_HEADER] = until
+        response.set_cookie(
+            PRIMARY_COOKIE, until, max_age=math.ceil(READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax"
+        )
+    return response
+
+
+def primary_session(db: Session) -> Session:
+    """get_read_db 给出的是副本 session 时，返回同一个请求的主库 session；否则返回 db 本身"""
+    return getattr(db, "info", {}).get("primary_session", db)
+
+
+def _read_target(request: Request) -> Optional[Replica]:
+    """本次读请求用哪个副本；返回 None 表示用主库"""
+    if not read_replicas.enabled:
+        return None
+    if reads_from_primary(request):
+        read_replicas.count(read_replicas, "read_your_writes")
+        return None
+    return read_replicas.pick()
+
+
+# 依赖注入：读请求的 session
+# 主库 session 通过 get_db 获取（创建 Session 不会连接数据库），测试里覆盖 get_db 对读请求同样有效
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    replica = _read_target(request)
+    while replica is not None:
+        db = replica.session()
+        try:
+            # 先借出连接：副本连不上时本次请求还能改用主库
+            db.connection()
+        except exc.DBAPIError as e:
+            db.close()
+            read_replicas.mark_down(replica, e)
+            replica = read_replicas.pick()
+            continue
+        read_replicas.count(replica, "reads")
+        # 需要最新数据的读取（首页快照加载）通过 primary_session 改用主库
+        db.info["primary_session"] = primary
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    yield primary
+
+
+async def get_async_read_db(request: Request, primary: AsyncSession = Depends(get_async_db)):
+    """get_read_db 的异步版本（DB_MODE=async）"""
+    replica = _read_target(request)
+    while replica is not None:
+        db = replica.async_session()
+        try:
+            await db.connection()
+        except exc.DBAPIError as e:
+            await db.close()
+            read_replicas.mark_down(replica, e)
+            replica = read_replicas.pick()
+            continue
+        read_replicas.count(replica, "reads")
+        # run_sync 里拿到的是 sync_session，同样挂上主库的 sync_session
+        db.sync_session.info["primary_session"] = primary.sync_session
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+    yield primary
@@ -0,0 +1,130 @@
+# backend/app/routes_async.py
+"""
+DB_MODE=async 时注册的路由
+
+和 app/main.py 里的同步路由一一对应，参数完全一致。
+GET 路由的 session 来自 get_async_read_db（配置了只读副本时走副本，见 app/replicas.py）。
+业务逻辑复用 app/posts.py：通过 AsyncSession.run_sync 在事件循环里执行，
+数据库 IO 走 asyncpg，不占用 Starlette 线程池。
+"""
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bulk import BULK_BATCH_SIZE, BULK_MAX_BATCH_SIZE, bulk_response, ingest_stream, write_batch
+from app.db import get_async_db
+from app.export import build_export_query, export_response, iter_export_async
+from app.posts import (
+    POSTS_DEFAULT_LIMIT,
+    POSTS_LIMIT_DESCRIPTION,
+    POSTS_MAX_LIMIT,
+    SEARCH_DEFAULT_LIMIT,
+    SEARCH_MAX_LIMIT,
+    SUGGEST_DEFAULT_LIMIT,
+    SUGGEST_MAX_LIMIT,
+    SUGGEST_MAX_PREFIX,
+    TAGS_DEFAULT_LIMIT,
+    TAGS_MAX_LIMIT,
+    PostCreate,
+    create_article,
+    list_posts,
+    list_tags_response,
+    read_post_by_id,
+    read_post_by_slug,
+    search_posts_response,
+    suggest_posts_response,
+)
+from app.replicas import get_async_read_db, mark_written
+
+router = APIRouter()
+
+
+@router.get("/api/posts")
+async def get_posts(
+    request: Request,
+    limit: int = Query(POSTS_DEFAULT_LIMIT, ge=1, le=POSTS_MAX_LIMIT, description=POSTS_LIMIT_DESCRIPTION),
+    cursor: Optional[str] = None,
+    include_content: bool = True,
+    tag: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await db.run_sync(list_posts, request, limit, cursor, include_content, tag, fields)
+
+
+@router.post("/api/posts")
+async def create_post(post: PostCreate, response: Response, db: AsyncSession = Depends(get_async_db)):
+    created = await db.run_sync(create_article, post)
+    mark_written(response)
+    return created
+
+
+@router.post("/api/posts/bulk")
+async def bulk_create_posts(
+    request: Request,
+    on_conflict: Literal["skip", "upsert", "fail"] = "skip",
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=BULK_MAX_BATCH_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def write(batch, summary):
+        await db.run_sync(write_batch, batch, on_conflict, summary)
+
+    summary = await ingest_stream(request.stream(), on_conflict, batch_size, write)
+    return mark_written(bulk_response(summary))
+
+
+@router.get("/api/posts/export")
+async def export_posts(
+    since: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    stmt, names = build_export_query(since, fields)
+    return export_response(iter_export_async(db, stmt, names))
+
+
+@router.get("/api/posts/{post_id}")
+async def get_post_by_id(
+    post_id: int, request: Request, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(read_post_by_id, request, post_id, fields)
+
+
+@router.get("/api/post/slug/{slug}")
+async def get_post_by_slug(
+    slug: str, request: Request, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(read_post_by_slug, request, slug, fields)
+
+
+@router.get("/api/tags")
+async def get_tags(
+    request: Request,
+    limit: int = Query(TAGS_DEFAULT_LIMIT, ge=1, le=TAGS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await db.run_sync(list_tags_response, request, limit)
+
+
+@router.get("/api/search")
+async def search_posts(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await db.run_sync(search_posts_response, request, q, limit, offset, fields)
+
+
+@router.get("/api/search/suggest")
+async def suggest_posts(
+    request: Request,
+    prefix: str = Query(..., min_length=1, max_length=SUGGEST_MAX_PREFIX),
+    limit: int = Query(SUGGEST_DEFAULT_LIMIT, ge=1, le=SUGGEST_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await db.run_sync(suggest_posts_response, request, prefix, limit)
@@ -0,0 +1,217 @@
+# backend/app/search.py
+"""
+文章搜索引擎
+
+- fts：PostgreSQL 全文检索。articles.search_vector 是由 title/content 生成的
+  tsvector 列（带 GIN 索引，见 migrations/versions/0002），用 websearch_to_tsquery 解析
+  用户输入，按 ts_rank 排序，ts_headline 生成高亮片段。content 不离开数据库。
+- ilike：原来的 ILIKE 模糊匹配，作为不支持 FTS 的数据库（如 SQLite）的兜底。
+- bm25：进程内倒排索引（app/search_index.py），启动时构建，写入时增量更新，
+  查询不访问数据库；索引未就绪或超出内存预算时退回 SQL 引擎（fts/ilike）。
+
+通过环境变量 SEARCH_ENGINE 选择：auto（默认，PostgreSQL 用 fts，其它用 ilike）/ fts / ilike / bm25
+含中日韩文字的查询不走 fts：simple 配置不切分中文，连续的一串中文是一个词，
+搜其中一部分（"性能" 之于 "数据库性能优化"）匹配不到，这类查询改用 ilike（子串匹配）
+"""
+import html
+import logging
+import os
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import case, func, literal, literal_column, null
+from sqlalchemy.orm import Query, Session, load_only
+
+from app.model import Article
+from app.fields import SUMMARY_HEAD_LENGTH
+from app.search_index import BM25Index, IndexFullError, build_from_rows
+
+logger = logging.getLogger(__name__)
+
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "auto").lower()
+
+# 进程内 BM25 索引（只有 SEARCH_ENGINE=bm25 时才会构建）
+bm25_index = BM25Index(max_memory_bytes=int(os.getenv("BM25_MAX_MEMORY_MB", "256")) * 1024 * 1024)
+
+# 全文检索使用的文本配置，必须和 search_vector 生成列里的一致
+# （migrations/versions/0002_listing_and_search_indexes.py，标题权重 A，正文权重 B）
+# simple 不做词干化；但它不切分中文，含中文的查询由 resolve_engine 改走 ilike
+FTS_CONFIG = "simple"
+
+# 中日韩文字（和 app/search_index.py / app/suggest.py 一样按单字处理）
+CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+# 高亮标记与片段长度
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+SNIPPET_RADIUS = 80
+HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    "MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter= ... "
+)
+
+# 搜索结果只需要这些列
+SEARCH_COLUMNS = (Article.id, Article.title, Article.slug, Article.tags, Article.summary, Article.created_at)
+
+
+def summary_head(length: int = SUMMARY_HEAD_LENGTH):
+    """只有 summary 还是 NULL（尚未回填）的行才读取 content 前缀，其余行返回 NULL"""
+    return case((Article.summary.is_(None), func.substr(Article.content, 1, length))).label("summary_head")
+
+
+class SearchHit(NamedTuple):
+    """一条搜索结果：文章（可能只加载了部分列）+ 摘要来源 + 高亮片段 + 得分"""
+    article: Article
+    summary_source: Optional[str]
+    snippet: str
+    rank: float
+
+
+def resolve_engine(db: Session, q: Optional[str] = None) -> str:
+    """根据配置、当前数据库方言和查询内容（含中文时不用 fts）决定使用哪个引擎"""
+    if SEARCH_ENGINE == "bm25" and bm25_index.ready:
+        return "bm25"
+    if SEARCH_ENGINE in ("fts", "ilike"):
+        engine = SEARCH_ENGINE
+    else:
+        get_bind = getattr(db, "get_bind", None)
+        engine = "fts" if get_bind is not None and get_bind().dialect.name == "postgresql" else "ilike"
+    if engine == "fts" and q and CJK_RE.search(q):
+        return "ilike"
+    return engine
+
+
+def search_articles(
+    db: Session,
+    q: str,
+    limit: int,
+    offset: int = 0,
+    columns: Sequence = SEARCH_COLUMNS,
+    summary: bool = True,
+    snippet: bool = True,
+) -> List[SearchHit]:
+    """
+    按配置的引擎搜索文章
+    - columns：文章只加载这些列（?fields= 只要一部分字段时）
+    - summary / snippet 为 False 时不读取正文前缀、不生成高亮片段
+    """
+    engine = resolve_engine(db, q)
+    if engine == "bm25":
+        return search_bm25(q, limit, offset)
+    if engine == "fts":
+        return search_fts(db, q, limit, offset, columns, summary, snippet)
+    return search_ilike(db, q, limit, offset, columns, summary, snippet)
+
+
+def search_bm25(q: str, limit: int, offset: int = 0) -> List[SearchHit]:
+    """内存索引只保存了正文前缀，高亮片段基于标题/前缀生成"""
+    return [
+        SearchHit(doc, doc.summary_head, highlight_snippet(doc.summary_head or doc.title, q), score)
+        for doc, score in bm25_index.search(q, limit, offset)
+    ]
+
+
+def build_bm25_index(db: Session) -> bool:
+    """从 articles 表构建 BM25 索引（流式读取，不一次性加载全表）"""
+    rows = (
+        db.query(Article.id, Article.title, Article.content, Article.slug, Article.tags, Article.created_at)
+        .order_by(Article.id)
+        .execution_options(yield_per=1000)
+    )
+    return build_from_rows(bm25_index, rows)
+
+
+def index_article(article: Article) -> None:
+    """create_post 提交后把新文章追加到索引；超出预算时停用索引"""
+    if SEARCH_ENGINE != "bm25" or not bm25_index.ready:
+        return
+    try:
+        bm25_index.add(article.id, article.title, article.content, article.slug, article.tags, article.created_at)
+    except IndexFullError as e:
+        logger.warning("%s; disabling BM25 index", e)
+        bm25_index.reset()
+
+
+def build_fts_query(
+    db: Session, q: str, columns: Sequence = SEARCH_COLUMNS, summary: bool = True, snippet: bool = True
+) -> Query:
+    """构造全文检索查询（不含分页），返回 (Article, summary_head, snippet, rank) 行"""
+    tsquery = func.websearch_to_tsquery(FTS_CONFIG, q)
+    vector = literal_column("articles.search_vector")
+    rank = func.ts_rank(vector, tsquery).label("rank")
+    # 不需要时不执行 ts_headline（要读取并处理整篇正文）
+    headline = (
+        func.ts_headline(FTS_CONFIG, Article.content, tsquery, HEADLINE_OPTIONS) if snippet else literal("")
+    ).label("snippet")
+    head = summary_head() if summary else null().label("summary_head")
+    return (
+        db.query(Article, head, headline, rank)
+        .options(load_only(*columns))
+        .filter(vector.op("@@")(tsquery))
+        .order_by(rank.desc(), Article.id.desc())
+    )
+
+
+def search_fts(
+    db: Session, q: str, limit: int, offset: int = 0,
+    columns: Sequence = SEARCH_COLUMNS, summary: bool = True, snippet: bool = True,
+) -> List[SearchHit]:
+    rows = build_fts_query(db, q, columns, summary, snippet).offset(offset).limit(limit).all()
+    return [SearchHit(article, head, snippet or "", float(rank or 0)) for article, head, snippet, rank in rows]
+
+
+def escape_like(value: str) -> str:
+    """转义 LIKE 通配符，让用户输入的 % 和 _ 按字面匹配"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_ilike(
+    db: Session, q: str, limit: int, offset: int = 0,
+    columns: Sequence = SEARCH_COLUMNS, summary: bool = True, snippet: bool = True,
+) -> List[SearchHit]:
+    """ILIKE 兜底：没有相关度，按时间倒序；摘要和高亮片段都不要时不加载正文"""
+    pattern = f"%{escape_like(q)}%"
+    query = db.query(Article)
+    if not (summary or snippet):
+        query = query.options(load_only(*columns))
+    results = (
+        query.filter((Article.title.ilike(pattern, escape="\\")) | (Article.content.ilike(pattern, escape="\\")))
+        .order_by(Article.created_at.desc(), Article.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    return [
+        SearchHit(
+            p,
+            p.content if summary else None,
+            highlight_snippet(p.content or p.title or "", q) if snippet else "",
+            0.0,
+        )
+        for p in results
+    ]
+
+
+def highlight_snippet(text: str, q: str) -> str:
+    """
+    在 text 中找到 q 第一次出现的位置，截取前后 SNIPPET_RADIUS 个字符并高亮
+    - 找不到时返回开头一段
+    - 和 ts_headline 保持一致的标记，其余内容做 HTML 转义
+    """
+    match = re.search(re.escape(q), text, re.IGNORECASE) if q else None
+    if not match:
+        head = text[: SNIPPET_RADIUS * 2]
+        return html.escape(head) + (" ..." if len(text) > len(head) else "")
+
+    start = max(match.start() - SNIPPET_RADIUS, 0)
+    end = min(match.end() + SNIPPET_RADIUS, len(text))
+    snippet = (
+        html.escape(text[start:match.start()])
+        + HIGHLIGHT_START + html.escape(match.group(0)) + HIGHLIGHT_STOP
+        + html.escape(text[match.end():end])
+    )
+    if start > 0:
+        snippet = "... " + snippet
+    if end < len(text):
+        snippet = snippet + " ..."
+    return snippet
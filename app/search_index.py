@@ -0,0 +1,221 @@
+# backend/app/search_index.py
+"""
+进程内 BM25 倒排索引（SEARCH_ENGINE=bm25 时使用）
+
+适合小规格的只读副本：启动时从 articles 表构建，create_post 提交后增量追加，
+/api/search 直接在内存里打分，不访问数据库。
+
+数据结构（紧凑存储，避免 dict 套 dict）：
+- 每篇文章占一个 slot（连续整数），slot -> 文章 id / 文档长度 都是 array
+- 每个词一个倒排表：两条平行的 array('I')，分别是 slot 和词频
+- 文章元数据（标题、slug、tags、摘要前缀）是一个 tuple，用于直接生成响应
+
+内存预算（BM25_MAX_MEMORY_MB，默认 256）按下面的估算累加：
+- 每条 posting 8 字节（4 字节 slot + 4 字节词频）
+- 每个不同的词约 TERM_OVERHEAD_BYTES（词典条目 + 两个 array 对象 + 字符串）
+- 每篇文章约 DOC_OVERHEAD_BYTES + 元数据字符串长度（摘要只存前 fields.SUMMARY_HEAD_LENGTH 个字符）
+超出预算时停止追加，索引标记为不可用，搜索退回 SQL 引擎，并打印告警。
+
+注意：每个 worker 进程各自持有一份索引，其它进程写入的文章要等该进程重启后才能搜到。
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.fields import SUMMARY_HEAD_LENGTH
+
+logger = logging.getLogger(__name__)
+
+# BM25 参数
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+# 标题中的词按多少倍词频计入（简化版 BM25F）
+TITLE_BOOST = 2
+
+# 内存估算常量（CPython 64 位的经验值，偏保守）
+POSTING_BYTES = 8
+TERM_OVERHEAD_BYTES = 240
+DOC_OVERHEAD_BYTES = 320
+
+
+# 分词：中文按单字切分，其它按连续的字母/数字切分
+TOKEN_RE = re.compile(r"[\u4e00-\u9fff]|[^\W_\u4e00-\u9fff]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+
+class IndexedDoc(NamedTuple):
+    """索引里保存的文章元数据，属性名和 Article 一致，可直接交给格式化函数"""
+    id: int
+    title: str
+    slug: Optional[str]
+    tags: Optional[str]
+    created_at: object
+    summary_head: str
+
+
+class IndexFullError(RuntimeError):
+    """追加文章会超出内存预算"""
+
+
+class BM25Index:
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B, max_memory_bytes: int = 256 * 1024 * 1024):
+        self.k1 = k1
+        self.b = b
+        self.max_memory_bytes = max_memory_bytes
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._term_ids: Dict[str, int] = {}
+            self._posting_slots: List[array] = []
+            self._posting_tfs: List[array] = []
+            self._doc_ids = array("q")
+            self._doc_lens = array("I")
+            self._live = bytearray()
+            self._docs: List[Optional[IndexedDoc]] = []
+            self._slot_of: Dict[int, int] = {}
+            self._total_len = 0
+            self._live_count = 0
+            self._memory_bytes = 0
+            self.ready = False
+
+    # ---- 写入 ----
+
+    def add(self, post_id: int, title: str, content: Optional[str], slug: Optional[str] = None,
+            tags: Optional[str] = None, created_at: object = None) -> None:
+        """
+        追加（或替换）一篇文章
+        - 同一个 id 再次写入时，旧 slot 标记为删除，新内容占用新 slot
+        - 超出内存预算时抛出 IndexFullError，索引内容保持不变
+        """
+        tfs: Dict[str, int] = {}
+        for term in tokenize(title):
+            tfs[term] = tfs.get(term, 0) + TITLE_BOOST
+        for term in tokenize(content):
+            tfs[term] = tfs.get(term, 0) + 1
+
+        doc = IndexedDoc(post_id, title, slug, tags, created_at, (content or "")[:SUMMARY_HEAD_LENGTH])
+
+        with self._lock:
+            new_terms = sum(1 for t in tfs if t not in self._term_ids)
+            cost = (
+                len(tfs) * POSTING_BYTES
+                + new_terms * TERM_OVERHEAD_BYTES
+                + DOC_OVERHEAD_BYTES + len(title or "") + len(slug or "") + len(tags or "") + len(doc.summary_head)
+            )
+            if self._memory_bytes + cost > self.max_memory_bytes:
+                raise IndexFullError(
+                    f"BM25 index would exceed its memory budget ({self.max_memory_bytes} bytes)"
+                )
+
+            old_slot = self._slot_of.get(post_id)
+            if old_slot is not None:
+                self._remove_slot(old_slot)
+
+            slot = len(self._doc_ids)
+            doc_len = sum(tfs.values())
+            self._doc_ids.append(post_id)
+            self._doc_lens.append(doc_len)
+            self._live.append(1)
+            self._docs.append(doc)
+            self._slot_of[post_id] = slot
+            self._total_len += doc_len
+            self._live_count += 1
+
+            for term, tf in tfs.items():
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    term_id = len(self._posting_slots)
+                    self._term_ids[term] = term_id
+                    self._posting_slots.append(array("I"))
+                    self._posting_tfs.append(array("I"))
+                self._posting_slots[term_id].append(slot)
+                self._posting_tfs[term_id].append(tf)
+
+            self._memory_bytes += cost
+
+    def _remove_slot(self, slot: int) -> None:
+        # 倒排表里的旧 posting 留着，打分时按 _live 跳过（墓碑）
+        self._live[slot] = 0
+        self._docs[slot] = None
+        self._total_len -= self._doc_lens[slot]
+        self._live_count -= 1
+
+    def add_many(self, rows: Iterable[Tuple]) -> int:
+        """批量追加 (id, title, content, slug, tags, created_at) 行，返回追加数量"""
+        count = 0
+        for row in rows:
+            self.add(*row)
+            count += 1
+        return count
+
+    # ---- 查询 ----
+
+    def search(self, q: str, limit: int, offset: int = 0) -> List[Tuple[IndexedDoc, float]]:
+        """返回按 BM25 得分降序的 (文章元数据, 得分)"""
+        terms = set(tokenize(q))
+        if not terms:
+            return []
+
+        with self._lock:
+            n = self._live_count
+            if n == 0:
+                return []
+            avg_len = self._total_len / n
+            k1, b = self.k1, self.b
+            scores: Dict[int, float] = {}
+            for term in terms:
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    continue
+                slots = self._posting_slots[term_id]
+                tfs = self._posting_tfs[term_id]
+                df = len(slots)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for slot, tf in zip(slots, tfs):
+                    if not self._live[slot]:
+                        continue
+                    norm = k1 * (1 - b + b * self._doc_lens[slot] / avg_len)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+            # 得分相同时新文章（slot 大）在前
+            top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], item[0]))
+            return [(self._docs[slot], score) for slot, score in top[offset:]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "documents": self._live_count,
+                "terms": len(self._term_ids),
+                "postings": sum(len(p) for p in self._posting_slots),
+                "estimated_memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+            }
+
+
+def build_from_rows(index: BM25Index, rows: Iterable[Tuple]) -> bool:
+    """
+    从数据库行重建索引，成功返回 True
+    超出内存预算时清空索引并返回 False（搜索会退回 SQL 引擎）
+    """
+    index.reset()
+    try:
+        count = index.add_many(rows)
+    except IndexFullError as e:
+        logger.warning("%s; falling back to SQL search", e)
+        index.reset()
+        return False
+    index.ready = True
+    logger.info("BM25 index built from %d articles: %s", count, index.stats())
+    return True
@@ -0,0 +1,89 @@
+# backend/app/serialization.py
+"""
+JSON 序列化
+
+- 优先使用 orjson，其次 msgspec，都没有安装时退回标准库 json；
+  可以用 JSON_BACKEND=orjson / msgspec / json 指定（auto 为默认）
+- 输出格式和 FastAPI 的 JSONResponse 一致：紧凑分隔符、非 ASCII 字符直接输出 UTF-8
+- FastJSONResponse 作为应用的默认响应类；列表、搜索、单篇文章的响应体
+  已经在业务代码里序列化成 bytes，不再经过 jsonable_encoder
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+
+def _stdlib_dumps(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _load_orjson() -> Callable[[Any], bytes]:
+    import orjson
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(payload: Any) -> bytes:
+        return orjson.dumps(payload, option=option)
+
+    return dumps
+
+
+def _load_msgspec() -> Callable[[Any], bytes]:
+    import msgspec
+
+    return msgspec.json.Encoder().encode
+
+
+_LOADERS = {
+    "orjson": _load_orjson,
+    "msgspec": _load_msgspec,
+    "json": lambda: _stdlib_dumps,
+}
+
+
+def available_backends() -> Dict[str, Callable[[Any], bytes]]:
+    """当前环境里能用的序列化实现（按优先级排列）"""
+    backends = {}
+    for name, loader in _LOADERS.items():
+        try:
+            backends[name] = loader()
+        except ImportError:
+            continue
+    return backends
+
+
+backend = "json"
+_dumps: Callable[[Any], bytes] = _stdlib_dumps
+
+
+def use_backend(name: str = "auto") -> str:
+    """切换序列化实现，返回实际使用的名字；指定的库没有安装时退回自动选择"""
+    global backend, _dumps
+    backends = available_backends()
+    if name not in backends:
+        if name != "auto":
+            logger.warning("JSON backend %r is not available, falling back to auto", name)
+        name = next(iter(backends))
+    backend, _dumps = name, backends[name]
+    return backend
+
+
+def dumps(payload: Any) -> bytes:
+    return _dumps(payload)
+
+
+class FastJSONResponse(JSONResponse):
+    """用 dumps 渲染的 JSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
+
+
+use_backend(JSON_BACKEND)
@@ -0,0 +1,109 @@
+# backend/app/singleflight.py
+"""
+合并并发的相同读请求（single-flight）
+
+热门文章被大量同时访问、缓存刚好过期时，每个请求都会各自查库并格式化一遍。
+SingleFlight.do(key, fn)：同一个 key 同时只执行一次 fn，执行期间到达的相同请求
+等待并共享这次的结果（或异常），执行完就移除，不做缓存（缓存见 app/cache.py）。
+
+- 同步路由（线程池）：后到的线程等待 threading.Event
+- 异步路由（DB_MODE=async，AsyncSession.run_sync 在事件循环线程的 greenlet 里执行）：
+  不能阻塞事件循环，后到的请求通过 await_only 等待 asyncio.Future，期间事件循环照常运行
+"""
+import asyncio
+import threading
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        # 实际执行次数 / 共享了别人结果的请求数 / 执行出错次数
+        self.executed = 0
+        self.shared = 0
+        self.errors = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        if in_greenlet():
+            return self._do_in_greenlet(key, fn)
+        return self._do_threaded(key, fn)
+
+    def _do_threaded(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.executed += 1
+                if call.error is not None:
+                    self.errors += 1
+            call.done.set()
+
+    def _do_in_greenlet(self, key: Hashable, fn: Callable[[], T]) -> T:
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        future = self._futures.get(flight_key)
+        if future is not None:
+            self.shared += 1
+            # shield：等待的请求被取消时不影响其它请求
+            return await_only(asyncio.shield(future))
+
+        future = self._futures[flight_key] = loop.create_future()
+        try:
+            result = fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self.errors += 1
+            future.set_exception(e)
+            # 没有其它请求在等时，避免 "exception was never retrieved" 日志
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._futures[flight_key]
+            self.executed += 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls) + len(self._futures),
+            "executed": self.executed,
+            "shared": self.shared,
+            "errors": self.errors,
+        }
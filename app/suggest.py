@@ -0,0 +1,257 @@
+# backend/app/suggest.py
+"""
+标题自动补全（/api/search/suggest?prefix=）
+
+只读取 id / title / slug，从不读取 content：
+- sql：lower(title) LIKE 'prefix%' OR LIKE '%prefix%'。PostgreSQL 上由 pg_trgm GIN 索引
+  （migrations/versions/0007）支持，两种 LIKE 都能走索引
+- memory：进程内有序数组。每个标题的每个词首（中日韩文字每个字都算词首）各一条
+  (小写的后缀, id)，二分查找前缀；启动时（lifespan）从数据库构建，写入时增量插入，
+  SUGGEST_MEMORY_TTL 秒后由后台线程重新构建（其它 worker 的写入），构建期间继续用旧索引。
+  索引可用之前（构建失败、还在构建）走 sql，请求里从不构建索引。
+  标题数超过 SUGGEST_MEMORY_MAX_TITLES 时不加载，退回 sql
+排序：标题开头匹配优先，其次标题短的优先，再按 id 倒序（新文章优先）
+
+SUGGEST_ENGINE：auto（默认，PostgreSQL 用 sql，其它用 memory）/ sql / memory
+"""
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Query, Session
+
+from app.model import Article
+from app.search import CJK_RE, escape_like
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_ENGINE = os.getenv("SUGGEST_ENGINE", "auto").lower()
+SUGGEST_MEMORY_MAX_TITLES = int(os.getenv("SUGGEST_MEMORY_MAX_TITLES", "200000"))
+SUGGEST_MEMORY_TTL = float(os.getenv("SUGGEST_MEMORY_TTL", "300"))
+
+# 有序数组里的键只保存后缀的前 KEY_LENGTH 个字符，更长的前缀查到后再核对标题
+KEY_LENGTH = 32
+# 每次查询最多检查的候选条数（前缀很短时匹配很多）
+SCAN_FACTOR = 50
+# 构建失败后至少隔多少秒再重试
+LOAD_RETRY_SECONDS = 30
+
+# 词首：字母数字串的开头，或者单个中日韩文字
+_WORD_START = re.compile(r"[^\W_]+|[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+
+def word_starts(title: str) -> List[int]:
+    starts = []
+    for match in _WORD_START.finditer(title):
+        starts.append(match.start())
+        # 中日韩文字连在一起时，每个字都是词首
+        starts.extend(m.start() for m in CJK_RE.finditer(match.group(0), 1))
+    return sorted(set(starts))
+
+
+class TitleIndex:
+    def __init__(
+        self,
+        max_titles: int = SUGGEST_MEMORY_MAX_TITLES,
+        ttl: float = SUGGEST_MEMORY_TTL,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ):
+        self.max_titles = max_titles
+        self.ttl = ttl
+        self.loaded_at = 0.0
+        self.failed_at = float("-inf")
+        self._session_factory = session_factory
+        # 构建中：期间的写入记在 _pending，构建完成后在新索引上重放
+        self._loading = False
+        self._pending: List[Tuple[int, str, Optional[str]]] = []
+        self._keys: List[str] = []
+        self._ids: List[int] = []
+        self._docs: Dict[int, Tuple[str, Optional[str]]] = {}
+        self._lock = threading.RLock()
+        self.ready = False
+        # 超过 max_titles 后不再尝试加载
+        self.too_large = False
+
+    def needs_load(self) -> bool:
+        if self.too_large or self._loading:
+            return False
+        if not self.ready:
+            return time.monotonic() - self.failed_at >= LOAD_RETRY_SECONDS
+        return self.ttl > 0 and time.monotonic() - self.loaded_at >= self.ttl
+
+    def _entries(self, post_id: int, title: str):
+        lowered = title.lower()
+        return [(lowered[i:i + KEY_LENGTH], post_id) for i in word_starts(lowered)]
+
+    def build(self, rows) -> bool:
+        """rows 为 (id, title, slug)；标题数超过 max_titles 时放弃。构建时不持有锁，最后整体替换"""
+        docs = {}
+        entries = []
+        for post_id, title, slug in rows:
+            if len(docs) >= self.max_titles:
+                self.too_large = True
+                logger.warning("More than %d titles; title suggestions fall back to SQL", self.max_titles)
+                return False
+            docs[post_id] = (title or "", slug)
+            entries.extend(self._entries(post_id, title or ""))
+        entries.sort()
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._ids = [post_id for _, post_id in entries]
+            self._docs = docs
+            self.ready = True
+            self.loaded_at = time.monotonic()
+            for pending in self._pending:
+                self._add(*pending)
+            self._pending = []
+            return True
+
+    def load(self, db: Session) -> bool:
+        """从 articles 表（重新）构建"""
+        with self._lock:
+            self._loading = True
+            self._pending = []
+        try:
+            return self.build(db.query(Article.id, Article.title, Article.slug).yield_per(1000))
+        except Exception:
+            self.failed_at = time.monotonic()
+            raise
+        finally:
+            with self._lock:
+                self._loading = False
+                self._pending = []
+
+    def load_in_background(self) -> None:
+        """后台线程重新构建；已经在构建时什么都不做"""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._background_load, name="suggest-index", daemon=True).start()
+
+    def _background_load(self) -> None:
+        if self._session_factory is None:
+            from app.db import SessionLocal
+
+            self._session_factory = SessionLocal
+        try:
+            db = self._session_factory()
+            try:
+                self.load(db)
+            finally:
+                db.close()
+        except Exception:
+            logger.exception("Title index load failed; title suggestions use SQL until it succeeds")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def add(self, post_id: int, title: str, slug: Optional[str]) -> None:
+        with self._lock:
+            if self._loading:
+                self._pending.append((post_id, title, slug))
+            if self.ready:
+                self._add(post_id, title, slug)
+
+    def _add(self, post_id: int, title: str, slug: Optional[str]) -> None:
+        """调用方持有 _lock"""
+        old = self._docs.get(post_id)
+        if old is not None:
+            for key, _ in self._entries(post_id, old[0]):
+                i = bisect.bisect_left(self._keys, key)
+                while i < len(self._keys) and self._keys[i] == key:
+                    if self._ids[i] == post_id:
+                        del self._keys[i], self._ids[i]
+                        break
+                    i += 1
+        elif len(self._docs) >= self.max_titles:
+            self.reset()
+            self.too_large = True
+            return
+        self._docs[post_id] = (title or "", slug)
+        for key, _ in self._entries(post_id, title or ""):
+            i = bisect.bisect_right(self._keys, key)
+            self._keys.insert(i, key)
+            self._ids.insert(i, post_id)
+
+    def search(self, prefix: str, limit: int) -> List[Tuple[int, str, Optional[str]]]:
+        needle = prefix.lower()
+        key = needle[:KEY_LENGTH]
+        with self._lock:
+            i = bisect.bisect_left(self._keys, key)
+            candidates = {}
+            scanned = 0
+            while i < len(self._keys) and self._keys[i].startswith(key) and scanned < limit * SCAN_FACTOR:
+                post_id = self._ids[i]
+                title, slug = self._docs[post_id]
+                if post_id not in candidates and needle in title.lower():
+                    candidates[post_id] = (title, slug)
+                i += 1
+                scanned += 1
+        ranked = sorted(
+            candidates.items(),
+            key=lambda item: (not item[1][0].lower().startswith(needle), len(item[1][0]), -item[0]),
+        )
+        return [(post_id, title, slug) for post_id, (title, slug) in ranked[:limit]]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._keys, self._ids, self._docs = [], [], {}
+            self.ready = False
+            self.failed_at = float("-inf")
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "loading": self._loading, "titles": len(self._docs), "keys": len(self._keys), "too_large": self.too_large}
+
+
+title_index = TitleIndex()
+
+
+def resolve_suggest_engine(db: Session) -> str:
+    if SUGGEST_ENGINE in ("sql", "memory"):
+        engine = SUGGEST_ENGINE
+    else:
+        get_bind = getattr(db, "get_bind", None)
+        engine = "sql" if get_bind is not None and get_bind().dialect.name == "postgresql" else "memory"
+    if engine == "memory" and title_index.too_large:
+        return "sql"
+    return engine
+
+
+def build_suggest_query(db: Session, prefix: str) -> Query:
+    """标题包含 prefix 的文章，开头匹配的排在前面（不含 limit）"""
+    title = func.lower(Article.title)
+    needle = escape_like(prefix.lower())
+    starts_with = title.like(f"{needle}%", escape="\\")
+    return (
+        db.query(Article.id, Article.title, Article.slug)
+        .filter(starts_with | title.like(f"%{needle}%", escape="\\"))
+        .order_by(case((starts_with, 0), else_=1), func.length(Article.title), Article.id.desc())
+    )
+
+
+def build_title_index(db: Session) -> bool:
+    """启动时构建内存索引（引擎为 memory 时）"""
+    if resolve_suggest_engine(db) != "memory":
+        return False
+    return title_index.load(db)
+
+
+def suggest_titles(db: Session, prefix: str, limit: int) -> List[Tuple[int, str, Optional[str]]]:
+    """返回 (id, title, slug) 列表"""
+    if resolve_suggest_engine(db) == "memory":
+        if title_index.needs_load():
+            title_index.load_in_background()
+        if title_index.ready:
+            return title_index.search(prefix, limit)
+    return [tuple(row) for row in build_suggest_query(db, prefix).limit(limit).all()]
+
+
+def index_title(article: Article) -> None:
+    """文章写入后更新内存索引（索引还没有加载时忽略）"""
+    title_index.add(article.id, article.title, article.slug)
@@ -0,0 +1,218 @@
+# backend/app/tags.py
+"""
+标签索引
+
+articles.tags 仍然保存逗号拼接的原始字符串（响应直接使用，不需要 join），
+tags / article_tags 两张表是它的规范化索引：
+- GET /api/posts?tag=xxx 通过 article_tags 的主键 (tag_id, article_id) 筛选，不用 LIKE 扫描
+- GET /api/tags 直接读取 tags.article_count，计数随写入增量维护，不做全表聚合
+
+维护方式（都和文章写入在同一个事务里）：
+- ORM 写入（create_post 等）：Article 的 after_insert / after_update / before_delete 事件
+- Core 批量写入（批量导入）：调用 apply_tag_changes
+- 已有数据：rebuild_tag_index 从 articles.tags 重建（迁移 / 修复计数）
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, event, insert, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.fields import split_tags
+from app.model import Article, ArticleTag, Tag
+
+# (article_id, 旧标签, 新标签)；旧标签为 None 时从 article_tags 读取当前值
+TagChange = Tuple[int, Optional[Sequence[str]], Optional[object]]
+
+# 重建索引时每批处理的文章数
+REBUILD_BATCH_SIZE = 5000
+
+
+def normalize_tags(tags) -> List[str]:
+    """"a, b,,a" 或 ["a", " b"] -> ["a", "b"]（去空白、去空、去重，保持顺序）"""
+    if not tags:
+        return []
+    items = split_tags(tags) if isinstance(tags, str) else [str(t).strip() for t in tags]
+    return list(dict.fromkeys(t for t in items if t))
+
+
+def _insert_ignoring_conflicts(conn: Connection, names: List[str]) -> None:
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        existing = set(conn.execute(select(Tag.name).where(Tag.name.in_(names))).scalars())
+        missing = [name for name in names if name not in existing]
+        if missing:
+            conn.execute(insert(Tag), [{"name": name, "article_count": 0} for name in missing])
+        return
+    stmt = dialect_insert(Tag).on_conflict_do_nothing(index_elements=[Tag.name])
+    conn.execute(stmt, [{"name": name, "article_count": 0} for name in names])
+
+
+def _tag_ids(conn: Connection, names: Iterable[str], create: bool = False) -> Dict[str, int]:
+    # 排序后插入，并发事务按相同顺序加锁，避免死锁
+    names = sorted(set(names))
+    if not names:
+        return {}
+    if create:
+        _insert_ignoring_conflicts(conn, names)
+    return dict(conn.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+
+
+def current_tags(conn: Connection, article_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """article_tags 里记录的每篇文章当前的标签"""
+    ids = list(article_ids)
+    result: Dict[int, List[str]] = {article_id: [] for article_id in ids}
+    if not ids:
+        return result
+    rows = conn.execute(
+        select(ArticleTag.article_id, Tag.name)
+        .join(Tag, Tag.id == ArticleTag.tag_id)
+        .where(ArticleTag.article_id.in_(ids))
+    )
+    for article_id, name in rows:
+        result[article_id].append(name)
+    return result
+
+
+def apply_tag_changes(conn: Connection, changes: Iterable[TagChange]) -> None:
+    """
+    按文章标签的变化更新 article_tags 和 tags.article_count
+    - 一批文章合并成几条语句：一次查/建标签，一次插入关联，一次删除关联，一次更新计数
+    """
+    changes = list(changes)
+    unknown = [article_id for article_id, old, _ in changes if old is None]
+    stored = current_tags(conn, unknown) if unknown else {}
+
+    added: List[Tuple[int, str]] = []
+    removed: List[Tuple[int, str]] = []
+    delta: Counter = Counter()
+    for article_id, old, new in changes:
+        old_set = set(normalize_tags(stored[article_id] if old is None else old))
+        new_set = set(normalize_tags(new))
+        for name in new_set - old_set:
+            added.append((article_id, name))
+            delta[name] += 1
+        for name in old_set - new_set:
+            removed.append((article_id, name))
+            delta[name] -= 1
+    if not added and not removed:
+        return
+
+    ids = _tag_ids(conn, (name for _, name in added), create=True)
+    ids.update(_tag_ids(conn, (name for _, name in removed if name not in ids)))
+
+    if removed:
+        conn.execute(
+            delete(ArticleTag).where(
+                ArticleTag.article_id == bindparam("b_article_id"),
+                ArticleTag.tag_id == bindparam("b_tag_id"),
+            ),
+            [{"b_article_id": article_id, "b_tag_id": ids[name]} for article_id, name in removed if name in ids],
+        )
+    if added:
+        conn.execute(insert(ArticleTag), [{"article_id": article_id, "tag_id": ids[name]} for article_id, name in added])
+
+    counts = [{"b_id": ids[name], "b_delta": n} for name, n in sorted(delta.items()) if n and name in ids]
+    if counts:
+        conn.execute(
+            update(Tag)
+            .where(Tag.id == bindparam("b_id"))
+            .values(article_count=Tag.article_count + bindparam("b_delta")),
+            counts,
+        )
+
+
+# ---------------------------------------------------------------------------
+# ORM 事件：create_post 等通过 Session 写入的文章自动同步标签索引
+# ---------------------------------------------------------------------------
+
+@event.listens_for(Article, "after_insert")
+def _article_inserted(mapper, connection, target):
+    apply_tag_changes(connection, [(target.id, (), target.tags)])
+
+
+@event.listens_for(Article, "after_update")
+def _article_updated(mapper, connection, target):
+    if inspect(target).attrs.tags.history.has_changes():
+        apply_tag_changes(connection, [(target.id, None, target.tags)])
+
+
+# 在 DELETE 之前执行：PostgreSQL 上外键级联会先删掉关联行，之后就不知道要减哪些计数了
+@event.listens_for(Article, "before_delete")
+def _article_deleted(mapper, connection, target):
+    apply_tag_changes(connection, [(target.id, None, None)])
+
+
+# ---------------------------------------------------------------------------
+# 迁移：从 articles.tags 重建索引
+# ---------------------------------------------------------------------------
+
+POSTGRES_REBUILD = [
+    "INSERT INTO tags (name, article_count) "
+    "SELECT DISTINCT btrim(t), 0 FROM articles, unnest(string_to_array(articles.tags, ',')) AS t "
+    "WHERE btrim(t) <> '' ON CONFLICT (name) DO NOTHING",
+    "INSERT INTO article_tags (tag_id, article_id) "
+    "SELECT DISTINCT g.id, a.id FROM articles a "
+    "CROSS JOIN LATERAL unnest(string_to_array(a.tags, ',')) AS t "
+    "JOIN tags g ON g.name = btrim(t)",
+    "UPDATE tags SET article_count = c.n "
+    "FROM (SELECT tag_id, count(*) AS n FROM article_tags GROUP BY tag_id) c WHERE tags.id = c.tag_id",
+]
+
+
+def tag_index_missing(engine: Engine) -> bool:
+    """有带标签的文章，但关联表是空的：需要从字符串迁移"""
+    with engine.connect() as conn:
+        if conn.execute(select(ArticleTag.article_id).limit(1)).first() is not None:
+            return False
+        return conn.execute(select(Article.id).where(Article.tags.isnot(None)).limit(1)).first() is not None
+
+
+def rebuild_tag_index(engine: Engine, batch_size: int = REBUILD_BATCH_SIZE) -> None:
+    """
+    清空 article_tags 和计数后从 articles.tags 重新生成
+    - PostgreSQL：三条集合 SQL，在数据库里完成
+    - 其它数据库：按 id 分批读取，每批用 apply_tag_changes 写入并提交
+    """
+    with engine.begin() as conn:
+        conn.execute(delete(ArticleTag))
+        conn.execute(update(Tag).values(article_count=0))
+        if conn.dialect.name == "postgresql":
+            for statement in POSTGRES_REBUILD:
+                conn.execute(text(statement))
+            return
+
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(Article.id, Article.tags)
+                .where(Article.id > last_id, Article.tags.isnot(None))
+                .order_by(Article.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            apply_tag_changes(conn, [(article_id, (), tags) for article_id, tags in rows])
+        last_id = rows[-1].id
+
+
+def tag_counts(db, limit: int) -> List[Tuple[str, int]]:
+    """按文章数倒序的标签列表（只读 tags 表）"""
+    return (
+        db.query(Tag.name, Tag.article_count)
+        .filter(Tag.article_count > 0)
+        .order_by(Tag.article_count.desc(), Tag.name)
+        .limit(limit)
+        .all()
+    )
+
+
+def tag_filter(query, tag: str):
+    """给文章查询加上按标签筛选（走 article_tags 主键）"""
+    return query.join(ArticleTag, ArticleTag.article_id == Article.id).join(Tag, Tag.id == ArticleTag.tag_id).filter(
+        Tag.name == tag.strip()
+    )
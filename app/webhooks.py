@@ -0,0 +1,452 @@
+# backend/app/webhooks.py
+"""
+文章事件通知（n8n webhook）
+
+写入文章的请求不再同步调用 webhook：on_post_written 把事件交给 WebhookDispatcher，
+由后台 asyncio 任务按批次 POST 到 N8N_WEBHOOK_URL（请求体 {"events": [...]}）。
+
+- 内存模式（默认）：有界队列，满了丢弃新事件并计数；进程退出时未发送的事件会丢失
+- outbox 模式（WEBHOOK_OUTBOX=1）：事件和文章在同一个事务里写入 webhook_outbox 表
+  （ORM 写入走 Article 的 after_insert / after_update 事件，批量导入调用 record_post_events），
+  后台任务从表里认领一批事件发送，成功后删除；重启后继续发送。
+  认领是一条 UPDATE ... RETURNING：把 next_attempt_at 推迟 WEBHOOK_OUTBOX_LEASE 秒作为租约
+  （PostgreSQL 上子查询 FOR UPDATE SKIP LOCKED），多个 worker 不会同时发送同一个事件；
+  发送途中进程退出时，租约到期后由其它 worker 重新发送
+- 每批最多 WEBHOOK_BATCH_SIZE 条，第一条事件到达后最多等 WEBHOOK_FLUSH_INTERVAL 秒凑批
+- 连接错误、429、5xx 按指数退避重试（带抖动）；其它 4xx 视为永久失败，不重试
+  （outbox 模式下标记 failed_at，留在表里供排查，不再发送）
+- 队列深度、最旧未发送事件的延迟、发送/失败/丢弃计数见 stats()，由 /metrics 输出
+
+配置：
+- N8N_WEBHOOK_URL              不设置时不发送事件
+- WEBHOOK_OUTBOX（默认 0）       1 = 使用 outbox 表
+- WEBHOOK_QUEUE_SIZE（默认 10000）、WEBHOOK_BATCH_SIZE（默认 100）、WEBHOOK_FLUSH_INTERVAL（默认 1 秒）
+- WEBHOOK_MAX_RETRIES（默认 5）、WEBHOOK_TIMEOUT（默认 5 秒）
+- WEBHOOK_OUTBOX_LEASE（默认 300 秒）  认领的租约，要长于一批事件连同重试的发送时间
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Deque, Iterable, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import delete, event, func, insert, or_, select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.model import Article, WebhookOutbox
+from app.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URL = os.getenv("N8N_WEBHOOK_URL") or None
+WEBHOOK_OUTBOX = os.getenv("WEBHOOK_OUTBOX", "0") == "1"
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_FLUSH_INTERVAL = float(os.getenv("WEBHOOK_FLUSH_INTERVAL", "1"))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "5"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "5"))
+WEBHOOK_OUTBOX_LEASE = float(os.getenv("WEBHOOK_OUTBOX_LEASE", "300"))
+
+# 退避：第 n 次重试前等待 min(BACKOFF_MAX, BACKOFF_BASE * 2^n) 秒，再乘以 0.5~1 的随机因子
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# outbox 模式下没有新事件通知时，多久检查一次表里到期的重试
+OUTBOX_POLL_INTERVAL = 5.0
+
+# 一批事件的发送结果：成功 / 可重试的错误（重试用完）/ 被拒绝（4xx，不再重试）
+SENT = "sent"
+RETRY = "retry"
+REJECTED = "rejected"
+
+
+def post_event(article: Article, action: str = "save") -> dict:
+    """文章写入事件的内容（和之前计划的 n8n webhook 请求体一致）"""
+    # ORM 事件里 created_at 可能还没有从数据库加载（server_default），不触发加载
+    created_at = article.__dict__.get("created_at")
+    return {
+        "post_id": article.id,
+        "title": article.title,
+        "slug": article.slug or str(article.id),
+        "action": action,
+        "triggered_by": "backend",
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+
+class WebhookDispatcher:
+    def __init__(
+        self,
+        url: Optional[str] = WEBHOOK_URL,
+        *,
+        outbox: bool = WEBHOOK_OUTBOX,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        flush_interval: float = WEBHOOK_FLUSH_INTERVAL,
+        max_retries: int = WEBHOOK_MAX_RETRIES,
+        timeout: float = WEBHOOK_TIMEOUT,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        lease_seconds: float = WEBHOOK_OUTBOX_LEASE,
+        session_factory: Optional[Callable] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url
+        self.outbox = outbox
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._session_factory = session_factory
+        self._transport = transport
+
+        # (入队时间, 事件)；只在事件循环线程里修改
+        self._pending: Deque[Tuple[float, dict]] = deque()
+        self._inflight: List[Tuple[float, dict]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._stopping = False
+        # outbox 模式：表里未发送的行数和最早的时间，每次读表时刷新
+        self._outbox_depth = 0
+        self._outbox_oldest: Optional[datetime] = None
+
+        # published / dropped 在请求线程里累加，用锁保护
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def _incr(self, attr: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + n)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ------------------------------------------------------------------
+    # 生命周期（应用 lifespan 里调用）
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        if not self.enabled or self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._stopping = False
+        self._client = httpx.AsyncClient(timeout=self.timeout, transport=self._transport)
+        self._task = asyncio.create_task(self._run_outbox() if self.outbox else self._run_memory())
+        logger.info("Webhook dispatcher started (%s mode)", "outbox" if self.outbox else "memory")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """发送完已排队的事件后停止（最多等待 timeout 秒）"""
+        if self._task is None:
+            return
+        # 和 publish 一样经由 call_soon_threadsafe，排在已经发布的事件之后
+        self._loop.call_soon_threadsafe(self._request_stop)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            logger.warning("Webhook dispatcher stopped with %d undelivered events", self.queue_depth)
+        except Exception:
+            logger.exception("Webhook dispatcher failed")
+        finally:
+            await self._client.aclose()
+            self._task = None
+            self._loop = None
+
+    def _request_stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        self._batch_full.set()
+
+    # ------------------------------------------------------------------
+    # 发布事件（任意线程都可以调用，不阻塞）
+    # ------------------------------------------------------------------
+
+    def publish(self, payload: dict) -> None:
+        if not self.enabled:
+            return
+        self._incr("published")
+        loop = self._loop
+        if loop is None:
+            # 没有运行中的后台任务：outbox 模式下事件已经在表里，下次启动时发送
+            if not self.outbox:
+                self._incr("dropped")
+            return
+        try:
+            if self.outbox:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            else:
+                loop.call_soon_threadsafe(self._enqueue, (time.time(), payload))
+        except RuntimeError:
+            # 事件循环已经关闭
+            self._incr("dropped")
+
+    def _enqueue(self, item: Tuple[float, dict]) -> None:
+        if len(self._pending) >= self.queue_size:
+            self._incr("dropped")
+            logger.warning("Webhook queue is full (%d), dropping event", self.queue_size)
+            return
+        self._pending.append(item)
+        self._wakeup.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+
+    # ------------------------------------------------------------------
+    # 后台任务
+    # ------------------------------------------------------------------
+
+    async def _wait_for_batch(self, ready: Callable[[], bool]) -> None:
+        """第一条事件到达后，等到攒满一批或 flush_interval 到期"""
+        if ready() or self._stopping:
+            return
+        self._batch_full.clear()
+        try:
+            await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_memory(self) -> None:
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._wait_for_batch(lambda: len(self._pending) >= self.batch_size)
+            count = min(self.batch_size, len(self._pending))
+            self._inflight = [self._pending.popleft() for _ in range(count)]
+            events = [e for _, e in self._inflight]
+            if await self._send(events) == SENT:
+                self.delivered += len(events)
+            else:
+                self.failed += len(events)
+            self._inflight = []
+
+    async def _run_outbox(self) -> None:
+        while True:
+            try:
+                sent = await self._send_outbox_batch()
+            except Exception:
+                # 数据库暂时不可用等：稍后重试，不让后台任务退出
+                logger.exception("Webhook outbox batch failed")
+                sent = False
+                if self._stopping:
+                    return
+            if sent:
+                continue
+            if self._stopping:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send_outbox_batch(self) -> bool:
+        """认领并发送一批到期的 outbox 事件；表里没有到期事件时返回 False"""
+        rows = await run_in_threadpool(self._outbox_claim, self.batch_size)
+        if not rows:
+            return False
+        if len(rows) < self.batch_size and not self._stopping:
+            # 刚有新事件：等一会儿凑批，再认领这期间到达的
+            await self._wait_for_batch(lambda: False)
+            rows += await run_in_threadpool(self._outbox_claim, self.batch_size - len(rows))
+        ids = [row.id for row in rows]
+        result = await self._send([json.loads(row.payload) for row in rows])
+        if result == SENT:
+            await run_in_threadpool(self._outbox_delete, ids)
+            self.delivered += len(ids)
+        elif result == REJECTED:
+            await run_in_threadpool(self._outbox_reject, ids)
+            self.failed += len(ids)
+        else:
+            await run_in_threadpool(self._outbox_defer, ids)
+            self.failed += len(ids)
+        return True
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _send(self, events: List[dict]) -> str:
+        """发送一批事件，可重试的错误按退避重试，返回 SENT / RETRY / REJECTED"""
+        self.batches += 1
+        body = dumps({"events": events})
+        for attempt in range(self.max_retries + 1):
+            try:
+                r = await self._client.post(self.url, content=body, headers={"Content-Type": "application/json"})
+                if r.is_success:
+                    return SENT
+                if r.status_code != 429 and r.status_code < 500:
+                    logger.warning("Webhook rejected %d events: HTTP %d", len(events), r.status_code)
+                    return REJECTED
+                reason = f"HTTP {r.status_code}"
+            except httpx.HTTPError as e:
+                reason = f"{type(e).__name__}: {e}"
+            if attempt == self.max_retries or self._stopping:
+                logger.warning("Webhook delivery of %d events failed: %s", len(events), reason)
+                return RETRY
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+        return RETRY
+
+    # ------------------------------------------------------------------
+    # outbox 表（同步 Session，在线程池里执行）
+    # ------------------------------------------------------------------
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.db import SessionLocal
+
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _outbox_claim(self, limit: int) -> list:
+        """
+        认领最多 limit 条到期的事件，返回 (id, payload) 行
+        同一条 UPDATE 里把 next_attempt_at 推迟 lease_seconds 秒，租约到期前其它 worker 取不到这些行；
+        PostgreSQL 上子查询加 FOR UPDATE SKIP LOCKED，并发认领时跳过别人正在认领的行，不互相等待
+        """
+        now = datetime.now(timezone.utc)
+        pending = WebhookOutbox.failed_at.is_(None)
+        due = (
+            select(WebhookOutbox.id)
+            .where(pending, or_(WebhookOutbox.next_attempt_at.is_(None), WebhookOutbox.next_attempt_at <= now))
+            .order_by(WebhookOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        with self._session() as db:
+            depth, oldest = db.execute(select(func.count(), func.min(WebhookOutbox.created_at)).where(pending)).one()
+            self._outbox_depth, self._outbox_oldest = depth, oldest
+            if not depth:
+                return []
+            rows = db.execute(
+                update(WebhookOutbox)
+                .where(WebhookOutbox.id.in_(due))
+                .values(next_attempt_at=now + timedelta(seconds=self.lease_seconds))
+                .returning(WebhookOutbox.id, WebhookOutbox.payload)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+        # RETURNING 不保证顺序
+        return sorted(rows, key=lambda row: row.id)
+
+    def _outbox_delete(self, ids: List[int]) -> None:
+        with self._session() as db:
+            db.execute(delete(WebhookOutbox).where(WebhookOutbox.id.in_(ids)))
+            db.commit()
+
+    def _outbox_defer(self, ids: List[int]) -> None:
+        """发送失败（可重试）：推迟这批事件，按已尝试次数退避（事件一直保留，直到发送成功）"""
+        with self._session() as db:
+            rows = db.execute(select(WebhookOutbox.id, WebhookOutbox.attempts).where(WebhookOutbox.id.in_(ids)))
+            now = datetime.now(timezone.utc)
+            for row_id, attempts in rows.all():
+                db.execute(
+                    update(WebhookOutbox)
+                    .where(WebhookOutbox.id == row_id)
+                    .values(attempts=attempts + 1, next_attempt_at=now + timedelta(seconds=self._backoff(attempts)))
+                )
+            db.commit()
+
+    def _outbox_reject(self, ids: List[int]) -> None:
+        """被 webhook 拒绝（4xx）：标记 failed_at，不再发送，留在表里供排查"""
+        with self._session() as db:
+            db.execute(
+                update(WebhookOutbox)
+                .where(WebhookOutbox.id.in_(ids))
+                .values(attempts=WebhookOutbox.attempts + 1, failed_at=datetime.now(timezone.utc))
+            )
+            db.commit()
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    @property
+    def queue_depth(self) -> int:
+        if self.outbox:
+            return self._outbox_depth
+        return len(self._pending) + len(self._inflight)
+
+    def lag_seconds(self) -> float:
+        """最旧的未发送事件已经等待了多久"""
+        if self.outbox:
+            oldest = self._outbox_oldest
+            if oldest is None:
+                return 0.0
+            if oldest.tzinfo is None:
+                oldest = oldest.replace(tzinfo=timezone.utc)
+            return max(0.0, (datetime.now(timezone.utc) - oldest).total_seconds())
+        head = self._inflight[0] if self._inflight else (self._pending[0] if self._pending else None)
+        return max(0.0, time.time() - head[0]) if head else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "mode": "outbox" if self.outbox else "memory",
+            "queue_depth": self.queue_depth,
+            "queue_size": self.queue_size,
+            "lag_seconds": round(self.lag_seconds(), 3),
+            "published": self.published,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "batches": self.batches,
+        }
+
+
+dispatcher = WebhookDispatcher()
+
+
+def publish_post_event(article: Article) -> None:
+    """文章写入提交之后调用（见 app.posts.on_post_written）"""
+    dispatcher.publish(post_event(article))
+
+
+# ---------------------------------------------------------------------------
+# outbox：事件和文章在同一个事务里写入
+# ---------------------------------------------------------------------------
+
+def record_post_events(conn, articles: Iterable[Article]) -> None:
+    """把文章事件写入 outbox 表（未启用 outbox 时什么都不做）；Core 批量写入在提交前调用"""
+    if not (dispatcher.enabled and dispatcher.outbox):
+        return
+    now = datetime.now(timezone.utc)
+    rows = [{"payload": json.dumps(post_event(a), ensure_ascii=False), "created_at": now} for a in articles]
+    if rows:
+        conn.execute(insert(WebhookOutbox), rows)
+
+
+@event.listens_for(Article, "after_insert")
+@event.listens_for(Article, "after_update")
+def _article_written(mapper, connection, target):
+    record_post_events(connection, [target])
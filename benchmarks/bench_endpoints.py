@@ -0,0 +1,333 @@
+# backend/benchmarks/bench_endpoints.py
+"""
+接口压测：不同数据量下的延迟分位数、吞吐和内存
+
+tests/ 里的 FakeSession 看不到真实的查询计划，这里对真实数据库压测，
+数据量越大越能看出缺索引、全表扫描之类的问题。
+
+- 每个数据量先用 scripts/seed_db.py 生成数据（默认是临时 SQLite 文件；
+  --database-url 指定 PostgreSQL 时会清空并重新生成 articles 表）
+- 每个数据量在新的子进程里压测（缓存、连接池、内存都从零开始），
+  请求通过 httpx 的 ASGITransport 在进程内发出，--concurrency 个协程同时发请求；
+  也可以用 --base-url 压测已经在运行的服务（这时不生成数据，也不统计内存）
+- 接口：列表、按 slug / id 读取单篇、搜索、创建文章（最后执行，避免影响其它接口的数据量）
+  slug / id 和搜索词按固定随机种子均匀抽取，重复的 key 会命中单篇缓存
+- 每个接口报告 p50 / p95 / p99、平均延迟、吞吐和错误数，以及进程常驻内存和峰值内存
+- --json 写入结果文件；--baseline 和之前的结果文件对比（同一数据量、同一接口）
+
+用法：
+    python -m benchmarks.bench_endpoints
+    python -m benchmarks.bench_endpoints --sizes 1000,100000,1000000 --concurrency 32 --json after.json
+    python -m benchmarks.bench_endpoints --sizes 100000 --baseline before.json
+    python -m benchmarks.bench_endpoints --base-url http://localhost:8000 --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENDPOINTS = ("posts", "slug", "id", "search", "create")
+SEARCH_TERMS = ("database", "cache", "python", "latency", "docker", "index", "数据库", "性能")
+
+# (method, path, params, json body)
+RequestSpec = Tuple[str, str, Optional[dict], Optional[dict]]
+
+
+def request_factory(endpoint: str, rows: int, rng: random.Random) -> Callable[[int], RequestSpec]:
+    """返回第 n 个请求的生成函数；seed_db 生成的 id 为 1..rows，slug 为 article-{id}"""
+    if endpoint == "posts":
+        return lambda n: ("GET", "/api/posts", {"limit": 20}, None)
+    if endpoint == "slug":
+        return lambda n: ("GET", f"/api/post/slug/article-{rng.randint(1, rows)}", None, None)
+    if endpoint == "id":
+        return lambda n: ("GET", f"/api/posts/{rng.randint(1, rows)}", None, None)
+    if endpoint == "search":
+        return lambda n: ("GET", "/api/search", {"q": rng.choice(SEARCH_TERMS), "limit": 20}, None)
+    if endpoint == "create":
+        run = f"{time.time_ns():x}"
+        return lambda n: (
+            "POST",
+            "/api/posts",
+            None,
+            {"title": f"bench {run} {n}", "content": "benchmark post " * 50, "tags": ["bench"]},
+        )
+    raise ValueError(f"unknown endpoint: {endpoint}")
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """样本少于 2 个时 quantiles 会报错（3.13 之前）：1 个样本各分位数就是它本身，没有样本为 nan"""
+    if len(latencies) < 2:
+        value = latencies[0] * 1000 if latencies else math.nan
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "mean_ms": value}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+async def drive(client, make_request: Callable[[int], RequestSpec], requests: int, concurrency: int) -> dict:
+    """concurrency 个协程共享一个计数器，一共发出 requests 个请求"""
+    latencies: List[float] = []
+    errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal errors, issued
+        while issued < requests:
+            method, path, params, body = make_request(issued)
+            issued += 1
+            began = time.perf_counter()
+            r = await client.request(method, path, params=params, json=body)
+            latencies.append(time.perf_counter() - began)
+            if r.status_code >= 400:
+                errors += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": requests / elapsed,
+        **percentiles(latencies),
+    }
+
+
+def rss_mb() -> Optional[float]:
+    """当前常驻内存（Linux 读 /proc，其它平台返回 None）"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是 KB，macOS 是字节
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+async def run_endpoints(args, client) -> Dict[str, dict]:
+    results = {}
+    for endpoint in args.endpoints:
+        rng = random.Random(f"{args.seed}:{endpoint}")
+        make_request = request_factory(endpoint, args.rows, rng)
+        if endpoint != "create":
+            await drive(client, make_request, args.warmup, min(args.concurrency, max(args.warmup, 1)))
+        result = await drive(client, make_request, args.requests, args.concurrency)
+        result["rss_mb"] = rss_mb()
+        result["peak_rss_mb"] = peak_rss_mb()
+        results[endpoint] = result
+        print(f"  {endpoint}: {result['throughput_rps']:,.0f} req/s, p95 {result['p95_ms']:.1f} ms", file=sys.stderr)
+    return results
+
+
+async def run_in_process(args) -> dict:
+    """子进程里执行：导入应用、执行 lifespan，然后通过 ASGITransport 压测"""
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        memory = {"rss_mb_after_startup": rss_mb()}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            endpoints = await run_endpoints(args, client)
+    memory["peak_rss_mb"] = peak_rss_mb()
+    return {"endpoints": endpoints, "memory": memory}
+
+
+async def run_remote(args) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        endpoints = await run_endpoints(args, client)
+    return {"endpoints": endpoints, "memory": None}
+
+
+def _worker_args(args, rows: int) -> List[str]:
+    return [
+        "--worker",
+        "--rows", str(rows),
+        "--requests", str(args.requests),
+        "--concurrency", str(args.concurrency),
+        "--warmup", str(args.warmup),
+        "--seed", str(args.seed),
+        "--endpoints", ",".join(args.endpoints),
+    ]
+
+
+def bench_size(args, rows: int, database_url: str) -> dict:
+    """生成 rows 条数据，然后在新的子进程里压测"""
+    from scripts.seed_db import seed
+
+    began = time.perf_counter()
+    if not args.no_seed:
+        seed(rows, database_url=database_url, workers=args.seed_workers, random_seed=args.seed)
+    seed_seconds = time.perf_counter() - began
+
+    print(f"benchmarking {rows:,} rows ...", file=sys.stderr)
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_endpoints", *_worker_args(args, rows)],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": database_url},
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"benchmark worker failed for {rows} rows")
+    run = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"rows": rows, "seed_seconds": None if args.no_seed else seed_seconds, **run}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(baseline: dict, current: dict) -> List[List[object]]:
+    """同一数据量、同一接口的 p95 和吞吐变化（百分比）"""
+    previous = {
+        (run["rows"], name): result
+        for run in baseline["runs"]
+        for name, result in run["endpoints"].items()
+    }
+    rows = []
+    for run in current["runs"]:
+        for name, result in run["endpoints"].items():
+            old = previous.get((run["rows"], name))
+            if old is None:
+                continue
+            rows.append([
+                f"{run['rows']:,}",
+                name,
+                f"{old['p95_ms']:.2f}",
+                f"{result['p95_ms']:.2f}",
+                f"{(result['p95_ms'] / old['p95_ms'] - 1) * 100:+.1f}%",
+                f"{old['throughput_rps']:,.0f}",
+                f"{result['throughput_rps']:,.0f}",
+                f"{(result['throughput_rps'] / old['throughput_rps'] - 1) * 100:+.1f}%",
+            ])
+    return rows
+
+
+def _print_table(title: str, header: List[str], rows: List[List[object]]) -> None:
+    print(f"\n{title}")
+    widths = [max(len(str(x)) for x in column) for column in zip(header, *rows)]
+    for line in [header] + rows:
+        print("  ".join(str(x).rjust(w) for x, w in zip(line, widths)))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the API endpoints at several dataset sizes.")
+    parser.add_argument("--sizes", default="1000", help="comma separated article counts (default: 1000)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint (default: 500)")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight (default: 16)")
+    parser.add_argument("--warmup", type=int, default=50, help="requests per endpoint before measuring")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the data and the request keys")
+    parser.add_argument("--database-url", help="seed and benchmark this database (its articles are replaced!)")
+    parser.add_argument("--no-seed", action="store_true", help="keep the existing data; --sizes is the row count")
+    parser.add_argument("--seed-workers", type=int, default=1, help="processes used by seed_db")
+    parser.add_argument("--base-url", help="benchmark a running server instead (no seeding); use with --rows")
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    parser.add_argument("--baseline", help="compare with a previous --json result file")
+    args = parser.parse_args(argv)
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+    for endpoint in args.endpoints:
+        if endpoint not in ENDPOINTS:
+            parser.error(f"unknown endpoint: {endpoint}")
+
+    if args.no_seed and not args.database_url:
+        parser.error("--no-seed needs --database-url")
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.worker:
+        # 子进程：结果以一行 JSON 输出到 stdout
+        print(json.dumps(asyncio.run(run_in_process(args))))
+        return
+
+    database = "remote" if args.base_url else (args.database_url or "sqlite").split(":", 1)[0]
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": database,
+            "db_mode": os.getenv("DB_MODE", "sync"),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "runs": [],
+    }
+    if args.base_url:
+        if not args.rows:
+            parser.error("--base-url needs --rows (the number of articles on the server)")
+        run = asyncio.run(run_remote(args))
+        report["runs"].append({"rows": args.rows, "seed_seconds": None, **run})
+    else:
+        for rows in (int(size) for size in args.sizes.split(",")):
+            if args.database_url:
+                report["runs"].append(bench_size(args, rows, args.database_url))
+                continue
+            with tempfile.TemporaryDirectory() as tmpdir:
+                report["runs"].append(bench_size(args, rows, f"sqlite:///{tmpdir}/bench.db"))
+
+    for run in report["runs"]:
+        memory = run["memory"] or {}
+        peak = memory.get("peak_rss_mb")
+        _print_table(
+            f"{run['rows']:,} rows" + (f" (peak RSS {peak:.0f} MB)" if peak else ""),
+            ["endpoint", "req/s", "p50 ms", "p95 ms", "p99 ms", "errors"],
+            [
+                [name, f"{r['throughput_rps']:,.0f}", f"{r['p50_ms']:.2f}", f"{r['p95_ms']:.2f}",
+                 f"{r['p99_ms']:.2f}", r["errors"]]
+                for name, r in run["endpoints"].items()
+            ],
+        )
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        _print_table(
+            f"compared with {args.baseline} ({baseline['meta'].get('commit')})",
+            ["rows", "endpoint", "p95 before", "p95 after", "p95", "req/s before", "req/s after", "req/s"],
+            compare(baseline, report),
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.json_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
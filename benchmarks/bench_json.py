@@ -0,0 +1,154 @@
+# backend/benchmarks/bench_json.py
+"""
+JSON 序列化 / 响应压缩基准
+
+对比各个 JSON 实现（orjson / msgspec / 标准库 json，以及 FastAPI 默认的
+jsonable_encoder + json.dumps）和各种 Content-Encoding 在 /api/posts、/api/search 上的吞吐。
+
+- 数据库默认是临时 SQLite 文件，用 scripts/seed_db.py 生成数据；也可以指定 --database-url
+- 请求在进程内通过 TestClient 发出，不经过网络，测到的是应用本身的 CPU 开销
+- 结果打印成表格，--json 可以同时写入文件，便于不同提交之间比较
+
+用法：
+    python -m benchmarks.bench_json
+    python -m benchmarks.bench_json --rows 5000 --requests 500 --json result.json
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+ENDPOINTS = {
+    "posts": ("/api/posts", {"limit": 100, "include_content": "true"}),
+    "search": ("/api/search", {"q": "database", "limit": 50}),
+}
+
+
+def _timed(fn: Callable[[], object], repeat: int) -> float:
+    """重复执行 fn，返回每秒次数（取 3 轮里最快的一轮）"""
+    rounds = []
+    for _ in range(3):
+        began = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        rounds.append(time.perf_counter() - began)
+    return repeat / min(rounds)
+
+
+def bench_serializers(payload, repeat: int) -> Dict[str, float]:
+    """只比较序列化本身：把同一份列表响应编码成 bytes"""
+    from fastapi.encoders import jsonable_encoder
+
+    from app.serialization import available_backends
+
+    results = {
+        "jsonable_encoder+json": _timed(
+            lambda: json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode("utf-8"), repeat
+        )
+    }
+    for name, dumps in available_backends().items():
+        results[name] = _timed(lambda: dumps(payload), repeat)
+    return results
+
+
+def bench_endpoints(client, requests: int) -> List[dict]:
+    """每种序列化实现 × 每种 Content-Encoding，分别压测列表和搜索接口"""
+    from app import serialization
+    from app.compression import COMPRESSORS
+
+    encodings = ["identity"] + list(COMPRESSORS)
+    results = []
+    previous = serialization.backend
+    try:
+        for backend in serialization.available_backends():
+            serialization.use_backend(backend)
+            for encoding in encodings:
+                for endpoint, (path, params) in ENDPOINTS.items():
+                    sizes = []
+                    latencies = []
+                    for _ in range(requests):
+                        began = time.perf_counter()
+                        r = client.get(path, params=params, headers={"Accept-Encoding": encoding})
+                        latencies.append(time.perf_counter() - began)
+                        r.raise_for_status()
+                        sizes.append(r.num_bytes_downloaded)
+                    results.append({
+                        "endpoint": endpoint,
+                        "backend": backend,
+                        "encoding": encoding,
+                        "requests_per_second": requests / sum(latencies),
+                        "mean_ms": statistics.fmean(latencies) * 1000,
+                        "response_bytes": int(statistics.fmean(sizes)),
+                    })
+    finally:
+        serialization.use_backend(previous)
+    return results
+
+
+def _print_table(title: str, header: List[str], rows: List[List[object]]) -> None:
+    print(f"\n{title}")
+    widths = [max(len(str(x)) for x in column) for column in zip(header, *rows)]
+    for line in [header] + rows:
+        print("  ".join(str(x).rjust(w) for x, w in zip(line, widths)))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON backends and response compression.")
+    parser.add_argument("--rows", type=int, default=2000, help="articles to seed (default: 2000)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint/backend/encoding")
+    parser.add_argument("--database-url", help="use an existing database instead of a seeded temp SQLite file")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.database_url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database_url = f"sqlite:///{tmpdir.name}/bench.db"
+        from scripts.seed_db import seed
+
+        seed(args.rows, database_url=args.database_url)
+
+    # app.db 在导入时读取 DATABASE_URL
+    os.environ["DATABASE_URL"] = args.database_url
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    try:
+        with TestClient(app) as client:
+            path, params = ENDPOINTS["posts"]
+            payload = client.get(path, params=params).json()
+            serializers = bench_serializers(payload, repeat=max(args.requests, 50))
+            endpoints = bench_endpoints(client, args.requests)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    _print_table(
+        f"serialize one /api/posts page ({len(payload)} posts)",
+        ["serializer", "ops/s"],
+        [[name, f"{ops:,.0f}"] for name, ops in serializers.items()],
+    )
+    _print_table(
+        "endpoints",
+        ["endpoint", "backend", "encoding", "req/s", "mean ms", "bytes"],
+        [
+            [r["endpoint"], r["backend"], r["encoding"], f"{r['requests_per_second']:,.0f}",
+             f"{r['mean_ms']:.2f}", r["response_bytes"]]
+            for r in endpoints
+        ],
+    )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"rows": args.rows, "serializers": serializers, "endpoints": endpoints}, f, indent=2)
+        print(f"\nresults written to {args.json_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# backend/benchmarks/bench_startup.py
+"""
+启动耗时基准
+
+每次测量都在新的子进程里进行（模块缓存、连接池都是冷的），分别记录：
+- import：导入 app.main 的耗时；DATABASE_URL 指向一个连不上的地址，导入必须成功
+- first_request：导入 + lifespan（迁移、预热、索引）+ 第一个 /api/health 请求
+  - empty：全新数据库，启动时从头执行迁移
+  - at_head：已经是最新版本，启动时只检查 alembic_version
+  - no_migrate：DB_MIGRATE_ON_STARTUP=false（迁移由发布流程执行）
+
+用法：
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --rows 5000 --runs 10 --json result.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_ONLY = """
+import time
+began = time.perf_counter()
+import app.main
+print(time.perf_counter() - began)
+"""
+
+FIRST_REQUEST = """
+import time
+began = time.perf_counter()
+from fastapi.testclient import TestClient
+import app.main
+with TestClient(app.main.app) as client:
+    client.get("/api/health").raise_for_status()
+    print(time.perf_counter() - began)
+"""
+
+
+def _run(code: str, env: Dict[str, str]) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _summary(samples: List[float]) -> dict:
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def bench(rows: int, runs: int) -> Dict[str, dict]:
+    from app.migrate import upgrade_database
+    from scripts.seed_db import seed
+    from sqlalchemy import create_engine
+
+    results = {}
+    unreachable = {"DATABASE_URL": "postgresql://nobody@127.0.0.1:1/none"}
+    results["import"] = _summary([_run(IMPORT_ONLY, unreachable) for _ in range(runs)])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        seeded = f"sqlite:///{tmpdir}/seeded.db"
+        seed(rows, database_url=seeded)
+
+        samples = []
+        for n in range(runs):
+            # 每次都是新的空数据库
+            samples.append(_run(FIRST_REQUEST, {"DATABASE_URL": f"sqlite:///{tmpdir}/empty{n}.db"}))
+        results["first_request_empty"] = _summary(samples)
+
+        engine = create_engine(seeded)
+        upgrade_database(engine)
+        engine.dispose()
+        results["first_request_at_head"] = _summary(
+            [_run(FIRST_REQUEST, {"DATABASE_URL": seeded}) for _ in range(runs)]
+        )
+        results["first_request_no_migrate"] = _summary(
+            [_run(FIRST_REQUEST, {"DATABASE_URL": seeded, "DB_MIGRATE_ON_STARTUP": "false"}) for _ in range(runs)]
+        )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark application import and startup time.")
+    parser.add_argument("--rows", type=int, default=2000, help="articles in the seeded database (default: 2000)")
+    parser.add_argument("--runs", type=int, default=5, help="subprocesses per scenario (default: 5)")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = bench(args.rows, args.runs)
+
+    header = ["scenario", "median ms", "min ms", "max ms"]
+    rows = [
+        [name, f"{r['median_ms']:.0f}", f"{r['min_ms']:.0f}", f"{r['max_ms']:.0f}"]
+        for name, r in results.items()
+    ]
+    widths = [max(len(str(x)) for x in column) for column in zip(header, *rows)]
+    for line in [header] + rows:
+        print("  ".join(str(x).rjust(w) for x, w in zip(line, widths)))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"rows": args.rows, "runs": args.runs, "results": results}, f, indent=2)
+        print(f"\nresults written to {args.json_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
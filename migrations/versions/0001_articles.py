@@ -0,0 +1,36 @@
+"""articles table
+
+最初用 Base.metadata.create_all 创建的表结构。旧数据库里已经有这张表时跳过。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("articles"):
+        return
+    op.create_table(
+        "articles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(255), nullable=False, unique=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("tags", sa.String(255), nullable=True),
+        sa.Column("slug", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_articles_id", "articles", ["id"])
+    op.create_index("ix_articles_slug", "articles", ["slug"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("articles")
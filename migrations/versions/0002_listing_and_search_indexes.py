@@ -0,0 +1,74 @@
+"""keyset pagination index, full-text search column
+
+- (created_at, id) 索引：列表 ORDER BY created_at DESC, id DESC 走索引
+- PostgreSQL：由 title/content 生成的 tsvector 列 + GIN 索引
+  （列不写进 ORM 模型，保持模型在 SQLite 等数据库上可用）
+
+PostgreSQL 上两个索引都用 CREATE INDEX CONCURRENTLY（在 autocommit_block 里执行），建索引期间不阻塞写入。
+STORED 生成列无法在线添加：ADD COLUMN 会在 ACCESS EXCLUSIVE 锁下重写整张表，期间读写都被阻塞。
+已有大量文章的库要在维护窗口执行这个迁移（DB_MIGRATE_ON_STARTUP=false，停写后 python -m app.migrate）。
+CONCURRENTLY 中途失败会留下 INVALID 索引，这里先删掉再重建。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'B')"
+)
+
+POSTGRES_STATEMENTS = [
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED",
+]
+
+# (索引名, CREATE INDEX CONCURRENTLY 语句)
+POSTGRES_INDEXES = [
+    (
+        "ix_articles_created_at_id",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_articles_created_at_id ON articles (created_at, id)",
+    ),
+    (
+        "ix_articles_search_vector",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)",
+    ),
+]
+
+INVALID_INDEX = sa.text(
+    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE c.relname = :name AND NOT i.indisvalid"
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        indexes = {index["name"] for index in sa.inspect(bind).get_indexes("articles")}
+        if "ix_articles_created_at_id" not in indexes:
+            op.create_index("ix_articles_created_at_id", "articles", ["created_at", "id"])
+        return
+    for statement in POSTGRES_STATEMENTS:
+        op.execute(statement)
+    # CONCURRENTLY 不能在事务里执行
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for name, statement in POSTGRES_INDEXES:
+            if bind.execute(INVALID_INDEX, {"name": name}).first() is not None:
+                bind.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            bind.execute(sa.text(statement))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_articles_search_vector")
+        op.execute("ALTER TABLE articles DROP COLUMN IF EXISTS search_vector")
+    op.drop_index("ix_articles_created_at_id", table_name="articles")
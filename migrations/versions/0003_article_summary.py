@@ -0,0 +1,71 @@
+"""articles.summary
+
+写入时生成的摘要，列表/搜索不用再读取正文。已有的文章在数据库里回填（正文不经过应用），
+按 id 范围分批更新，在 autocommit_block 里执行：每批单独提交，行锁和 WAL 不会积压到迁移结束，
+中途中断后重新执行会跳过已经回填的行（summary IS NULL）。
+SUMMARY_BACKFILL_BATCH_SIZE 调整每批行数（默认 5000）。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# 和 app.posts.make_summary 一致：超过 200 个字符时截断并加 "..."
+SUMMARY_LENGTH = 200
+BACKFILL_BATCH_SIZE = int(os.getenv("SUMMARY_BACKFILL_BATCH_SIZE", "5000"))
+
+articles = sa.table("articles", sa.column("id", sa.Integer), sa.column("content", sa.Text), sa.column("summary", sa.Text))
+
+
+def summary_sql(length: int = SUMMARY_LENGTH):
+    head = sa.func.substr(articles.c.content, 1, length, type_=sa.Text) + "..."
+    return sa.case((sa.func.length(articles.c.content) > length, head), else_=sa.func.coalesce(articles.c.content, ""))
+
+
+def backfill(bind, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    total = 0
+    last_id = 0
+    while True:
+        # 本批的 id 上界：从 last_id 往后数 batch_size 行
+        upper = bind.execute(
+            sa.select(articles.c.id)
+            .where(articles.c.id > last_id)
+            .order_by(articles.c.id)
+            .offset(batch_size - 1)
+            .limit(1)
+        ).scalar()
+        stmt = (
+            sa.update(articles)
+            .where(articles.c.id > last_id, articles.c.summary.is_(None))
+            .values(summary=summary_sql())
+        )
+        if upper is not None:
+            stmt = stmt.where(articles.c.id <= upper)
+        total += bind.execute(stmt).rowcount
+        if upper is None:
+            return total
+        last_id = upper
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("articles")}
+    if "summary" not in columns:
+        op.add_column("articles", sa.Column("summary", sa.Text(), nullable=True))
+    # 先提交加列，之后每条 UPDATE 自动提交
+    with op.get_context().autocommit_block():
+        backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("articles") as batch:
+        batch.drop_column("summary")
@@ -0,0 +1,105 @@
+"""tags / article_tags
+
+articles.tags 的规范化索引（见 app/tags.py）：按标签筛选走 article_tags 主键，
+标签文章数保存在 tags.article_count。已有文章的标签从 articles.tags 迁移过来。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+POSTGRES_MIGRATION = [
+    "INSERT INTO tags (name, article_count) "
+    "SELECT DISTINCT btrim(t), 0 FROM articles, unnest(string_to_array(articles.tags, ',')) AS t "
+    "WHERE btrim(t) <> '' ON CONFLICT (name) DO NOTHING",
+    "INSERT INTO article_tags (tag_id, article_id) "
+    "SELECT DISTINCT g.id, a.id FROM articles a "
+    "CROSS JOIN LATERAL unnest(string_to_array(a.tags, ',')) AS t "
+    "JOIN tags g ON g.name = btrim(t)",
+    "UPDATE tags SET article_count = c.n "
+    "FROM (SELECT tag_id, count(*) AS n FROM article_tags GROUP BY tag_id) c WHERE tags.id = c.tag_id",
+]
+
+articles = sa.table("articles", sa.column("id", sa.Integer), sa.column("tags", sa.String))
+tags = sa.table("tags", sa.column("id", sa.Integer), sa.column("name", sa.String), sa.column("article_count", sa.Integer))
+article_tags = sa.table("article_tags", sa.column("tag_id", sa.Integer), sa.column("article_id", sa.Integer))
+
+
+def _split(value: str):
+    return list(dict.fromkeys(t.strip() for t in value.split(",") if t.strip()))
+
+
+def migrate_tag_strings(bind) -> None:
+    """其它数据库：按 id 分批读取 articles.tags，写入标签和关联，最后写入计数"""
+    ids = {}
+    counts = Counter()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(articles.c.id, articles.c.tags)
+            .where(articles.c.id > last_id, articles.c.tags.isnot(None))
+            .order_by(articles.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        links = []
+        for article_id, value in rows:
+            for name in _split(value):
+                if name not in ids:
+                    stmt = sa.insert(tags).values(name=name, article_count=0).returning(tags.c.id)
+                    ids[name] = bind.execute(stmt).scalar()
+                links.append({"tag_id": ids[name], "article_id": article_id})
+                counts[name] += 1
+        if links:
+            bind.execute(sa.insert(article_tags), links)
+        last_id = rows[-1].id
+    if counts:
+        bind.execute(
+            sa.update(tags).where(tags.c.id == sa.bindparam("b_id")).values(article_count=sa.bindparam("b_count")),
+            [{"b_id": ids[name], "b_count": n} for name, n in counts.items()],
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("tags"):
+        op.create_table(
+            "tags",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False, unique=True),
+            sa.Column("article_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    if not inspector.has_table("article_tags"):
+        op.create_table(
+            "article_tags",
+            sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("article_id", sa.Integer(), sa.ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True),
+        )
+        op.create_index("ix_article_tags_article_id", "article_tags", ["article_id"])
+
+    # 关联表已经有数据（旧版本启动时已经迁移过）就不再处理
+    if bind.execute(sa.select(article_tags.c.article_id).limit(1)).first() is not None:
+        return
+    if bind.dialect.name == "postgresql":
+        for statement in POSTGRES_MIGRATION:
+            op.execute(statement)
+    else:
+        migrate_tag_strings(bind)
+
+
+def downgrade() -> None:
+    op.drop_table("article_tags")
+    op.drop_table("tags")
@@ -0,0 +1,57 @@
+"""title trigram index
+
+PostgreSQL：pg_trgm 扩展 + lower(title) 上的 GIN 索引，标题自动补全
+（app/suggest.py）的 LIKE 'prefix%' / '%prefix%' 查询走索引。
+扩展不可用（未安装或没有权限创建）时跳过，补全查询仍然可用，只是不走索引。
+索引用 CREATE INDEX CONCURRENTLY 创建（autocommit_block），不阻塞写入。
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+CREATE_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+CREATE_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_articles_title_trgm ON articles USING GIN (lower(title) gin_trgm_ops)"
+)
+INVALID_INDEX = (
+    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE c.relname = 'ix_articles_title_trgm' AND NOT i.indisvalid"
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    # 在保存点里创建扩展：失败时只回滚这一步，这个迁移的事务照常提交
+    savepoint = bind.begin_nested()
+    try:
+        bind.execute(sa.text(CREATE_EXTENSION))
+    except sa.exc.DBAPIError as e:
+        savepoint.rollback()
+        logger.warning("pg_trgm unavailable, skipping ix_articles_title_trgm: %s", e.orig)
+        return
+    savepoint.commit()
+    # CONCURRENTLY 不能在事务里执行；中途失败留下的 INVALID 索引先删掉
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        if bind.execute(sa.text(INVALID_INDEX)).first() is not None:
+            bind.execute(sa.text("DROP INDEX CONCURRENTLY IF EXISTS ix_articles_title_trgm"))
+        bind.execute(sa.text(CREATE_INDEX))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_articles_title_trgm")
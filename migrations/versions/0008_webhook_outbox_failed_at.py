@@ -0,0 +1,27 @@
+"""webhook_outbox.failed_at
+
+被 webhook 拒绝（4xx）的事件标记 failed_at，不再重试（见 app/webhooks.py）。
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("webhook_outbox")}
+    if "failed_at" in columns:
+        return
+    op.add_column("webhook_outbox", sa.Column("failed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("webhook_outbox") as batch:
+        batch.drop_column("failed_at")
@@ -0,0 +1,98 @@
+"""
+Shared fixtures for tests that need real SQL semantics.
+
+`tests/test_main.py` exercises the routes against a hand-rolled fake
+session. Features such as keyset pagination or column projection depend on
+what the database actually does with the generated SQL, so those tests run
+against an in-memory SQLite database instead. SQLite is only a stand-in for
+PostgreSQL here; Postgres-only paths fall back to their portable variants.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import main
+from app.main import app, get_db, homepage, missing_posts, post_cache
+from app.model import Base
+from app.suggest import title_index
+
+
+@pytest.fixture(autouse=True)
+def _no_startup_migration(monkeypatch):
+    """`TestClient(app)` runs the real lifespan; it must not migrate whatever DATABASE_URL points at.
+
+    The other startup tasks that read the database (the BM25 index build, cache
+    warm-up) go through `get_db`, so they follow the test's dependency override.
+    """
+    monkeypatch.setattr(main, "DB_MIGRATE_ON_STARTUP", False)
+
+
+@pytest.fixture(autouse=True)
+def _clear_process_caches():
+    """Module-level caches outlive a single test; start every test empty."""
+    post_cache.clear()
+    missing_posts.clear()
+    homepage.reset()
+    title_index.reset()
+    yield
+    post_cache.clear()
+    missing_posts.clear()
+    homepage.reset()
+    title_index.reset()
+
+
+@pytest.fixture
+def no_homepage_snapshot(monkeypatch):
+    """Serve `/api/posts` from SQL, for tests that inspect the list query itself."""
+    monkeypatch.setattr(homepage, "capacity", 0)
+
+
+@pytest.fixture
+def sqlite_engine():
+    """A fresh in-memory SQLite engine with the schema created."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(sqlite_engine):
+    """A session on the SQLite engine, used to seed rows directly."""
+    session = sessionmaker(bind=sqlite_engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def sqlite_client(sqlite_engine):
+    """A TestClient whose `get_db` dependency is backed by the SQLite engine."""
+    factory = sessionmaker(bind=sqlite_engine, autocommit=False, autoflush=False)
+
+    def _override():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = _override
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,130 @@
+"""
+Tests for admission control (`app/admission.py`).
+
+The limiter tests drive their own event loop via `asyncio.run`; the
+middleware is exercised through httpx's ASGI transport so that several
+requests can be in flight at once.
+"""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app import admission as admission_module
+from app.admission import AdmissionController, AdmissionMiddleware, Limiter, parse_route_limits
+from app.metrics import render_prometheus
+
+
+def test_parse_route_limits():
+    assert parse_route_limits("/api/search=4, /api/posts/export=1,bad,/x=y") == {
+        "/api/search": 4,
+        "/api/posts/export": 1,
+    }
+
+
+def test_limiter_queues_in_order_and_rejects_when_full():
+    async def scenario():
+        limiter = Limiter("read", limit=1, max_queue=2, queue_timeout=5)
+        assert await limiter.acquire()
+        order = []
+
+        async def waiter(name):
+            assert await limiter.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter(n)) for n in ("a", "b")]
+        await asyncio.sleep(0)
+        assert limiter.stats()["queue_depth"] == 2
+        assert not await limiter.acquire()  # queue full
+
+        limiter.release()
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        limiter.release()
+
+        stats = limiter.stats()
+        assert order == ["a", "b"]
+        assert (stats["in_flight"], stats["queue_depth"], stats["admitted"], stats["queued"]) == (0, 0, 3, 2)
+        assert stats["rejected"] == {"queue_full": 1, "queue_timeout": 0}
+        assert stats["queue_seconds"]["count"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_limiter_gives_up_after_the_queue_timeout():
+    async def scenario():
+        limiter = Limiter("write", limit=1, max_queue=5, queue_timeout=0.01)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        assert limiter.stats()["queue_depth"] == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+        assert limiter.rejected_timeout == 1
+
+    asyncio.run(scenario())
+
+
+def _slow_app(controller):
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/api/search")
+    async def search():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/api/posts")
+    async def posts():
+        return []
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app, release
+
+
+def test_route_limit_sheds_load_with_503():
+    async def scenario():
+        controller = AdmissionController(read_limit=10, write_limit=2, route_limits={"/api/search": 1},
+                                         max_queue=0, retry_after=3)
+        app, release = _slow_app(controller)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(client.get("/api/search"))
+            await asyncio.sleep(0.01)
+
+            busy = await client.get("/api/search")
+            assert busy.status_code == 503
+            assert busy.headers["retry-after"] == "3"
+            # other reads still have capacity
+            assert (await client.get("/api/posts")).status_code == 200
+            assert controller.read.in_flight == 1
+
+            release.set()
+            assert (await slow).status_code == 200
+
+        stats = controller.stats()["limiters"]
+        assert stats["route:/api/search"]["rejected"]["queue_full"] == 1
+        assert stats["route:/api/search"]["in_flight"] == 0
+        assert stats["read"]["admitted"] == 2
+        return controller
+
+    controller = asyncio.run(scenario())
+    text = render_prometheus(admission=controller.stats())
+    assert 'admission_rejected_total{limiter="route:/api/search",reason="queue_full"} 1' in text
+    assert 'admission_queue_depth{limiter="read"} 0' in text
+
+
+def test_busy_app_rejects_reads_but_serves_health(sqlite_client, monkeypatch):
+    controller = AdmissionController(read_limit=1, write_limit=1, route_limits={}, max_queue=0)
+    monkeypatch.setattr(admission_module, "controller", controller)
+    controller.read.in_flight = 1  # every read slot taken
+
+    assert sqlite_client.get("/api/posts").status_code == 503
+    assert sqlite_client.get("/api/health").status_code == 200
+    assert sqlite_client.post("/api/posts", json={"title": "t", "content": "c"}).status_code == 200
+    assert sqlite_client.get("/api/internal/admission").json()["limiters"]["read"]["rejected"]["queue_full"] == 1
@@ -0,0 +1,92 @@
+"""
+Tests for the DB_MODE=async routes (`app/routes_async.py`).
+
+The routes are mounted on a throwaway FastAPI app backed by SQLite through
+aiosqlite, so they run without Postgres/asyncpg. Skipped when aiosqlite is
+not installed.
+"""
+
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.db import get_async_db, to_async_url
+from app.model import Article, Base
+from app.routes_async import router
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with sessionmaker(bind=sync_engine)() as session:
+        session.add(Article(title="Async", content="async body", slug="async", created_at=datetime(2024, 1, 1)))
+        session.commit()
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+    factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def _override():
+        async with factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = _override
+    with TestClient(app) as client:
+        yield client
+
+
+def test_to_async_url():
+    assert to_async_url("postgresql://u:p@h:5432/db") == "postgresql+asyncpg://u:p@h:5432/db"
+    assert to_async_url("postgresql+psycopg2://u@h/db") == "postgresql+asyncpg://u@h/db"
+    assert to_async_url("sqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+def test_async_routes_read_and_write(async_client):
+    r = async_client.get("/api/posts")
+    assert r.status_code == 200
+    assert [p["slug"] for p in r.json()] == ["async"]
+
+    assert async_client.get("/api/posts/1").json()["title"] == "Async"
+    assert async_client.get("/api/post/slug/async").json()["id"] == 1
+    assert async_client.get("/api/posts/99").status_code == 404
+
+    created = async_client.post("/api/posts", json={"title": "Second", "content": "more async text", "slug": "second"})
+    assert created.status_code == 200
+    assert created.json()["id"] == 2
+
+    hits = async_client.get("/api/search", params={"q": "async"}).json()
+    assert {p["slug"] for p in hits} == {"async", "second"}
+
+
+def test_async_routes_accept_fields(async_client):
+    assert async_client.get("/api/posts", params={"fields": "id,slug"}).json() == [{"id": 1, "slug": "async"}]
+    assert async_client.get("/api/posts/1", params={"fields": "title"}).json() == {"title": "Async"}
+    assert async_client.get("/api/post/slug/async", params={"fields": "id"}).json() == {"id": 1}
+    hits = async_client.get("/api/search", params={"q": "async", "fields": "href"}).json()
+    assert hits == [{"href": "/article/async"}]
+
+
+def test_async_bulk_ingest(async_client):
+    body = '{"title": "b1", "content": "x"}\n{"title": "Async", "content": "dup"}\n'
+    r = async_client.post("/api/posts/bulk", content=body)
+    assert r.status_code == 200
+    assert (r.json()["inserted"], r.json()["skipped"]) == (1, 1)
+
+
+def test_async_export_streams_ndjson(async_client):
+    r = async_client.get("/api/posts/export", params={"fields": "id,slug"})
+    assert r.status_code == 200
+    assert r.text == '{"id":1,"slug":"async"}\n'
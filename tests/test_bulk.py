@@ -0,0 +1,150 @@
+"""
+Tests for the bulk ingestion endpoint `POST /api/posts/bulk` (`app/bulk.py`).
+"""
+
+import json
+
+import pytest
+
+from app import bulk
+from app.bulk import StreamingRowParser
+from app.model import Article
+
+
+def _ndjson(rows):
+    return "\n".join(json.dumps(r) for r in rows) + "\n"
+
+
+def _post(client, body, **params):
+    return client.post("/api/posts/bulk", params=params, content=body.encode("utf-8"))
+
+
+def _parse_in_chunks(body: bytes, size: int):
+    parser = StreamingRowParser()
+    rows = []
+    for i in range(0, len(body), size):
+        rows.extend(parser.feed(body[i:i + size]))
+    rows.extend(parser.close())
+    return parser, rows
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+def test_parser_ndjson_and_array_give_same_rows_at_any_chunk_size(size):
+    rows = [{"title": "t1", "content": "内容"}, {"title": "t2", "content": "c", "n": 123}]
+    _, from_ndjson = _parse_in_chunks(_ndjson(rows).encode(), size)
+    _, from_array = _parse_in_chunks(json.dumps(rows, ensure_ascii=False).encode(), size)
+    assert [obj for _, obj, _ in from_ndjson] == rows
+    assert [obj for _, obj, _ in from_array] == rows
+    assert [n for n, _, _ in from_array] == [1, 2]
+
+
+def test_parser_reports_bad_lines_and_truncated_arrays():
+    _, rows = _parse_in_chunks(b'{"a": 1}\nnot json\n\n{"b": 2}', 4)
+    assert [(n, err is None) for n, _, err in rows] == [(1, True), (2, False), (4, True)]
+
+    parser, rows = _parse_in_chunks(b'[{"a": 1}, {"b"', 4)
+    assert len(rows) == 1
+    assert parser.fatal
+
+
+def test_row_limit_counts_utf8_bytes_not_characters(monkeypatch):
+    """20 CJK characters are 60 bytes, over a 50-byte limit although only 20 characters long."""
+    monkeypatch.setattr(bulk, "MAX_ROW_BYTES", 50)
+    parser = StreamingRowParser()
+    assert parser.feed(('{"content": "' + "中" * 20).encode()) == []
+    assert parser.fatal == "Row 1 exceeds 50 bytes"
+
+    parser = StreamingRowParser()
+    parser.feed(b'{"content": "' + b"x" * 20)
+    assert parser.fatal is None
+
+
+def test_bulk_inserts_in_batches_and_indexes_rows(sqlite_client, db_session):
+    rows = [{"title": f"bulk {i}", "content": f"body {i}", "tags": ["x"], "slug": f"bulk-{i}"} for i in range(5)]
+    r = _post(sqlite_client, _ndjson(rows), batch_size=2)
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["received"], body["inserted"], body["batches"], body["failed"]) == (5, 5, 3, 0)
+
+    assert db_session.query(Article).count() == 5
+    assert db_session.query(Article).filter_by(slug="bulk-3").one().tags == "x"
+    assert sqlite_client.get("/api/post/slug/bulk-3").json()["title"] == "bulk 3"
+
+
+def test_bulk_accepts_json_array(sqlite_client):
+    rows = [{"title": "a", "content": "1"}, {"title": "b", "content": "2"}]
+    r = _post(sqlite_client, json.dumps(rows))
+    assert r.status_code == 200
+    assert r.json()["inserted"] == 2
+
+
+def test_bulk_skip_mode_skips_conflicts_and_reports_invalid_rows(sqlite_client, db_session):
+    db_session.add(Article(title="existing", content="old", slug="existing"))
+    db_session.commit()
+    body = _ndjson([
+        {"title": "existing", "content": "new"},
+        {"title": "fresh", "content": "x"},
+        {"title": "fresh", "content": "duplicate in upload"},
+        {"title": "no content"},
+    ])
+    r = _post(sqlite_client, body)
+    assert r.status_code == 200
+    summary = r.json()
+    assert (summary["inserted"], summary["skipped"], summary["failed"]) == (1, 2, 1)
+    assert summary["errors"][0]["row"] == 4
+    db_session.expire_all()
+    assert db_session.query(Article).filter_by(title="existing").one().content == "old"
+
+
+def test_bulk_upsert_updates_existing_titles(sqlite_client, db_session):
+    db_session.add(Article(title="existing", content="old", slug="old-slug"))
+    db_session.commit()
+    assert sqlite_client.get("/api/post/slug/old-slug").status_code == 200
+
+    body = _ndjson([
+        {"title": "existing", "content": "new", "slug": "new-slug"},
+        {"title": "other", "content": "x"},
+    ])
+    r = _post(sqlite_client, body, on_conflict="upsert")
+    assert r.status_code == 200
+    assert (r.json()["inserted"], r.json()["updated"]) == (1, 1)
+
+    assert sqlite_client.get("/api/post/slug/new-slug").json()["content"] == "new"
+    # the cached response for the old slug was invalidated
+    assert sqlite_client.get("/api/post/slug/old-slug").status_code == 404
+
+
+def test_bulk_upsert_falls_back_to_row_by_row_on_slug_conflict(sqlite_client, db_session):
+    db_session.add(Article(title="owner", content="x", slug="taken"))
+    db_session.commit()
+    body = _ndjson([
+        {"title": "a", "content": "1"},
+        {"title": "b", "content": "2", "slug": "taken"},
+    ])
+    r = _post(sqlite_client, body, on_conflict="upsert")
+    summary = r.json()
+    assert (summary["inserted"], summary["failed"]) == (1, 1)
+    assert summary["errors"][0]["row"] == 2
+
+
+def test_bulk_fail_mode_stops_at_first_error(sqlite_client, db_session):
+    db_session.add(Article(title="existing", content="old"))
+    db_session.commit()
+    body = _ndjson([
+        {"title": "first", "content": "1"},
+        {"title": "existing", "content": "2"},
+        {"title": "never", "content": "3"},
+    ])
+    r = _post(sqlite_client, body, on_conflict="fail")
+    assert r.status_code == 409
+    summary = r.json()
+    assert summary["stopped"] is True
+    assert summary["errors"][0]["row"] == 2
+    titles = {t for (t,) in db_session.query(Article.title)}
+    assert titles == {"existing", "first"}
+
+
+def test_bulk_rejects_malformed_array(sqlite_client):
+    r = _post(sqlite_client, '[{"title": "a", "content": "1"} {"title": "b"}]')
+    assert r.status_code == 400
+    assert r.json()["inserted"] == 1
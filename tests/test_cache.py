@@ -0,0 +1,121 @@
+"""
+Tests for the bounded LRU/TTL cache (`app/cache.py`) and the single-post
+read-through cache built on it.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.cache import TTLCache
+from app.main import post_cache
+from app.model import Article
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)  # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("k", "v")
+    clock.now = 4.9
+    assert cache.get("k") == "v"
+    clock.now = 5.0
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_size_disables_cache():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+    assert cache.stats()["size"] == 0
+
+
+def _count_selects(engine):
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", _capture)
+
+
+def test_repeated_lookups_are_served_from_cache(sqlite_client, sqlite_engine, db_session):
+    db_session.add(Article(title="Cached", content="body", slug="cached", created_at=datetime(2024, 1, 1)))
+    db_session.commit()
+
+    hits_before = post_cache.stats()["hits"]
+    statements, stop = _count_selects(sqlite_engine)
+    try:
+        for _ in range(3):
+            assert sqlite_client.get("/api/post/slug/cached").json()["title"] == "Cached"
+            assert sqlite_client.get("/api/posts/1").json()["title"] == "Cached"
+    finally:
+        stop()
+
+    assert len(statements) == 2
+    assert sqlite_client.get("/api/internal/cache").json()["posts"]["hits"] - hits_before == 4
+
+
+def test_create_post_invalidates_numeric_slug_lookup(sqlite_client, db_session):
+    """A cached `/api/post/slug/2` (resolved by id) must not hide a new post whose slug is "2"."""
+    db_session.add(Article(title="First", content="a", created_at=datetime(2024, 1, 1)))
+    db_session.add(Article(title="Second", content="b", created_at=datetime(2024, 1, 2)))
+    db_session.commit()
+
+    assert sqlite_client.get("/api/post/slug/2").json()["title"] == "Second"
+    assert post_cache.stats()["size"] == 1
+
+    sqlite_client.post("/api/posts", json={"title": "Slug two", "content": "c", "slug": "2"})
+    assert sqlite_client.get("/api/post/slug/2").json()["title"] == "Slug two"
+
+
+def test_numeric_slug_resolves_in_one_query_and_prefers_slug(sqlite_client, sqlite_engine, db_session):
+    db_session.add(Article(title="By id", content="a", slug="first", created_at=datetime(2024, 1, 1)))
+    db_session.add(Article(title="By slug", content="b", slug="1", created_at=datetime(2024, 1, 2)))
+    db_session.commit()
+
+    statements, stop = _count_selects(sqlite_engine)
+    try:
+        assert sqlite_client.get("/api/post/slug/1").json()["title"] == "By slug"
+        assert sqlite_client.get("/api/post/slug/2").json()["title"] == "By slug"
+        assert sqlite_client.get("/api/post/slug/99").status_code == 404
+    finally:
+        stop()
+    assert len(statements) == 3
+
+
+def test_missing_slugs_are_cached_until_created(sqlite_client, sqlite_engine):
+    statements, stop = _count_selects(sqlite_engine)
+    try:
+        for _ in range(3):
+            assert sqlite_client.get("/api/post/slug/ghost").status_code == 404
+            assert sqlite_client.get("/api/posts/7").status_code == 404
+    finally:
+        stop()
+    assert len(statements) == 2
+    assert sqlite_client.get("/api/internal/cache").json()["missing_posts"]["hits"] == 4
+
+    sqlite_client.post("/api/posts", json={"title": "Ghost", "content": "boo", "slug": "ghost"})
+    assert sqlite_client.get("/api/post/slug/ghost").json()["title"] == "Ghost"
@@ -0,0 +1,156 @@
+"""
+Tests for response compression (`app/compression.py`) and the JSON
+serialization backends (`app/serialization.py`).
+"""
+
+import gzip
+import json
+import zlib
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import serialization
+from app.compression import CompressionMiddleware, negotiate
+from app.model import Article
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("zstd;q=0, gzip;q=0, *;q=0.1", "br"),
+        ("identity", None),
+        ("", None),
+        ("*", "zstd"),
+    ],
+)
+def test_negotiate_respects_q_values_and_server_preference(header, expected):
+    assert negotiate(header, ["zstd", "br", "gzip"]) == expected
+
+
+def _app(minimum_size=100):
+    app = FastAPI(default_response_class=serialization.FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size, encodings=["gzip"])
+
+    @app.get("/big")
+    def big():
+        return {"items": ["x" * 50] * 20}
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/text")
+    def text():
+        return PlainTextResponse("y" * 500, headers={"ETag": '"abc"'})
+
+    @app.get("/not-modified")
+    def not_modified():
+        return Response(status_code=304, headers={"ETag": '"abc"'})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((b'{"n":%d}\n' % i for i in range(3)), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+
+def _raw_get(client, path, encoding="gzip"):
+    # stream=True keeps httpx from decoding the body so the raw bytes can be checked
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+def test_large_json_is_gzipped_with_length_and_vary():
+    r, raw = _raw_get(_app(), "/big")
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) == len(raw)
+    assert json.loads(gzip.decompress(raw)) == {"items": ["x" * 50] * 20}
+
+
+def test_small_or_unaccepted_responses_are_not_compressed():
+    client = _app()
+    r, raw = _raw_get(client, "/small")
+    assert "content-encoding" not in r.headers
+    assert raw == b'{"ok":true}'
+    r, _ = _raw_get(client, "/big", encoding="identity")
+    assert "content-encoding" not in r.headers
+
+
+def test_compressed_response_gets_a_strong_etag_per_encoding():
+    r, raw = _raw_get(_app(), "/text")
+    assert r.headers["etag"] == '"abc-gzip"'
+    assert gzip.decompress(raw) == b"y" * 500
+
+
+def test_not_modified_echoes_the_representation_the_client_holds():
+    """A 304 carries the validator of the cached representation, encoded or not."""
+    client = _app()
+    for held in ('"abc-gzip"', '"abc"'):
+        r = client.get("/not-modified", headers={"Accept-Encoding": "gzip", "If-None-Match": held})
+        assert r.status_code == 304
+        assert r.headers["etag"] == held
+        assert r.headers["vary"] == "Accept-Encoding"
+    r, _ = _raw_get(client, "/not-modified", encoding="identity")
+    assert r.headers["etag"] == '"abc"'
+
+
+def test_encoded_etags_match_the_plain_validator(sqlite_client, db_session):
+    db_session.add_all(
+        Article(title=f"post {i}", content="c" * 300, slug=f"etag-{i}", created_at=datetime(2024, 1, i + 1))
+        for i in range(10)
+    )
+    db_session.commit()
+    r = sqlite_client.get("/api/posts", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    etag = r.headers["etag"]
+    assert etag.endswith('-gzip"') and not etag.startswith("W/")
+
+    r2 = sqlite_client.get("/api/posts", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert r2.status_code == 304 and r2.headers["etag"] == etag
+    r3 = sqlite_client.get("/api/posts", headers={"Accept-Encoding": "identity"})
+    assert r3.headers["etag"] == etag.replace("-gzip", "")
+
+
+def test_streaming_response_is_compressed_incrementally():
+    r, raw = _raw_get(_app(), "/stream")
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert zlib.decompress(raw, 31) == b'{"n":0}\n{"n":1}\n{"n":2}\n'
+
+
+def test_list_endpoint_is_compressed_end_to_end(sqlite_client, db_session):
+    db_session.add_all(
+        Article(title=f"Post {i}", content="body " * 200, slug=f"post-{i}", tags="a,b") for i in range(20)
+    )
+    db_session.commit()
+    r = sqlite_client.get("/api/posts", params={"include_content": True}, headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert len(r.json()) == 20
+
+
+@pytest.mark.parametrize("name", list(serialization.available_backends()))
+def test_backends_produce_equivalent_json(name):
+    payload = {"title": "中文", "n": 1, "tags": ["a"], "none": None}
+    previous = serialization.backend
+    try:
+        assert serialization.use_backend(name) == name
+        assert json.loads(serialization.dumps(payload)) == payload
+        assert "中文".encode("utf-8") in serialization.dumps(payload)
+    finally:
+        serialization.use_backend(previous)
+
+
+def test_unknown_backend_falls_back_to_auto():
+    previous = serialization.backend
+    try:
+        assert serialization.use_backend("nope") in serialization.available_backends()
+    finally:
+        serialization.use_backend(previous)
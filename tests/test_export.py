@@ -0,0 +1,78 @@
+"""
+Tests for the streaming NDJSON export `GET /api/posts/export`.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import export
+from app.model import Article
+
+
+def _seed(session, n):
+    base = datetime(2024, 1, 1)
+    for i in range(1, n + 1):
+        session.add(
+            Article(
+                title=f"post {i}",
+                content=f"body {i}",
+                tags="a, b",
+                slug=f"post-{i}",
+                created_at=base + timedelta(days=i),
+            )
+        )
+    session.commit()
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_streams_every_row_in_id_order(sqlite_client, db_session, monkeypatch):
+    _seed(db_session, 30)
+    # force several chunks
+    monkeypatch.setattr(export, "EXPORT_CHUNK_BYTES", 200)
+    r = sqlite_client.get("/api/posts/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    rows = _lines(r)
+    assert [row["id"] for row in rows] == list(range(1, 31))
+    assert rows[0]["tags"] == ["a", "b"]
+    assert rows[0]["content"] == "body 1"
+    assert rows[0]["created_at"].startswith("2024-01-02")
+
+
+def test_export_fields_only_selects_requested_columns(sqlite_client, db_session, sqlite_engine):
+    _seed(db_session, 3)
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sqlite_engine, "before_cursor_execute", _capture)
+    try:
+        r = sqlite_client.get("/api/posts/export", params={"fields": "slug,title"})
+    finally:
+        event.remove(sqlite_engine, "before_cursor_execute", _capture)
+
+    assert _lines(r)[0] == {"slug": "post-1", "title": "post 1"}
+    select = next(s for s in statements if s.lstrip().upper().startswith("SELECT"))
+    assert "content" not in select
+
+
+def test_export_since_filters_on_created_and_updated(sqlite_client, db_session):
+    _seed(db_session, 5)
+    old = db_session.query(Article).filter_by(id=1).one()
+    old.updated_at = datetime(2030, 1, 1)
+    db_session.commit()
+
+    r = sqlite_client.get("/api/posts/export", params={"since": "2024-01-04T12:00:00", "fields": "id"})
+    assert [row["id"] for row in _lines(r)] == [1, 4, 5]
+
+
+def test_export_rejects_unknown_fields(sqlite_client):
+    r = sqlite_client.get("/api/posts/export", params={"fields": "id,password"})
+    assert r.status_code == 400
+    assert "password" in r.json()["detail"]
@@ -0,0 +1,109 @@
+"""
+Tests for sparse fieldsets (`?fields=`) on the post and search endpoints.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.fields import columns_for
+from app.model import Article
+from app.posts import POST_FIELDS, SEARCH_FIELDS, make_summary
+from app.search import build_fts_query
+
+ALL_POST_FIELDS = ",".join(POST_FIELDS)
+SLIM = "id,title,slug,href"
+
+
+def _seed(session, n=3):
+    base = datetime(2024, 1, 1)
+    for i in range(1, n + 1):
+        session.add(Article(title=f"Post {i}", content=f"fastapi body {i} " + "x" * 300, tags="a,b",
+                            slug=f"post-{i}", summary=f"summary {i}", created_at=base + timedelta(days=i)))
+    # a row written before summaries were persisted
+    session.add(Article(title="Legacy", content="legacy fastapi " + "y" * 300, slug="legacy", summary=None,
+                        created_at=base))
+    session.commit()
+
+
+@pytest.fixture
+def selects(sqlite_engine):
+    """The column list (the part before FROM) of every SELECT executed."""
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            captured.append(statement.split("FROM articles")[0])
+
+    event.listen(sqlite_engine, "before_cursor_execute", _capture)
+    yield captured
+    event.remove(sqlite_engine, "before_cursor_execute", _capture)
+
+
+def test_all_fields_match_the_default_format(sqlite_client, db_session):
+    _seed(db_session)
+    assert sqlite_client.get("/api/posts", params={"fields": ALL_POST_FIELDS}).json() == \
+        sqlite_client.get("/api/posts").json()
+    for path in ("/api/posts/1", "/api/post/slug/legacy"):
+        assert sqlite_client.get(path, params={"fields": ALL_POST_FIELDS}).json() == sqlite_client.get(path).json()
+    search = sqlite_client.get("/api/search", params={"q": "fastapi"}).json()
+    assert sqlite_client.get("/api/search", params={"q": "fastapi", "fields": ",".join(SEARCH_FIELDS)}).json() == search
+
+
+def test_slim_fields_select_only_their_columns(sqlite_client, db_session, selects):
+    _seed(db_session)
+    selects.clear()
+    posts = sqlite_client.get("/api/posts", params={"fields": SLIM, "limit": 2})
+    assert [list(p) for p in posts.json()] == [["id", "title", "slug", "href"]] * 2
+    assert posts.json()[0] == {"id": 3, "title": "Post 3", "slug": "post-3", "href": "/article/post-3"}
+    one = sqlite_client.get("/api/posts/2", params={"fields": "title"}).json()
+    assert one == {"title": "Post 2"}
+    by_slug = sqlite_client.get("/api/post/slug/post-1", params={"fields": "slug,tags"}).json()
+    assert by_slug == {"slug": "post-1", "tags": ["a", "b"]}
+    hits = sqlite_client.get("/api/search", params={"q": "legacy", "fields": SLIM}).json()
+    assert hits == [{"id": 4, "title": "Legacy", "slug": "legacy", "href": "/article/legacy"}]
+
+    assert len(selects) == 4
+    for columns in selects:
+        assert "content" not in columns and "summary" not in columns
+
+
+def test_summary_without_content_reads_only_a_prefix(sqlite_client, db_session, selects):
+    _seed(db_session)
+    selects.clear()
+    body = sqlite_client.get("/api/post/slug/legacy", params={"fields": "summary"}).json()
+    assert body == {"summary": make_summary("legacy fastapi " + "y" * 300)}
+    assert "substr(articles.content" in selects[0]
+    assert "articles.content AS" not in selects[0]
+
+
+def test_fields_keep_cursor_pagination(sqlite_client, db_session):
+    _seed(db_session)
+    first = sqlite_client.get("/api/posts", params={"fields": "id", "limit": 2})
+    assert first.json() == [{"id": 3}, {"id": 2}]
+    rest = sqlite_client.get("/api/posts", params={"fields": "id", "limit": 2,
+                                                   "cursor": first.headers["x-next-cursor"]})
+    assert rest.json() == [{"id": 1}, {"id": 4}]
+
+
+def test_unknown_fields_are_rejected(sqlite_client, db_session):
+    _seed(db_session)
+    for path in ("/api/posts", "/api/posts/1", "/api/post/slug/post-1"):
+        r = sqlite_client.get(path, params={"fields": "id,secret"})
+        assert r.status_code == 400
+        assert "secret" in r.json()["detail"]
+    assert sqlite_client.get("/api/search", params={"q": "x", "fields": "content"}).status_code == 400
+    assert sqlite_client.get("/api/posts/99", params={"fields": "id"}).status_code == 404
+
+
+def test_fts_query_skips_headline_and_prefix_when_not_requested():
+    session = Session(bind=create_engine("postgresql://user:pw@localhost/db"))
+    columns = columns_for(["id", "title"], SEARCH_FIELDS)
+    sql = str(build_fts_query(session, "fastapi", columns, summary=False, snippet=False)
+              .statement.compile(dialect=postgresql.dialect()))
+    assert "ts_headline" not in sql
+    assert "substr" not in sql
+    assert "articles.content" not in sql
@@ -0,0 +1,199 @@
+"""
+Tests for the materialized homepage snapshot (`app/homepage.py`).
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import posts
+from app.homepage import MaterializedHomepage
+from app.model import Article, Base
+
+
+def _seed(session, n, start=1):
+    base = datetime(2024, 1, 1)
+    for i in range(start, start + n):
+        session.add(Article(title=f"post {i}", content=f"body {i} " + "x" * 300, tags="a,b",
+                            slug=f"post-{i}", created_at=base + timedelta(minutes=i)))
+    session.commit()
+
+
+@pytest.fixture
+def statements(sqlite_engine):
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(sqlite_engine, "before_cursor_execute", _capture)
+    yield captured
+    event.remove(sqlite_engine, "before_cursor_execute", _capture)
+
+
+def _walk(client, **params):
+    """Follow X-Next-Cursor through every page; returns (body, etag) per page."""
+    pages, cursor = [], None
+    while True:
+        r = client.get("/api/posts", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        pages.append((r.content, r.headers["etag"]))
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("include_content", ["true", "false"])
+def test_snapshot_pages_match_the_sql_path(sqlite_client, db_session, monkeypatch, include_content):
+    _seed(db_session, 12)
+    # the snapshot loads the slim format only; full pages are filled in by the first SQL walk
+    _walk(sqlite_client, limit=5, include_content=include_content)
+    hits = posts.homepage.hits
+    from_snapshot = _walk(sqlite_client, limit=5, include_content=include_content)
+    assert posts.homepage.hits - hits == 3
+
+    monkeypatch.setattr(posts.homepage, "capacity", 0)
+    assert _walk(sqlite_client, limit=5, include_content=include_content) == from_snapshot
+
+
+def test_snapshot_load_does_not_read_content(sqlite_client, db_session, statements):
+    _seed(db_session, 3)
+    statements.clear()
+    hits = posts.homepage.hits
+    assert len(sqlite_client.get("/api/posts", params={"include_content": "false"}).json()) == 3
+    assert posts.homepage.hits - hits == 1
+    (load,) = [s for s in statements if "FROM articles" in s]
+    assert "articles.content AS" not in load
+    assert all(e.full is None for e in posts.homepage._state.entries)
+
+
+def _replica_request(replica, primary):
+    replica.info["primary_session"] = primary
+    return Request({"type": "http", "method": "GET", "path": "/api/posts", "headers": []})
+
+
+def test_snapshot_loads_from_the_primary_and_fills_from_the_replica(sqlite_engine, db_session, monkeypatch):
+    loaded_from = []
+
+    def loader(db, n):
+        loaded_from.append(db)
+        return posts._load_homepage(db, n)
+
+    monkeypatch.setattr(posts, "homepage", MaterializedHomepage(10, loader))
+    _seed(db_session, 3)
+    replica = sessionmaker(bind=sqlite_engine)()
+    request = _replica_request(replica, db_session)
+
+    r = posts.list_posts(replica, request, 2, None, True)
+    assert loaded_from == [db_session]
+    # the replica returned the same versions the snapshot holds, so its full format is kept
+    assert [p["slug"] for p in json.loads(r.body)] == ["post-3", "post-2"]
+    filled = {e.id for e in posts.homepage._state.entries if e.full is not None}
+    assert filled == {2, 3}
+    replica.close()
+
+
+def test_lagging_replica_rows_are_not_filled_in(db_session, monkeypatch, tmp_path):
+    monkeypatch.setattr(posts, "homepage", MaterializedHomepage(10, posts._load_homepage))
+    _seed(db_session, 3)
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=engine)
+    replica = sessionmaker(bind=engine)()
+    _seed(replica, 3)
+    # the primary has since edited post 3; the replica has not caught up
+    db_session.get(Article, 3).title = "edited"
+    db_session.commit()
+    request = _replica_request(replica, db_session)
+
+    r = posts.list_posts(replica, request, 3, None, True)
+    assert [p["title"] for p in json.loads(r.body)] == ["post 3", "post 2", "post 1"]
+    filled = {e.id for e in posts.homepage._state.entries if e.full is not None}
+    assert filled == {1, 2}
+    replica.close()
+    engine.dispose()
+
+
+def test_reload_keeps_full_entries_that_did_not_change(sqlite_client, db_session):
+    _seed(db_session, 3)
+    sqlite_client.get("/api/posts")
+    db_session.get(Article, 2).title = "edited"
+    db_session.commit()
+    assert posts.homepage.load(db_session)
+    filled = {e.id for e in posts.homepage._state.entries if e.full is not None}
+    assert filled == {1, 3}
+
+
+def test_reads_after_a_write_run_no_queries(sqlite_client, db_session, statements):
+    _seed(db_session, 3)
+    assert len(sqlite_client.get("/api/posts").json()) == 3
+
+    created = sqlite_client.post("/api/posts", json={"title": "New", "content": "fresh", "slug": "new"}).json()
+    etag = None
+    statements.clear()
+    for _ in range(3):
+        r = sqlite_client.get("/api/posts", params={"limit": 2})
+        assert [p["slug"] for p in r.json()] == ["new", "post-3"]
+        etag = r.headers["etag"]
+    assert sqlite_client.get("/api/posts", params={"limit": 2}, headers={"If-None-Match": etag}).status_code == 304
+    assert statements == []
+    assert created["slug"] == "new"
+
+
+def test_prepend_drops_the_tail_beyond_capacity(sqlite_client, db_session, monkeypatch, statements):
+    snapshot = MaterializedHomepage(3, posts._load_homepage, ttl=0)
+    monkeypatch.setattr(posts, "homepage", snapshot)
+    _seed(db_session, 5)
+
+    assert [p["slug"] for p in sqlite_client.get("/api/posts", params={"limit": 2}).json()] == ["post-5", "post-4"]
+    sqlite_client.post("/api/posts", json={"title": "New", "content": "c", "slug": "new"})
+    assert [e.id for e in snapshot._state.entries] == [6, 5, 4]
+
+    statements.clear()
+    r = sqlite_client.get("/api/posts", params={"limit": 2})
+    assert [p["slug"] for p in r.json()] == ["new", "post-5"]
+    assert statements == []
+    # a page reaching past the snapshot cannot tell whether more posts follow: served by SQL
+    r = sqlite_client.get("/api/posts", params={"limit": 3})
+    assert [p["slug"] for p in r.json()] == ["new", "post-5", "post-4"]
+    assert statements
+
+
+def test_shared_snapshots_converge_through_the_version_table(sqlite_engine, db_session):
+    factory = sessionmaker(bind=sqlite_engine)
+    workers = [
+        MaterializedHomepage(10, posts._load_homepage, ttl=0, shared=True, session_factory=factory)
+        for _ in range(2)
+    ]
+    a, b = workers
+    _seed(db_session, 2)
+    for worker in workers:
+        worker.load(db_session)
+
+    def write(worker, n):
+        _seed(db_session, 1, start=n)
+        article = db_session.query(Article).filter_by(slug=f"post-{n}").one()
+        worker.apply(posts.snapshot_entry(article), article.id)
+
+    def ids(worker):
+        return [e.id for e in worker._state.entries]
+
+    write(a, 3)
+    a.sync()  # publishes version 1
+    b.sync()  # loads it from the table
+    assert (a.version, b.version) == (1, 1)
+    assert ids(b) == [3, 2, 1]
+
+    # both workers write before either publishes
+    write(a, 4)
+    write(b, 5)
+    a.sync()  # version 2 (without post 5)
+    b.sync()  # conflict: rebuilt from the articles table
+    assert b.conflicts == 1 and ids(b) == [5, 4, 3, 2, 1]
+    b.sync()  # version 3
+    a.sync()
+    assert (a.version, b.version) == (3, 3)
+    assert ids(a) == [5, 4, 3, 2, 1]
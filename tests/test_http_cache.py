@@ -0,0 +1,94 @@
+"""
+Tests for conditional GET support (`app/http_cache.py`) on the post endpoints.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app.main import post_cache
+from app.model import Article
+
+
+@pytest.fixture
+def seeded(db_session):
+    db_session.add(
+        Article(
+            title="Validated",
+            content="long body " * 50,
+            slug="validated",
+            created_at=datetime(2024, 3, 1, 12, 0, 0, tzinfo=timezone.utc),
+        )
+    )
+    db_session.commit()
+
+
+@pytest.mark.parametrize("path", ["/api/posts/1", "/api/post/slug/validated"])
+def test_single_post_sends_validators_and_honours_if_none_match(sqlite_client, seeded, path):
+    r = sqlite_client.get(path)
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    # A single post is below the compression threshold, so its validator stays as issued.
+    assert etag.startswith('"v1-1-') and etag.endswith('"')
+    assert r.headers["Last-Modified"] == "Fri, 01 Mar 2024 12:00:00 GMT"
+    assert "Cache-Control" in r.headers
+
+    r2 = sqlite_client.get(path, headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+    assert r2.headers["ETag"] == etag
+
+
+def test_single_post_304_does_not_load_content(sqlite_client, sqlite_engine, seeded):
+    """On a cache miss a conditional request only selects the validator columns."""
+    etag = sqlite_client.get("/api/posts/1").headers["ETag"]
+    post_cache.clear()
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sqlite_engine, "before_cursor_execute", _capture)
+    try:
+        r = sqlite_client.get("/api/posts/1", headers={"If-None-Match": etag})
+    finally:
+        event.remove(sqlite_engine, "before_cursor_execute", _capture)
+
+    assert r.status_code == 304
+    assert len(statements) == 1
+    assert "articles.content" not in statements[0]
+
+
+def test_if_modified_since(sqlite_client, seeded):
+    r = sqlite_client.get("/api/posts/1", headers={"If-Modified-Since": "Fri, 01 Mar 2024 12:00:00 GMT"})
+    assert r.status_code == 304
+    r = sqlite_client.get("/api/posts/1", headers={"If-Modified-Since": "Thu, 29 Feb 2024 00:00:00 GMT"})
+    assert r.status_code == 200
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(sqlite_client, seeded):
+    r = sqlite_client.get(
+        "/api/posts/1",
+        headers={"If-None-Match": '"stale"', "If-Modified-Since": "Fri, 01 Mar 2024 12:00:00 GMT"},
+    )
+    assert r.status_code == 200
+
+
+def test_list_etag_changes_after_a_write(sqlite_client, seeded):
+    r = sqlite_client.get("/api/posts")
+    etag = r.headers["ETag"]
+    assert sqlite_client.get("/api/posts", headers={"If-None-Match": etag}).status_code == 304
+
+    sqlite_client.post("/api/posts", json={"title": "New", "content": "c", "slug": "new"})
+    r = sqlite_client.get("/api/posts", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_search_supports_if_none_match(sqlite_client, seeded):
+    r = sqlite_client.get("/api/search", params={"q": "body"})
+    assert r.status_code == 200 and len(r.json()) == 1
+    r2 = sqlite_client.get("/api/search", params={"q": "body"}, headers={"If-None-Match": r.headers["ETag"]})
+    assert r2.status_code == 304
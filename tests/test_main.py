@@ -49,6 +49,8 @@ class FakeQuery:
         self._data = data
         self._condition = None
         self._order_by = None
+        self._limit = None
+        self._offset = 0
 
     def filter(self, condition):
         # store the SQLAlchemy condition object for later evaluation
@@ -77,9 +79,23 @@ class FakeQuery:
         self._condition = condition
         return self
 
-    def order_by(self, order_expr):
-        """Store order_by expression for later sorting."""
-        self._order_by = order_expr
+    def order_by(self, *order_exprs):
+        """Store the leading order_by expression for later sorting.
+
+        Tie-breaker columns (e.g. `Article.id.desc()`) are ignored; the fake
+        only sorts by `created_at`.
+        """
+        self._order_by = order_exprs[0] if order_exprs else None
+        return self
+
+    def offset(self, n):
+        """Store the number of rows to skip, applied before the limit."""
+        self._offset = n
+        return self
+
+    def limit(self, n):
+        """Store the row limit, applied after filtering and ordering."""
+        self._limit = n
         return self
 
     def all(self):
@@ -108,6 +124,11 @@ class FakeQuery:
                 # Sort by created_at ascending
                 result.sort(key=lambda x: x.created_at if x.created_at else datetime.min, reverse=False)
 
+        if self._offset:
+            result = result[self._offset:]
+        if self._limit is not None:
+            result = result[: self._limit]
+
         return result
 
     def first(self):
@@ -125,6 +146,7 @@ class FakeSession:
         self._articles = list(articles)
         self._added = []  # Track articles added via add()
         self._next_id = max([a.id for a in self._articles], default=0) + 1
+        self.info = {}  # Session.info; the read path checks it for a replica name
 
     def query(self, _model):
         # model argument is ignored; we always return a query over articles
@@ -277,7 +299,7 @@ def test_health_endpoint():
         assert r.json() == {"status": "ok"}
 
 
-def test_get_posts_empty():
+def test_get_posts_empty(no_homepage_snapshot):
     """When DB has no articles, `/api/posts` returns an empty list."""
     app.dependency_overrides[get_db] = make_get_db_override([])
     try:
@@ -289,7 +311,7 @@ def test_get_posts_empty():
         app.dependency_overrides.pop(get_db, None)
 
 
-def test_get_posts_and_formatting():
+def test_get_posts_and_formatting(no_homepage_snapshot):
     """Verify `/api/posts` returns expected minimal fields and formatting."""
     art = FakeArticle(
         id=1,
@@ -0,0 +1,77 @@
+"""
+Tests for the request/SQL metrics middleware and the `/metrics` endpoint.
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import exc, text
+
+from app.metrics import MetricsRegistry, install_sql_timing, render_prometheus
+from app.model import Article
+
+
+def _sample(text, name, **labels):
+    """Return the value of the first sample `name{...labels...}` in exposition text."""
+    wanted = [f'{k}="{v}"' for k, v in labels.items()]
+    for line in text.splitlines():
+        if line.startswith(name + "{") and all(w in line for w in wanted):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_metrics_count_requests_by_route_template(sqlite_client, db_session):
+    db_session.add(Article(title="M", content="m", slug="m", created_at=datetime(2024, 1, 1)))
+    db_session.commit()
+
+    before = sqlite_client.get("/metrics").text
+    base = _sample(before, "http_requests_total", route="/api/posts/{post_id}", status="200") or 0
+    base_404 = _sample(before, "http_requests_total", route="/api/posts/{post_id}", status="404") or 0
+
+    sqlite_client.get("/api/posts/1")
+    sqlite_client.get("/api/posts/1")
+    sqlite_client.get("/api/posts/999")
+
+    text = sqlite_client.get("/metrics").text
+    assert _sample(text, "http_requests_total", route="/api/posts/{post_id}", status="200") == base + 2
+    assert _sample(text, "http_requests_total", route="/api/posts/{post_id}", status="404") == base_404 + 1
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert _sample(text, "http_request_duration_seconds_bucket", route="/api/posts/{post_id}", le="+Inf") >= 3
+    assert "db_pool_checked_out" in text
+
+
+def test_metrics_record_sql_statements_per_request(sqlite_client, db_session, no_homepage_snapshot):
+    db_session.add(Article(title="S", content="s", slug="s", created_at=datetime(2024, 1, 1)))
+    db_session.commit()
+
+    def statements_total():
+        text = sqlite_client.get("/metrics").text
+        return _sample(text, "db_statements_per_request_sum", method="GET", route="/api/posts") or 0
+
+    before = statements_total()
+    sqlite_client.get("/api/posts")
+    assert statements_total() - before == 1
+
+
+def test_failed_statement_leaves_no_timing_state(sqlite_engine):
+    """A statement that raises must not leave its start time on the pooled connection."""
+    install_sql_timing()
+    with sqlite_engine.connect() as conn:
+        with pytest.raises(exc.OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert "query_start" not in conn.info
+        conn.rollback()
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+
+
+def test_render_prometheus_escapes_labels():
+    registry = MetricsRegistry()
+
+    class _Db:
+        statements = 0
+        seconds = 0.0
+
+    registry.observe("GET", 'weird"path', 200, 0.01, _Db())
+    text = render_prometheus(registry)
+    assert 'route="weird\\"path"' in text
@@ -0,0 +1,75 @@
+"""
+Tests for the Alembic migrations (`migrations/`, `app/migrate.py`) and for
+importing the app without touching the database.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.migrate import current_revision, head_revision, migrate, upgrade_database
+from app.model import Article, Base
+from app.posts import post_cache, warm_post_cache
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_fresh_database_matches_the_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrate(engine)
+    assert current_revision(engine) == head_revision()
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    # already at head: a second run is a no-op
+    migrate(engine)
+    engine.dispose()
+
+
+def test_legacy_database_without_version_table_is_upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        # created by the old create_all: no alembic_version, tag index or outbox yet
+        conn.execute(text(
+            "CREATE TABLE articles (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL UNIQUE, "
+            "content TEXT NOT NULL, tags VARCHAR(255), slug VARCHAR(255) UNIQUE, "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO articles (id, title, content, tags) VALUES "
+            "(1, 'a', 'x', 'python, sql'), (2, 'b', 'y', 'python'), (3, 'c', 'z', NULL)"
+        ))
+
+    upgrade_database(engine)
+
+    with engine.connect() as conn:
+        counts = conn.execute(text("SELECT name, article_count FROM tags ORDER BY name")).all()
+        assert [tuple(row) for row in counts] == [("python", 2), ("sql", 1)]
+        assert conn.execute(text("SELECT count(*) FROM article_tags")).scalar() == 3
+        assert conn.execute(text("SELECT count(*) FROM webhook_outbox")).scalar() == 0
+    assert current_revision(engine) == head_revision()
+    engine.dispose()
+
+
+def test_importing_the_app_does_not_connect():
+    # the database URL points nowhere; only a request (or the lifespan) would notice
+    code = (
+        "import app.db as db, app.main as main\n"
+        "assert db._engine is None and db._async_engine is None\n"
+        "assert main.create_app().routes\n"
+    )
+    env = {"DATABASE_URL": "postgresql://nobody@127.0.0.1:1/none", "PATH": ""}
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_warm_post_cache_loads_latest_posts(db_session):
+    for n in range(3):
+        db_session.add(Article(title=f"t{n}", content="c", slug=f"s{n}"))
+    db_session.commit()
+    assert warm_post_cache(db_session, 2) == 2
+    assert [slug for slug in ("s0", "s1", "s2") if post_cache.get(("slug", slug)) is not None] == ["s1", "s2"]
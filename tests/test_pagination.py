@@ -0,0 +1,120 @@
+"""
+Tests for keyset pagination and the slim list projection of `/api/posts`.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.model import Article
+from app.pagination import encode_cursor, decode_cursor
+from app.posts import POSTS_DEFAULT_LIMIT
+
+
+def _seed(session, n, same_timestamp=False):
+    base = datetime(2024, 1, 1)
+    for i in range(1, n + 1):
+        created = base if same_timestamp else base + timedelta(minutes=i)
+        session.add(
+            Article(
+                title=f"post {i}",
+                content=f"body {i} " + "x" * 300,
+                tags="a,b",
+                slug=f"post-{i}",
+                created_at=created,
+            )
+        )
+    session.commit()
+
+
+def test_cursor_round_trip():
+    """A cursor decodes back to the exact (created_at, id) it was built from."""
+    ts = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+
+
+@pytest.mark.parametrize("bad", ["not-a-cursor", "", "!!!!"])
+def test_decode_cursor_rejects_garbage(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
+
+
+def test_invalid_cursor_returns_400(sqlite_client):
+    r = sqlite_client.get("/api/posts", params={"cursor": "garbage"})
+    assert r.status_code == 400
+
+
+@pytest.mark.parametrize("same_timestamp", [False, True])
+def test_pages_cover_every_post_once(sqlite_client, db_session, same_timestamp):
+    """Following X-Next-Cursor visits every post exactly once, newest first.
+
+    The `same_timestamp` case checks that the `id` tie-breaker keeps pages
+    stable when many posts share a `created_at`.
+    """
+    _seed(db_session, 7, same_timestamp=same_timestamp)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        r = sqlite_client.get("/api/posts", params=params)
+        assert r.status_code == 200
+        seen.extend(p["id"] for p in r.json())
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == sorted(seen, reverse=True)
+    assert sorted(seen) == list(range(1, 8))
+
+
+def test_limit_is_bounded(sqlite_client):
+    assert sqlite_client.get("/api/posts", params={"limit": 0}).status_code == 422
+    assert sqlite_client.get("/api/posts", params={"limit": 10_000}).status_code == 422
+
+
+def test_default_page_size_and_cross_origin_cursor(sqlite_client, db_session):
+    """Without `limit` only the first page is returned, and browsers can read the cursor."""
+    _seed(db_session, POSTS_DEFAULT_LIMIT + 1)
+
+    r = sqlite_client.get("/api/posts", headers={"Origin": "https://blog.example.com"})
+    assert r.status_code == 200
+    assert len(r.json()) == POSTS_DEFAULT_LIMIT
+    assert r.headers["x-next-cursor"]
+    exposed = r.headers["access-control-expose-headers"].lower()
+    assert "x-next-cursor" in exposed
+
+
+def test_slim_mode_never_selects_content(no_homepage_snapshot, sqlite_client, sqlite_engine, db_session):
+    """`include_content=false` omits `content` and only reads a prefix in SQL."""
+    _seed(db_session, 2)
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sqlite_engine, "before_cursor_execute", _capture)
+    try:
+        r = sqlite_client.get("/api/posts", params={"include_content": "false"})
+    finally:
+        event.remove(sqlite_engine, "before_cursor_execute", _capture)
+
+    assert r.status_code == 200
+    body = r.json()
+    assert len(body) == 2
+    assert all("content" not in p for p in body)
+    assert body[0]["summary"].endswith("...")
+    assert len(body[0]["summary"]) == 203
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert selects, "expected the list query to be captured"
+    for sql in selects:
+        # content may only appear inside the substr() prefix expression
+        assert sql.count("articles.content") == sql.count("substr(articles.content")
@@ -0,0 +1,67 @@
+"""
+Tests for connection pool configuration and monitoring (`app/pool_monitor.py`).
+"""
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.db import pool_options
+from app.metrics import Histogram
+from app.pool_monitor import InstrumentedQueuePool, get_monitor
+
+
+def test_histogram_cumulative_buckets():
+    h = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value)
+    assert h.cumulative() == {"0.1": 2, "1": 3, "+Inf": 4}
+    assert h.count == 4
+
+
+def test_pool_options_skip_in_memory_sqlite():
+    assert pool_options("sqlite://", "x") == {}
+    opts = pool_options("postgresql://u:p@h/db", "replica-1")
+    assert opts["poolclass"] is InstrumentedQueuePool
+    assert opts["monitor_name"] == "replica-1"
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"} <= opts.keys()
+
+
+def test_monitor_reports_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        monitor_name="test-pool",
+    )
+    monitor = get_monitor("test-pool")
+    monitor.attach(engine)
+
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    stats = monitor.snapshot(engine.pool)
+    assert (stats["checked_out"], stats["idle"], stats["overflow"]) == (1, 0, 0)
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+
+    stats = monitor.snapshot(engine.pool)
+    assert stats["checkout_timeouts"] == 1
+    assert stats["checked_out"] == 0 and stats["idle"] == 1
+    assert stats["wait_seconds"]["count"] == 2
+    assert stats["connects"] == 1
+
+    # The pool rebuilt by dispose() keeps reporting under the same name.
+    engine.dispose()
+    assert engine.pool.monitor_name == "test-pool"
+    engine.connect().close()
+    assert monitor.snapshot(engine.pool)["wait_seconds"]["count"] == 3
+    engine.dispose()
+
+
+def test_pool_endpoint(sqlite_client):
+    body = sqlite_client.get("/api/internal/pool").json()
+    assert "primary" in body
+    assert "wait_seconds" in body["primary"]
@@ -0,0 +1,218 @@
+"""
+Tests for on-demand profiling and the slow-query log (`app/profiling.py`).
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import exc, text
+
+from app import profiling
+from app.profiling import DiskRing, ProfiledRoute, ProfilingMiddleware, sign_token, verify_token
+
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def rings(tmp_path, monkeypatch):
+    profiles = DiskRing(str(tmp_path / "profiles"), size=3)
+    slow = DiskRing(str(tmp_path / "slow"), size=3)
+    monkeypatch.setattr(profiling, "profile_ring", profiles)
+    monkeypatch.setattr(profiling, "slow_query_ring", slow)
+    return profiles, slow
+
+
+def test_disk_ring_keeps_the_newest_records(tmp_path):
+    ring = DiskRing(str(tmp_path), size=3)
+    ids = [ring.append({"n": n}) for n in range(5)]
+    assert [r["n"] for r in ring.recent(10)] == [4, 3, 2]
+    assert ring.get(ids[0]) is None
+    assert ring.get(ids[-1])["n"] == 4
+    assert ring.get("../../etc/passwd") is None
+
+
+def test_tokens_are_signed_and_expire():
+    token = sign_token(int(time.time()) + 60, SECRET)
+    assert verify_token(token, SECRET)
+    assert not verify_token(token, "other")
+    assert not verify_token(token, "")
+    assert not verify_token(sign_token(int(time.time()) - 1, SECRET), SECRET)
+    assert not verify_token("garbage", SECRET)
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _profiled_app(**options):
+    profiled = FastAPI()
+    profiled.router.route_class = ProfiledRoute
+
+    @profiled.get("/slow")
+    def slow():
+        # a sync route: runs in the threadpool, outside the middleware's thread
+        _busy(0.05)
+        return {"ok": True}
+
+    @profiled.get("/unrelated")
+    def unrelated():
+        _busy(0.1)
+        return {"ok": True}
+
+    @profiled.get("/async-slow")
+    async def async_slow():
+        # blocks the event loop thread on purpose
+        _busy(0.05)
+        return {"ok": True}
+
+    profiled.add_middleware(ProfilingMiddleware, secret=SECRET, interval=0.001, **options)
+    return profiled
+
+
+def _get_many(asgi_app, *requests):
+    """Send (path, headers) pairs concurrently; returns the responses in order."""
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get(path, headers=headers or {}) for path, headers in requests))
+
+    return asyncio.run(scenario())
+
+
+def _get(asgi_app, path, headers=None):
+    return _get_many(asgi_app, (path, headers))[0]
+
+
+def _header():
+    return {"X-Profile": sign_token(int(time.time()) + 60, SECRET)}
+
+
+def test_signed_header_profiles_the_request(rings):
+    profiles, _ = rings
+    profiled = _profiled_app(sample_rate=0)
+
+    assert "x-profile-id" not in _get(profiled, "/slow").headers
+    assert "x-profile-id" not in _get(profiled, "/slow", {"X-Profile": sign_token(1, SECRET)}).headers
+
+    r = _get(profiled, "/slow", {"X-Profile": sign_token(int(time.time()) + 60, SECRET)})
+    assert r.status_code == 200
+    profiling.flush()
+    record = profiles.get(r.headers["x-profile-id"])
+    assert record["trigger"] == "header" and record["path"] == "/slow" and record["status"] == 200
+    assert record["duration_ms"] >= 50
+    assert record["samples"] > 0
+    assert "test_profiling:slow" in record["stacks"]
+
+
+def test_profile_only_contains_the_profiled_request(rings):
+    profiles, _ = rings
+    profiled = _profiled_app(sample_rate=0)
+    unrelated, r = _get_many(profiled, ("/unrelated", None), ("/slow", _header()))
+    assert unrelated.status_code == r.status_code == 200
+    profiling.flush()
+    stacks = profiles.get(r.headers["x-profile-id"])["stacks"]
+    assert "test_profiling:slow" in stacks
+    assert "test_profiling:unrelated" not in stacks
+
+
+def test_async_routes_are_sampled_on_the_event_loop_thread(rings):
+    profiles, _ = rings
+    r = _get(_profiled_app(sample_rate=0), "/async-slow", _header())
+    profiling.flush()
+    assert "test_profiling:async_slow" in profiles.get(r.headers["x-profile-id"])["stacks"]
+
+
+def test_concurrent_profiles_are_capped(rings, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(profiling, "_sampler_slots", slots)
+    busy = profiling.counters["busy"]
+    slots.acquire()
+    try:
+        assert "x-profile-id" not in _get(_profiled_app(sample_rate=0), "/slow", _header()).headers
+    finally:
+        slots.release()
+    assert profiling.counters["busy"] == busy + 1
+    assert "x-profile-id" in _get(_profiled_app(sample_rate=0), "/slow", _header()).headers
+
+
+def test_sampling_stores_profiles_without_exposing_them(rings):
+    profiles, _ = rings
+    r = _get(_profiled_app(sample_rate=1.0), "/slow")
+    assert "x-profile-id" not in r.headers
+    profiling.flush()
+    assert [p["trigger"] for p in profiles.recent(5)] == ["sample"]
+
+
+def test_slow_queries_are_logged_with_a_plan(rings, sqlite_engine, monkeypatch):
+    _, slow = rings
+    monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0.000001)
+    monkeypatch.setattr(profiling, "SLOW_QUERY_EXPLAIN_MS", 0.000001)
+    monkeypatch.setattr(profiling, "_explained", {})
+    profiling.install_slow_query_log()
+
+    with sqlite_engine.connect() as conn:
+        conn.execute(text("SELECT id FROM articles WHERE title = :title"), {"title": "x" * 500})
+        # the in-memory engine shares one connection across threads: let the EXPLAIN finish first
+        profiling.flush()
+        conn.execute(text("SELECT id FROM articles WHERE title = :title"), {"title": "again"})
+    profiling.flush()
+
+    records = slow.recent(10)
+    assert len(records) == 2
+    newest, first = records
+    assert first["statement"] == "SELECT id FROM articles WHERE title = ?"
+    assert first["parameters"][0].endswith("...") and len(first["parameters"][0]) < 300
+    assert "articles" in first["plan"]
+    # the same statement is explained once per interval
+    assert "plan" not in newest
+
+
+def test_internal_endpoints_read_the_rings(rings, sqlite_client):
+    profiles, slow = rings
+    record_id = profiles.append({"kind": "profile", "path": "/x", "stacks": "a;b 1"})
+    slow.append({"kind": "slow_query", "statement": "SELECT 1"})
+
+    listed = sqlite_client.get("/api/internal/profiles").json()
+    assert [p["id"] for p in listed["profiles"]] == [record_id]
+    assert "stacks" not in listed["profiles"][0]
+    assert sqlite_client.get(f"/api/internal/profiles/{record_id}").json()["stacks"] == "a;b 1"
+    assert sqlite_client.get("/api/internal/profiles/0-0").status_code == 404
+    assert sqlite_client.get("/api/internal/slow-queries").json()[0]["statement"] == "SELECT 1"
+
+
+def test_slow_query_log_reuses_the_metrics_timing(rings, sqlite_engine, monkeypatch):
+    _, slow = rings
+    monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0.000001)
+    monkeypatch.setattr(profiling, "SLOW_QUERY_EXPLAIN_MS", 0)
+    profiling.install_slow_query_log()
+
+    with sqlite_engine.connect() as conn:
+        with pytest.raises(exc.OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        conn.rollback()
+        conn.execute(text("SELECT count(*) FROM articles"))
+        conn.execute(text("UPDATE articles SET title = title"))
+        assert not any(key.startswith("slow_query") for key in conn.info)
+    profiling.flush()
+
+    records = slow.recent(10)
+    assert [r["statement"] for r in records] == ["UPDATE articles SET title = title", "SELECT count(*) FROM articles"]
+    # EXPLAIN is opt-in
+    assert not any("plan" in r for r in records)
+
+
+def test_only_selects_are_explained(sqlite_engine, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_QUERY_EXPLAIN_MS", 1)
+    monkeypatch.setattr(profiling, "_explained", {})
+    assert profiling._should_explain(sqlite_engine, "SELECT 1", 5, False)
+    assert not profiling._should_explain(sqlite_engine, "DELETE FROM articles", 5, False)
+    assert not profiling._should_explain(sqlite_engine, "SELECT 2", 0.5, False)
+    monkeypatch.setattr(profiling, "SLOW_QUERY_EXPLAIN_MS", 0)
+    assert not profiling._should_explain(sqlite_engine, "SELECT 3", 5, False)
@@ -0,0 +1,171 @@
+"""
+Tests for read-replica routing (`app/replicas.py`).
+
+The primary is the in-memory SQLite database behind `sqlite_client`; each
+"replica" is a separate SQLite file, so a row that exists in only one of
+them shows which database served a read.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app import replicas
+from app.metrics import render_prometheus
+from app.model import Article, Base
+from app.posts import homepage, missing_posts, post_cache
+from app.replicas import PRIMARY_COOKIE, PRIMARY_HEADER, ReplicaSet
+
+
+def _replica_db(path, *slugs):
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for slug in slugs:
+        session.add(Article(title=slug, content="c", slug=slug))
+    session.commit()
+    session.close()
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def install_replicas(monkeypatch, sqlite_client):
+    created = []
+
+    def install(*urls):
+        replica_set = ReplicaSet(list(urls))
+        monkeypatch.setattr(replicas, "read_replicas", replica_set)
+        created.append(replica_set)
+        return replica_set
+
+    yield install
+    for replica_set in created:
+        for replica in replica_set.replicas:
+            if replica._engine is not None:
+                replica._engine.dispose()
+
+
+@pytest.fixture
+def use_replicas(install_replicas, no_homepage_snapshot):
+    return install_replicas
+
+
+def test_reads_are_balanced_across_replicas(use_replicas, sqlite_client, tmp_path):
+    replica_set = use_replicas(
+        _replica_db(tmp_path / "r0.db", "only-r0"), _replica_db(tmp_path / "r1.db", "only-r1")
+    )
+    slugs = [sqlite_client.get("/api/posts").json()[0]["slug"] for _ in range(4)]
+    assert sorted(slugs) == ["only-r0", "only-r0", "only-r1", "only-r1"]
+    assert [r["reads"] for r in replica_set.stats()["replicas"]] == [2, 2]
+
+
+def test_client_reads_its_own_write_from_the_primary(use_replicas, sqlite_client, tmp_path):
+    replica_set = use_replicas(_replica_db(tmp_path / "r0.db"))
+    r = sqlite_client.post("/api/posts", json={"title": "Fresh", "content": "body", "slug": "fresh"})
+    assert r.status_code == 200
+    assert PRIMARY_COOKIE in r.cookies
+
+    # the cookie routes this client's reads to the primary for a few seconds
+    assert sqlite_client.get("/api/post/slug/fresh").status_code == 200
+    assert replica_set.stats()["primary_reads"]["read_your_writes"] == 1
+
+    # another client (on another worker, so nothing cached) hits the lagging replica;
+    # its 404 must not be cached
+    sqlite_client.cookies.clear()
+    post_cache.clear()
+    assert sqlite_client.get("/api/post/slug/fresh").status_code == 404
+    assert missing_posts.get(("slug", "fresh")) is None
+
+
+def test_cross_origin_client_echoes_the_header_instead_of_the_cookie(use_replicas, sqlite_client, tmp_path):
+    """A cross-origin fetch() does not send cookies, so the write response also carries a header."""
+    replica_set = use_replicas(_replica_db(tmp_path / "r0.db"))
+    r = sqlite_client.post(
+        "/api/posts",
+        json={"title": "Fresh", "content": "body", "slug": "fresh"},
+        headers={"Origin": "https://frontend.example.com"},
+    )
+    until = r.headers[PRIMARY_HEADER]
+    assert PRIMARY_HEADER.lower() in r.headers["access-control-expose-headers"].lower()
+
+    sqlite_client.cookies.clear()
+    assert sqlite_client.get("/api/post/slug/fresh", headers={PRIMARY_HEADER: until}).status_code == 200
+    assert replica_set.stats()["primary_reads"]["read_your_writes"] == 1
+
+    # a timestamp beyond the read-your-writes window is ignored
+    far_future = f"{time.time() + 3600:.3f}"
+    post_cache.clear()
+    assert sqlite_client.get("/api/post/slug/fresh", headers={PRIMARY_HEADER: far_future}).status_code == 404
+
+
+def test_unreachable_replica_falls_back_to_primary_and_recovers(use_replicas, sqlite_client, db_session, tmp_path):
+    db_session.add(Article(title="Primary", content="c", slug="on-primary"))
+    db_session.commit()
+    replica_set = use_replicas(f"sqlite:///{tmp_path / 'missing' / 'r0.db'}")
+
+    assert sqlite_client.get("/api/posts").json()[0]["slug"] == "on-primary"
+    stats = replica_set.stats()
+    assert stats["replicas"][0]["healthy"] is False
+    assert stats["replicas"][0]["failures"] == 1
+    assert stats["primary_reads"]["fallback"] == 1
+
+    # the health check brings it back once the database is reachable
+    (tmp_path / "missing").mkdir()
+    _replica_db(tmp_path / "missing" / "r0.db", "on-replica")
+    replica_set.check_all()
+    assert replica_set.replicas[0].healthy is True
+    assert sqlite_client.get("/api/posts").json()[0]["slug"] == "on-replica"
+
+    text = render_prometheus(replicas=replica_set.stats())
+    assert 'db_replica_healthy{replica="replica-0"} 1' in text
+    assert 'db_reads_total{target="primary",reason="fallback"} 1' in text
+
+
+def _same_articles(session):
+    base = datetime(2024, 1, 1)
+    session.add_all(
+        Article(title=f"post {i}", content="c" * 300, slug=f"post-{i}", created_at=base + timedelta(minutes=i))
+        for i in range(3)
+    )
+    session.commit()
+
+
+def test_default_homepage_request_is_served_from_the_snapshot(install_replicas, sqlite_client, db_session, tmp_path):
+    """With replicas configured the full-format homepage is still filled in once, then served without a query."""
+    _same_articles(db_session)
+    engine = create_engine(f"sqlite:///{tmp_path / 'r0.db'}")
+    Base.metadata.create_all(bind=engine)
+    _same_articles(sessionmaker(bind=engine)())
+    engine.dispose()
+    replica_set = install_replicas(f"sqlite:///{tmp_path / 'r0.db'}")
+
+    first = sqlite_client.get("/api/posts")
+    assert replica_set.stats()["replicas"][0]["reads"] == 1
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    hits = homepage.hits
+    event.listen(Engine, "before_cursor_execute", _capture)
+    try:
+        second = sqlite_client.get("/api/posts")
+    finally:
+        event.remove(Engine, "before_cursor_execute", _capture)
+    assert statements == []
+    assert homepage.hits - hits == 1
+    assert second.content == first.content
+
+
+def test_no_replicas_configured_leaves_routing_alone(sqlite_client):
+    r = sqlite_client.post("/api/posts", json={"title": "t", "content": "c"})
+    assert PRIMARY_COOKIE not in r.cookies
+    assert PRIMARY_HEADER not in r.headers
+    assert sqlite_client.get("/api/internal/replicas").json()["replicas"] == []
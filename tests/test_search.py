@@ -0,0 +1,104 @@
+"""
+Tests for `app/search.py` and the `/api/search` endpoint.
+
+The ILIKE fallback runs against SQLite. The PostgreSQL full-text path cannot
+execute without a Postgres server, so its SQL is compiled with the
+PostgreSQL dialect and checked for the expected operators instead.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.migrate import revision_module
+from app.model import Article
+from app.search import build_fts_query, highlight_snippet, resolve_engine
+
+
+def _seed(session):
+    base = datetime(2024, 1, 1)
+    rows = [
+        ("Intro to FastAPI", "Build APIs with python quickly."),
+        ("Postgres tips", "Use indexes. fastapi apps love them."),
+        ("Cooking", "Nothing about software here."),
+        ("100% coverage", "Chasing numbers."),
+    ]
+    for i, (title, content) in enumerate(rows, start=1):
+        session.add(Article(title=title, content=content, slug=f"s{i}", created_at=base + timedelta(days=i)))
+    session.commit()
+
+
+def test_fts_query_uses_tsvector_rank_and_headline():
+    """The FTS query matches with @@ on websearch_to_tsquery and orders by ts_rank."""
+    session = Session(bind=create_engine("postgresql://user:pw@localhost/db"))
+    sql = str(build_fts_query(session, "fastapi").statement.compile(dialect=postgresql.dialect()))
+    assert "articles.search_vector @@ websearch_to_tsquery" in sql
+    assert "ts_rank(articles.search_vector" in sql
+    assert "ts_headline" in sql
+    assert "ORDER BY rank DESC" in sql
+    # only a prefix of the body is selected for the summary
+    assert sql.count("articles.content") == 2  # substr() + ts_headline()
+
+
+def test_schema_declares_generated_column_and_gin_index():
+    migration = revision_module("0002")
+    ddl = " ".join(migration.POSTGRES_STATEMENTS)
+    assert "search_vector tsvector GENERATED ALWAYS AS" in ddl
+    indexes = dict(migration.POSTGRES_INDEXES)
+    assert "CONCURRENTLY" in indexes["ix_articles_search_vector"]
+    assert "USING GIN (search_vector)" in indexes["ix_articles_search_vector"]
+    assert "CONCURRENTLY" in indexes["ix_articles_created_at_id"]
+
+
+def test_resolve_engine_falls_back_to_ilike_on_sqlite(db_session):
+    assert resolve_engine(db_session) == "ilike"
+
+
+def test_cjk_queries_do_not_use_fts():
+    """The 'simple' config keeps an unbroken Chinese run as one lexeme, so substrings go to ILIKE."""
+    session = Session(bind=create_engine("postgresql://user:pw@localhost/db"))
+    assert resolve_engine(session, "fastapi") == "fts"
+    assert resolve_engine(session, "性能") == "ilike"
+    assert resolve_engine(session, "fastapi 性能") == "ilike"
+
+
+def test_chinese_substring_query_matches(sqlite_client, db_session):
+    db_session.add(Article(title="数据库性能优化", content="索引和查询计划", slug="zh"))
+    db_session.add(Article(title="Postgres tips", content="no chinese here", slug="en"))
+    db_session.commit()
+    assert [p["slug"] for p in sqlite_client.get("/api/search", params={"q": "性能"}).json()] == ["zh"]
+    assert [p["slug"] for p in sqlite_client.get("/api/search", params={"q": "查询"}).json()] == ["zh"]
+
+
+def test_ilike_search_limit_offset_and_order(sqlite_client, db_session):
+    """Fallback search returns newest matches first and honours limit/offset."""
+    _seed(db_session)
+    r = sqlite_client.get("/api/search", params={"q": "fastapi"})
+    assert r.status_code == 200
+    assert [p["id"] for p in r.json()] == [2, 1]
+
+    r = sqlite_client.get("/api/search", params={"q": "fastapi", "limit": 1, "offset": 1})
+    assert [p["id"] for p in r.json()] == [1]
+
+
+def test_ilike_search_treats_wildcards_literally(sqlite_client, db_session):
+    """A `%` in the query matches a literal percent sign, not everything."""
+    _seed(db_session)
+    r = sqlite_client.get("/api/search", params={"q": "100%"})
+    assert [p["id"] for p in r.json()] == [4]
+
+
+def test_search_returns_highlighted_snippet(sqlite_client, db_session):
+    _seed(db_session)
+    body = sqlite_client.get("/api/search", params={"q": "indexes"}).json()
+    assert body[0]["snippet"] == "Use <mark>indexes</mark>. fastapi apps love them."
+
+
+def test_highlight_snippet_trims_and_escapes():
+    text = "a" * 200 + " <b>Needle</b> " + "z" * 200
+    snippet = highlight_snippet(text, "needle")
+    assert snippet.startswith("... ") and snippet.endswith(" ...")
+    assert "<mark>Needle</mark>" in snippet
+    assert "&lt;b&gt;" in snippet
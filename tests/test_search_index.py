@@ -0,0 +1,111 @@
+"""
+Tests for the in-process BM25 index (`app/search_index.py`) and its use as
+the `/api/search` engine.
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import search
+from app.main import app, get_db
+from app.model import Article
+from app.search_index import BM25Index, IndexFullError, build_from_rows, tokenize
+
+
+def test_tokenize_splits_cjk_into_single_characters():
+    assert tokenize("FastAPI 入门_guide v2") == ["fastapi", "入", "门", "guide", "v2"]
+
+
+def test_title_matches_rank_above_body_matches():
+    index = BM25Index()
+    index.add(1, "Cooking", "python python appears in the body only")
+    index.add(2, "Python tips", "short body")
+    index.add(3, "Gardening", "nothing relevant")
+
+    ids = [doc.id for doc, _ in index.search("python", limit=10)]
+    assert ids == [2, 1]
+
+
+def test_limit_and_offset_page_through_results():
+    index = BM25Index()
+    for i in range(1, 6):
+        index.add(i, f"post {i}", "shared term " * i)
+    first = [doc.id for doc, _ in index.search("shared", limit=2)]
+    second = [doc.id for doc, _ in index.search("shared", limit=2, offset=2)]
+    assert len(first) == 2 and len(second) == 2
+    assert not set(first) & set(second)
+
+
+def test_re_adding_an_id_replaces_the_old_document():
+    index = BM25Index()
+    index.add(1, "old title", "alpha")
+    index.add(1, "new title", "beta")
+    assert index.search("alpha", limit=10) == []
+    assert [doc.title for doc, _ in index.search("beta", limit=10)] == ["new title"]
+    assert index.stats()["documents"] == 1
+
+
+def test_memory_budget_is_enforced():
+    index = BM25Index(max_memory_bytes=2000)
+    index.add(1, "small", "tiny")
+    with pytest.raises(IndexFullError):
+        index.add(2, "big", " ".join(f"word{i}" for i in range(500)))
+    # the failed add leaves the index unchanged
+    assert index.stats()["documents"] == 1
+
+    assert build_from_rows(index, [(1, "t", "x " * 10), (2, "u", " ".join(f"w{i}" for i in range(500)))]) is False
+    assert index.ready is False
+
+
+@pytest.fixture
+def bm25_engine(monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_ENGINE", "bm25")
+    yield search.bm25_index
+    search.bm25_index.reset()
+
+
+def test_search_endpoint_serves_from_index_and_sees_new_posts(bm25_engine, sqlite_client, db_session):
+    """The index is built from the table and picks up posts created via the API."""
+    db_session.add(Article(title="Indexed post", content="zebra crossing", slug="indexed", created_at=datetime(2024, 1, 1)))
+    db_session.commit()
+    assert search.build_bm25_index(db_session) is True
+
+    r = sqlite_client.get("/api/search", params={"q": "zebra"})
+    assert [p["slug"] for p in r.json()] == ["indexed"]
+    assert "<mark>zebra</mark>" in r.json()[0]["snippet"]
+
+    created = sqlite_client.post("/api/posts", json={"title": "Fresh", "content": "another zebra", "slug": "fresh"})
+    assert created.status_code == 200
+    r = sqlite_client.get("/api/search", params={"q": "zebra"})
+    assert {p["slug"] for p in r.json()} == {"indexed", "fresh"}
+
+
+def test_search_falls_back_to_sql_when_index_not_ready(bm25_engine, sqlite_client, db_session):
+    db_session.add(Article(title="Only in DB", content="walrus", slug="db", created_at=datetime(2024, 1, 1)))
+    db_session.commit()
+    # simulate an index that is still building (or was dropped for memory)
+    bm25_engine.reset()
+    r = sqlite_client.get("/api/search", params={"q": "walrus"})
+    assert [p["slug"] for p in r.json()] == ["db"]
+
+
+def test_startup_builds_the_index_from_the_overridden_database(bm25_engine, sqlite_engine, db_session):
+    """The lifespan reads through `get_db`, so it sees the test database rather than DATABASE_URL."""
+    db_session.add(Article(title="Boot", content="startup walrus", slug="boot", created_at=datetime(2024, 1, 1)))
+    db_session.commit()
+    factory = sessionmaker(bind=sqlite_engine)
+
+    def _override():
+        with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _override
+    try:
+        with TestClient(app):
+            pass
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+    assert [doc.slug for doc, _ in bm25_engine.search("walrus", 5)] == ["boot"]
@@ -1,6 +1,9 @@
 import ast
+import importlib.util
+from datetime import datetime, timezone
 from pathlib import Path
 import pytest
+from sqlalchemy import create_engine, text
 
 
 def _load_generate_slug():
@@ -57,3 +60,50 @@ def test_generate_slug_format():
     # Verify format consistency
     assert s1.startswith("article-")
     assert s2.startswith("article-")
+
+
+def _load_seed_module():
+    seed_path = Path(__file__).resolve().parents[1] / "scripts" / "seed_db.py"
+    spec = importlib.util.spec_from_file_location("seed_db", seed_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def seed_db():
+    return _load_seed_module()
+
+
+def test_row_generator_is_deterministic_per_range(seed_db):
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    a = list(seed_db.RowGenerator(7, now=now).rows(1, 50))
+    b = list(seed_db.RowGenerator(7, now=now).rows(1, 50))
+    assert a == b
+    slugs = [row[3] for row in a]
+    assert slugs == [f"article-{i}" for i in range(1, 50)]
+    for title, content, tags, _, summary, created_at in a:
+        assert seed_db.CONTENT_MIN_CHARS <= len(content)
+        assert content.startswith(summary.rstrip("."))
+        assert 1 <= len(tags.split(",")) <= 5
+        assert created_at <= now
+
+
+def test_copy_stream_escapes_text_format(seed_db):
+    row = ("t\tab", "line1\nline2\\", None, "s", datetime(2024, 1, 1, tzinfo=timezone.utc))
+    stream = seed_db.CopyStream([row, row])
+    data = b"".join(iter(lambda: stream.read(7), b""))
+    line = "t\\tab\tline1\\nline2\\\\\t\\N\ts\t2024-01-01T00:00:00+00:00\n"
+    assert data.decode() == line * 2
+
+
+def test_seed_inserts_into_sqlite_and_appends(seed_db, tmp_path):
+    url = f"sqlite:///{tmp_path / 'seed.db'}"
+    assert seed_db.seed(25, database_url=url, batch_size=10) == 25
+    assert seed_db.seed(5, database_url=url, append=True) == 5
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        count, slugs = conn.execute(text("SELECT count(*), count(DISTINCT slug) FROM articles")).one()
+    engine.dispose()
+    assert count == slugs == 30
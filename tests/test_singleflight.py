@@ -0,0 +1,133 @@
+"""
+Tests for request coalescing (`app/singleflight.py`).
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+
+from app import posts
+from app.main import app
+from app.model import Article
+from app.singleflight import SingleFlight
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_threads_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        _wait_for(lambda: flight.shared == 7)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fetch))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 7, "errors": 0}
+    # finished calls are not cached
+    flight.do("k", lambda: None)
+    assert flight.executed == 2
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight("test")
+
+    def fail():
+        _wait_for(lambda: flight.shared == 1)
+        raise LookupError("gone")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except LookupError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 2
+    assert flight.stats()["errors"] == 1
+
+
+def test_greenlets_wait_without_blocking_the_loop():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        await_only(asyncio.sleep(0.02))
+        return len(calls)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(greenlet_spawn(flight.do, "k", fetch) for _ in range(5)))
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    assert results == [1] * 5
+    assert ticks > 1  # the event loop kept running while callers waited
+    assert (flight.executed, flight.shared) == (1, 4)
+
+
+@pytest.fixture
+def slow_slug_lookup(monkeypatch):
+    """Count slug lookups and hold each one open long enough for others to pile up."""
+    calls = []
+    find = posts._find_by_slug
+
+    def slow(db, slug, *entities):
+        calls.append(slug)
+        time.sleep(0.1)
+        return find(db, slug, *entities)
+
+    monkeypatch.setattr(posts, "_find_by_slug", slow)
+    return calls
+
+
+def test_concurrent_slug_requests_query_once(sqlite_client, db_session, slow_slug_lookup):
+    db_session.add(Article(title="Viral", content="everyone reads this", slug="viral"))
+    db_session.commit()
+    shared = posts.post_flights.shared
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/api/post/slug/viral") for _ in range(6)))
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200] * 6
+    assert len({r.headers["etag"] for r in responses}) == 1
+    assert slow_slug_lookup == ["viral"]
+    assert posts.post_flights.shared - shared == 5
+    assert sqlite_client.get("/api/internal/cache").json()["singleflight"]["posts"]["in_flight"] == 0
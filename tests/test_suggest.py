@@ -0,0 +1,183 @@
+"""
+Tests for title autocomplete (`app/suggest.py`, `/api/search/suggest`).
+
+SQLite uses the in-memory title index; the PostgreSQL trigram query is
+compiled with the PostgreSQL dialect and also executed against SQLite,
+where LIKE behaves the same minus the index.
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import suggest
+from app.main import app, get_db
+from app.migrate import revision_module
+from app.model import Article
+from app.suggest import TitleIndex, build_suggest_query, title_index, word_starts
+
+TITLES = [
+    "FastAPI in production",
+    "Fast food review",
+    "Why FastAPI is fast",
+    "Postgres tips",
+    "数据库性能优化",
+    "100% coverage",
+]
+
+
+def _seed(session):
+    """Seed the titles and rebuild the index, as the app's startup would on a seeded database."""
+    for i, title in enumerate(TITLES, start=1):
+        session.add(Article(title=title, content="SECRET BODY " * 50, slug=f"s{i}"))
+    session.commit()
+    suggest.build_title_index(session)
+
+
+@pytest.fixture
+def statements(sqlite_engine):
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(sqlite_engine, "before_cursor_execute", _capture)
+    yield captured
+    event.remove(sqlite_engine, "before_cursor_execute", _capture)
+
+
+def _titles(client, prefix, **params):
+    r = client.get("/api/search/suggest", params={"prefix": prefix, **params})
+    assert r.status_code == 200
+    return [item["title"] for item in r.json()]
+
+
+def test_word_starts_include_every_cjk_character():
+    assert word_starts("why fastapi-is fast") == [0, 4, 12, 15]
+    assert word_starts("数据库 tips") == [0, 1, 2, 4]
+
+
+@pytest.mark.parametrize("engine", ["memory", "sql"])
+def test_title_start_matches_rank_first(sqlite_client, db_session, monkeypatch, engine):
+    monkeypatch.setattr(suggest, "SUGGEST_ENGINE", engine)
+    _seed(db_session)
+    assert _titles(sqlite_client, "fast") == ["Fast food review", "FastAPI in production", "Why FastAPI is fast"]
+    assert _titles(sqlite_client, "FAST", limit=1) == ["Fast food review"]
+    assert _titles(sqlite_client, "性能") == ["数据库性能优化"]
+    assert _titles(sqlite_client, "100%") == ["100% coverage"]
+    assert _titles(sqlite_client, "nothing") == []
+
+
+def test_results_carry_title_and_link_only(sqlite_client, db_session, monkeypatch, statements):
+    _seed(db_session)
+    statements.clear()
+    body = sqlite_client.get("/api/search/suggest", params={"prefix": "postgres"}).json()
+    assert body == [{"id": 4, "title": "Postgres tips", "slug": "s4", "href": "/article/s4"}]
+    # served from the loaded index
+    assert statements == []
+
+    monkeypatch.setattr(suggest, "SUGGEST_ENGINE", "sql")
+    assert _titles(sqlite_client, "tips") == ["Postgres tips"]
+    assert statements and not any("content" in s for s in statements)
+
+
+def test_startup_builds_the_index(sqlite_engine, db_session):
+    db_session.add(Article(title="Prebuilt title", content="c", slug="pre"))
+    db_session.commit()
+    factory = sessionmaker(bind=sqlite_engine)
+
+    def _override():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = _override
+    try:
+        with TestClient(app) as client:
+            assert title_index.ready
+            assert _titles(client, "prebuilt") == ["Prebuilt title"]
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+def test_requests_use_sql_while_the_index_loads_in_the_background(sqlite_engine, db_session, monkeypatch, statements):
+    _seed(db_session)
+    factory = sessionmaker(bind=sqlite_engine)
+    index = TitleIndex(session_factory=factory)
+    monkeypatch.setattr(suggest, "title_index", index)
+    release = threading.Event()
+    original_build = index.build
+
+    def slow_build(rows):
+        release.wait(5)
+        return original_build(rows)
+
+    monkeypatch.setattr(index, "build", slow_build)
+
+    statements.clear()
+    assert suggest.suggest_titles(db_session, "postgres", 5) == [(4, "Postgres tips", "s4")]
+    assert any("LIKE" in s for s in statements)
+    assert index.stats()["loading"] and not index.ready
+
+    release.set()
+    for _ in range(100):
+        if index.ready:
+            break
+        time.sleep(0.01)
+    assert index.ready and not index.stats()["loading"]
+    statements.clear()
+    assert suggest.suggest_titles(db_session, "postgres", 5) == [(4, "Postgres tips", "s4")]
+    assert statements == []
+
+
+def test_written_posts_update_the_loaded_index(sqlite_client, db_session, statements):
+    _seed(db_session)
+    assert _titles(sqlite_client, "graph") == []
+    created = sqlite_client.post("/api/posts", json={"title": "GraphQL basics", "content": "c", "slug": "gql"}).json()
+
+    statements.clear()
+    assert _titles(sqlite_client, "graph") == ["GraphQL basics"]
+    assert not any("FROM articles" in s for s in statements)
+    assert created["slug"] == "gql"
+    assert title_index.stats()["titles"] == len(TITLES) + 1
+
+
+def test_rewritten_title_replaces_the_old_entries():
+    index = TitleIndex()
+    index.build([(1, "Postgres tips", "pg"), (2, "Postgres internals", "pgi")])
+    index.add(1, "Renamed", "pg")
+    assert index.search("postgres", 5) == [(2, "Postgres internals", "pgi")]
+    assert index.search("ren", 5) == [(1, "Renamed", "pg")]
+    assert index.stats()["keys"] == 3
+
+
+def test_index_over_budget_falls_back_to_sql(sqlite_client, db_session, monkeypatch):
+    monkeypatch.setattr(suggest, "title_index", TitleIndex(max_titles=3))
+    _seed(db_session)
+    assert _titles(sqlite_client, "fast") == ["Fast food review", "FastAPI in production", "Why FastAPI is fast"]
+    assert suggest.title_index.too_large and not suggest.title_index.ready
+
+
+def test_prefix_is_validated(sqlite_client):
+    assert sqlite_client.get("/api/search/suggest", params={"prefix": ""}).status_code == 422
+    assert sqlite_client.get("/api/search/suggest", params={"prefix": "a", "limit": 21}).status_code == 422
+
+
+def test_trigram_query_for_postgres():
+    session = Session(bind=create_engine("postgresql://user:pw@localhost/db"))
+    assert suggest.resolve_suggest_engine(session) == "sql"
+    sql = str(build_suggest_query(session, "Fast_").statement.compile(dialect=postgresql.dialect()))
+    assert "lower(articles.title) LIKE" in sql
+    assert "content" not in sql
+    assert "length(articles.title)" in sql
+
+    migration = revision_module("0007")
+    assert "gin_trgm_ops" in migration.CREATE_INDEX
+    assert "lower(title)" in migration.CREATE_INDEX
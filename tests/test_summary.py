@@ -0,0 +1,84 @@
+"""
+Tests for the persisted `summary` column: filled on write, preferred on read,
+and backfilled for databases created before the column existed.
+"""
+
+import sqlite3
+
+from sqlalchemy import create_engine, event, text
+
+from app.migrate import revision_module, upgrade_database
+from app.model import Article
+from app.posts import make_summary
+
+
+def test_create_post_stores_summary(sqlite_client, db_session):
+    r = sqlite_client.post("/api/posts", json={"title": "t", "content": "y" * 250})
+    assert r.status_code == 200
+    stored = db_session.query(Article).filter_by(id=r.json()["id"]).one()
+    assert stored.summary == "y" * 200 + "..."
+
+
+def test_slim_list_uses_stored_summary(sqlite_client, db_session):
+    db_session.add(Article(title="t", content="body " * 100, slug="t", summary="hand written"))
+    db_session.commit()
+    body = sqlite_client.get("/api/posts", params={"include_content": "false"}).json()
+    assert body[0]["summary"] == "hand written"
+    # full mode reads the same column
+    assert sqlite_client.get("/api/posts").json()[0]["summary"] == "hand written"
+
+
+def test_upgrade_adds_and_backfills_summary_column(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # the articles table as it looked before the summary column existed
+        conn.execute(text(
+            "CREATE TABLE articles (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL UNIQUE, "
+            "content TEXT NOT NULL, tags VARCHAR(255), slug VARCHAR(255) UNIQUE, "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        for i, content in enumerate(["short", "x" * 200, "é" * 201, ""], start=1):
+            conn.execute(text("INSERT INTO articles (id, title, content) VALUES (:id, :t, :c)"),
+                         {"id": i, "t": f"t{i}", "c": content})
+
+    # no alembic_version table yet: every revision checks what already exists
+    upgrade_database(engine)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT content, summary FROM articles ORDER BY id")).all()
+    assert [summary for _, summary in rows] == [make_summary(content) for content, _ in rows]
+    backfill = revision_module("0003").backfill
+    with engine.begin() as conn:
+        # already backfilled -> nothing left to do
+        assert backfill(conn) == 0
+        # batches walk the whole id range
+        conn.execute(text("UPDATE articles SET summary = NULL"))
+        assert backfill(conn, batch_size=3) == 4
+    engine.dispose()
+
+
+def test_backfill_commits_each_batch(tmp_path, monkeypatch):
+    path = tmp_path / "big.db"
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE articles (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL UNIQUE, "
+            "content TEXT NOT NULL, tags VARCHAR(255), slug VARCHAR(255) UNIQUE, "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        for i in range(1, 8):
+            conn.execute(text("INSERT INTO articles (id, title, content) VALUES (:id, :t, 'c')"), {"id": i, "t": f"t{i}"})
+    monkeypatch.setenv("SUMMARY_BACKFILL_BATCH_SIZE", "3")
+
+    # what another connection sees each time a backfill batch starts
+    visible = []
+
+    def _peek(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE articles SET summary"):
+            with sqlite3.connect(path) as other:
+                visible.append(other.execute("SELECT count(*) FROM articles WHERE summary IS NOT NULL").fetchone()[0])
+
+    event.listen(engine, "before_cursor_execute", _peek)
+    upgrade_database(engine)
+    engine.dispose()
+    assert visible == [0, 3, 6]
@@ -0,0 +1,84 @@
+"""
+Tests for the normalized tag index (`app/tags.py`): `GET /api/posts?tag=`,
+`GET /api/tags`, and how the counts follow article writes.
+"""
+
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.model import Article, ArticleTag, Tag
+from app.tags import rebuild_tag_index, tag_index_missing
+
+
+def _counts(client):
+    return {t["name"]: t["count"] for t in client.get("/api/tags").json()}
+
+
+def test_tags_follow_created_posts_and_filter_lists(sqlite_client, db_session):
+    for i, tags in enumerate(["python,web", "python", " web ,web,"]):
+        db_session.add(Article(title=f"t{i}", content="c", tags=tags, slug=f"s{i}", created_at=datetime(2024, 1, i + 1)))
+    db_session.commit()
+
+    assert sqlite_client.get("/api/tags").json() == [
+        {"name": "python", "count": 2},
+        {"name": "web", "count": 2},
+    ]
+
+    r = sqlite_client.get("/api/posts", params={"tag": "python", "limit": 1})
+    assert [p["slug"] for p in r.json()] == ["s1"]
+    r = sqlite_client.get("/api/posts", params={"tag": "python", "cursor": r.headers["X-Next-Cursor"]})
+    assert [p["slug"] for p in r.json()] == ["s0"]
+
+    r = sqlite_client.get("/api/posts", params={"tag": "web", "include_content": "false"})
+    assert [p["slug"] for p in r.json()] == ["s2", "s0"]
+    assert sqlite_client.get("/api/posts", params={"tag": "missing"}).json() == []
+
+
+def test_orm_updates_and_deletes_adjust_counts(sqlite_client, db_session):
+    r = sqlite_client.post("/api/posts", json={"title": "a", "content": "c", "tags": ["x", "y"]})
+    assert r.json()["tags"] == ["x", "y"]
+    assert _counts(sqlite_client) == {"x": 1, "y": 1}
+    article = db_session.query(Article).filter_by(title="a").one()
+
+    article.tags = "y,z"
+    db_session.commit()
+    assert _counts(sqlite_client) == {"y": 1, "z": 1}
+
+    db_session.delete(article)
+    db_session.commit()
+    assert _counts(sqlite_client) == {}
+    assert db_session.query(ArticleTag).count() == 0
+
+
+def test_bulk_upsert_keeps_tag_counts(sqlite_client):
+    rows = [{"title": "a", "content": "1", "tags": ["x"]}, {"title": "b", "content": "2", "tags": ["x", "y"]}]
+    body = "\n".join(json.dumps(r) for r in rows)
+    sqlite_client.post("/api/posts/bulk", content=body)
+    assert _counts(sqlite_client) == {"x": 2, "y": 1}
+
+    sqlite_client.post("/api/posts/bulk", params={"on_conflict": "upsert"},
+                       content=json.dumps({"title": "b", "content": "2", "tags": ["z"]}))
+    assert _counts(sqlite_client) == {"x": 1, "z": 1}
+
+
+def test_rebuild_migrates_existing_tag_strings(sqlite_engine, db_session):
+    # rows written without the ORM (e.g. before the tag tables existed)
+    with sqlite_engine.begin() as conn:
+        conn.execute(insert(Article), [
+            {"title": "a", "content": "c", "tags": "go, rust"},
+            {"title": "b", "content": "c", "tags": "rust,,rust"},
+            {"title": "c", "content": "c", "tags": None},
+        ])
+    assert tag_index_missing(sqlite_engine)
+
+    rebuild_tag_index(sqlite_engine, batch_size=1)
+
+    counts = dict(db_session.query(Tag.name, Tag.article_count))
+    assert counts == {"go": 1, "rust": 2}
+    assert not tag_index_missing(sqlite_engine)
+    # rebuilding again starts from scratch instead of double counting
+    rebuild_tag_index(sqlite_engine)
+    db_session.expire_all()
+    assert dict(db_session.query(Tag.name, Tag.article_count)) == counts
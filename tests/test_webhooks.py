@@ -0,0 +1,215 @@
+"""
+Tests for the batched post-event webhook dispatcher (`app/webhooks.py`).
+
+The webhook target is an `httpx.MockTransport` standing in for n8n, so no
+network is involved. Each test drives its own event loop via `asyncio.run`.
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import webhooks
+from app.metrics import render_prometheus
+from app.model import WebhookOutbox
+from app.webhooks import WebhookDispatcher
+
+
+class FakeWebhook:
+    """Records every delivered batch; answers with the queued status codes first."""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.batches = []
+
+    def __call__(self, request):
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 200:
+            self.batches.append(json.loads(request.content)["events"])
+        return httpx.Response(status)
+
+    @property
+    def events(self):
+        return [e for batch in self.batches for e in batch]
+
+
+def _dispatcher(target, **kwargs):
+    options = dict(flush_interval=0.05, backoff_base=0.001, poll_interval=0.05, transport=httpx.MockTransport(target))
+    options.update(kwargs)
+    return WebhookDispatcher("http://n8n.test/webhook", **options)
+
+
+async def _wait_until(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met in time")
+
+
+def test_events_from_worker_threads_are_delivered_in_batches():
+    target = FakeWebhook()
+    dispatcher = _dispatcher(target, batch_size=10)
+
+    async def scenario():
+        await dispatcher.start()
+        threads = [
+            threading.Thread(target=lambda n=n: dispatcher.publish({"post_id": n})) for n in range(25)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        await _wait_until(lambda: dispatcher.delivered == 25)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert sorted(e["post_id"] for e in target.events) == list(range(25))
+    assert all(len(batch) <= 10 for batch in target.batches)
+    assert len(target.batches) < 25
+    assert dispatcher.stats()["queue_depth"] == 0
+
+
+def test_retryable_errors_back_off_and_client_errors_do_not():
+    target = FakeWebhook(statuses=[503, 429])
+    dispatcher = _dispatcher(target)
+
+    async def scenario():
+        await dispatcher.start()
+        dispatcher.publish({"post_id": 1})
+        await _wait_until(lambda: dispatcher.delivered == 1)
+        target.statuses = [400]
+        dispatcher.publish({"post_id": 2})
+        await _wait_until(lambda: dispatcher.failed == 1)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert dispatcher.retries == 2
+    assert [e["post_id"] for e in target.events] == [1]
+
+
+def test_full_queue_drops_new_events():
+    target = FakeWebhook()
+    dispatcher = _dispatcher(target, queue_size=2)
+
+    async def scenario():
+        await dispatcher.start()
+        for n in range(5):
+            dispatcher.publish({"post_id": n})
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert dispatcher.dropped == 3
+    assert [e["post_id"] for e in target.events] == [0, 1]
+
+
+def test_stop_flushes_pending_events():
+    target = FakeWebhook()
+    dispatcher = _dispatcher(target, flush_interval=60)
+
+    async def scenario():
+        await dispatcher.start()
+        dispatcher.publish({"post_id": 1})
+        await asyncio.sleep(0.01)
+        assert dispatcher.stats()["queue_depth"] == 1
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert [e["post_id"] for e in target.events] == [1]
+
+
+@pytest.fixture
+def outbox_dispatcher(monkeypatch, sqlite_client, sqlite_engine):
+    """Swapped in after the client's lifespan ran, so the test controls when it starts.
+
+    The in-memory SQLite database has a single shared connection; a dispatcher
+    polling it from the app's loop would race the request sessions.
+    """
+    target = FakeWebhook()
+    dispatcher = _dispatcher(
+        target, outbox=True, max_retries=0, session_factory=sessionmaker(bind=sqlite_engine)
+    )
+    monkeypatch.setattr(webhooks, "dispatcher", dispatcher)
+    return dispatcher, target
+
+
+def test_outbox_rows_are_written_with_the_post_and_survive_failures(outbox_dispatcher, sqlite_client, db_session):
+    dispatcher, target = outbox_dispatcher
+    # Not started yet (e.g. the process restarted): the event is still persisted with the post.
+    r = sqlite_client.post("/api/posts", json={"title": "Outbox", "content": "body", "slug": "outbox"})
+    assert r.status_code == 200
+    assert [json.loads(row.payload)["slug"] for row in db_session.query(WebhookOutbox)] == ["outbox"]
+
+    async def scenario():
+        target.statuses = [500]
+        await dispatcher.start()
+        await _wait_until(lambda: dispatcher.failed == 1)
+        # Deferred with backoff; the row is still there and is retried once due.
+        await _wait_until(lambda: dispatcher.delivered == 1)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert [e["slug"] for e in target.events] == ["outbox"]
+    db_session.expire_all()
+    assert db_session.query(WebhookOutbox).count() == 0
+
+
+def _outbox_rows(session, n):
+    session.add_all(WebhookOutbox(payload=json.dumps({"post_id": i})) for i in range(n))
+    session.commit()
+
+
+def test_outbox_claims_are_leased_so_workers_do_not_share_rows(sqlite_engine, db_session):
+    """Two workers polling the same table never claim the same event."""
+    _outbox_rows(db_session, 3)
+    factory = sessionmaker(bind=sqlite_engine)
+    first = _dispatcher(FakeWebhook(), outbox=True, session_factory=factory)
+    second = _dispatcher(FakeWebhook(), outbox=True, session_factory=factory)
+
+    assert [row.id for row in first._outbox_claim(2)] == [1, 2]
+    assert [row.id for row in second._outbox_claim(5)] == [3]
+    assert first._outbox_claim(5) == []
+
+    # An expired lease (the worker died mid-send) makes the rows claimable again.
+    db_session.query(WebhookOutbox).update({"next_attempt_at": datetime(2000, 1, 1, tzinfo=timezone.utc)})
+    db_session.commit()
+    assert [row.id for row in second._outbox_claim(5)] == [1, 2, 3]
+
+
+def test_outbox_client_errors_are_marked_failed_and_not_retried(outbox_dispatcher, db_session):
+    dispatcher, target = outbox_dispatcher
+    _outbox_rows(db_session, 1)
+
+    async def scenario():
+        target.statuses = [400]
+        await dispatcher.start()
+        await _wait_until(lambda: dispatcher.failed == 1)
+        await asyncio.sleep(0.2)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert target.events == []
+    assert dispatcher.failed == 1 and dispatcher.batches == 1
+    assert dispatcher.stats()["queue_depth"] == 0
+    db_session.expire_all()
+    row = db_session.query(WebhookOutbox).one()
+    assert row.failed_at is not None and row.attempts == 1
+
+
+def test_bulk_ingest_records_outbox_events(outbox_dispatcher, sqlite_client, db_session):
+    body = "\n".join(json.dumps({"title": f"Bulk {n}", "content": "c"}) for n in range(3))
+    assert sqlite_client.post("/api/posts/bulk", content=body).json()["inserted"] == 3
+    assert db_session.query(WebhookOutbox).count() == 3
+
+
+def test_stats_are_exported_as_prometheus_metrics():
+    dispatcher = _dispatcher(FakeWebhook())
+    dispatcher.publish({"post_id": 1})  # not running: counted as dropped
+    text = render_prometheus(webhooks=dispatcher.stats())
+    assert "webhook_queue_depth 0" in text
+    assert 'webhook_events_total{outcome="dropped"} 1' in text